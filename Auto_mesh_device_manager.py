@@ -12,6 +12,7 @@ import time
 import rl62m02
 import re # Import re for input validation
 from rl62m02 import MeshDeviceManager
+from rl62m02.auto_bind import IncrementalBinder
 from rl62m02.utils import format_mac_address
 
 # 設定日誌格式
@@ -450,6 +451,34 @@ def auto_bind_from_json(device_manager):
             logger.debug(f"- MAC: {device_info.get('devMac', '未知')}, 名稱: {device_info.get('devType', '未知')}, 錯誤: {error}")
 
 
+def incremental_rebind_from_json(device_manager):
+    """增量重新綁定：保留在線的現有綁定，掃描的同時綁定缺少的設備"""
+    print("\n===== 增量重新綁定 (不重置 Mesh 網路) =====")
+    devices = [dict(d) for d in device_manager.get_all_devices()]
+    if not devices:
+        print(f"{DEVICE_CONFIG_FILE} 中沒有設備資料。")
+        return
+
+    binder = IncrementalBinder(device_manager)
+    for event in binder.run(devices, scan_time=30.0, verify_online=True):
+        kind = event["event"]
+        if kind == "kept":
+            print(f"保留: {event['name']} (MAC: {event['mac']}, UID: {event['unicast_addr']})")
+        elif kind == "scan_started":
+            print(f"開始掃描，待綁定 {event['pending']} 個設備...")
+        elif kind == "discovered":
+            print(f"發現: MAC {event['mac']} (UUID: {event['uuid']})，開始綁定")
+        elif kind == "bound":
+            print(f"綁定成功: {event['name']} (MAC: {event['mac']}) UID: {event['unicast_addr']}")
+        elif kind == "failed":
+            print(f"綁定失敗: {event['name']} (MAC: {event['mac']}): {event['error']}")
+        elif kind == "missing":
+            print(f"未發現: {event['name']} (MAC: {event['mac']})")
+        elif kind == "done":
+            print(f"\n完成: 保留 {event['kept']}，綁定 {event['bound']}，失敗 {event['failed']}，"
+                  f"未發現 {event['missing']}，耗時 {event['elapsed']:.1f} 秒")
+
+
 def main():
     if len(sys.argv) < 2:
         print("使用方式: python Auto_mesh_device_manager.py <COM埠>")
@@ -506,6 +535,7 @@ def main():
             print("2. 解除所有設備綁定")
             print("3. 從檔案自動綁定設備")
             print("4. 顯示所有已綁定設備") # 添加顯示功能
+            print("5. 增量重新綁定 (保留現有綁定)")
             print("0. 離開")
 
             choice = input("請選擇操作: ").strip()
@@ -520,6 +550,8 @@ def main():
                 auto_bind_from_json(device_manager)
             elif choice == '4': # 實現顯示功能
                  display_all_devices(device_manager)
+            elif choice == '5':
+                incremental_rebind_from_json(device_manager)
             else:
                 print("無效選擇，請重試")
 
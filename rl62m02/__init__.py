@@ -1,7 +1,24 @@
-from .serial_at import SerialAT
-from .provisioner import Provisioner
-from .controllers.mesh_controller import RLMeshDeviceController
-from .device_manager import MeshDeviceManager
+import importlib
+
+# 子模組在第一次存取屬性時才導入 (PEP 562)，讓 rl62m02 --help 等不需要全部模組的用途快速啟動
+_LAZY_ATTRIBUTES = {
+    'SerialAT': '.serial_at',
+    'Provisioner': '.provisioner',
+    'RLMeshDeviceController': '.controllers.mesh_controller',
+    'MeshDeviceManager': '.device_manager',
+    'ModbusRTU': '.modbus',
+}
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # 之後的存取不再經過 __getattr__
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
 def create_provisioner(com_port, baud_rate=115200):
     """
@@ -46,4 +63,5 @@ __all__ = [
     'create_provisioner',
     'RLMeshDeviceController',
     'MeshDeviceManager',
+    'ModbusRTU',
 ]
\ No newline at end of file
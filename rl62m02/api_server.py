@@ -0,0 +1,390 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+REST 與 WebSocket API 伺服器
+以 asyncio (只使用標準函式庫) 提供 HTTP/1.1 JSON API，將設備列表、控制、批次控制、感測器讀取與配置
+轉送給 MeshGateway；需要使用 dongle 的請求由 MeshGateway 依序執行，等待中的請求超過上限時
+直接回應 503。GET /events 升級為 WebSocket，推送 Provisioner 收到並解析後的 Mesh 訊息
+
+路由:
+    GET  /health                      閘道狀態
+    GET  /metrics                     Prometheus 文字格式指標
+    GET  /devices                     設備列表
+    GET  /devices/{addr}              單一設備
+    GET  /devices/{addr}/sensors      依設備類型讀取 Air-Box / 電表 (?slave=1)
+    POST /devices/{addr}/control      {"action": "turn_on", "params": {...}}
+    POST /groups/{addr}/control       {"action": "turn_off", "params": {...}}
+    POST /control                     批次控制 {"commands": [{"addr", "action", "params"}, ...]}
+    POST /scan                        {"time": 3.0}
+    POST /provision                   {"uuid", "name", "type", "position", "mac"}
+    GET  /events                      WebSocket 事件串流
+"""
+
+import re
+import json
+import time
+import base64
+import struct
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .gateway import MeshGateway, json_default
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_BODY_BYTES = 1 << 20
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+_EVENT_PATTERN = re.compile(r"^(MDTG-MSG|MDTS-MSG|MDTPG-MSG) (0x[0-9A-Fa-f]+) (\d+) ([0-9A-Fa-f]*)")
+
+
+def parse_event(line: str) -> Dict[str, Any]:
+    """
+    將 Provisioner 收到的一行訊息解析為事件
+
+    Args:
+        line (str): 訊息行，例如 'MDTG-MSG 0x0100 0 827602...'
+
+    Returns:
+        dict: {'type', 'time', 'raw'}；Mesh 資料訊息另有 'source'、'element' 與 'data' (hex)，
+              其他 X-MSG 訊息另有 'fields' (空白分隔的其餘欄位)
+    """
+    event = {"type": line.split(" ", 1)[0] if line else "", "time": time.time(), "raw": line}
+    match = _EVENT_PATTERN.match(line)
+    if match:
+        event.update(source=match.group(2), element=int(match.group(3)), data=match.group(4).upper())
+    elif event["type"].endswith("-MSG"):
+        event["fields"] = line.split()[1:]
+    else:
+        event["type"] = "other"
+    return event
+
+
+class HTTPError(Exception):
+    """以指定 HTTP 狀態碼回應的錯誤"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class MeshAPIServer:
+    """MeshGateway 的 REST / WebSocket 伺服器"""
+
+    def __init__(self, gateway: MeshGateway, host: str = "127.0.0.1", port: int = 8080,
+                 max_pending: int = 16, event_queue_size: int = 256):
+        """
+        Args:
+            gateway (MeshGateway): 已開啟的閘道
+            host (str): 監聽地址
+            port (int): 監聽埠，0 表示自動選擇
+            max_pending (int): 同時等待 dongle 的請求上限，超過時回應 503
+            event_queue_size (int): 每個 WebSocket 用戶端的事件佇列長度，慢的用戶端會遺失最舊的事件
+        """
+        self.gateway = gateway
+        self.host = host
+        self.port = port
+        self.max_pending = max_pending
+        self.event_queue_size = event_queue_size
+        self.stats = {"requests": 0, "rejected": 0, "errors": 0, "events": 0, "events_dropped": 0}
+        self._pending = 0
+        self._server = None
+        self._loop = None
+        self._subscribers = set()
+        self._connections = set()
+
+    # ---- 事件串流 ----
+
+    def _on_line(self, line: str):
+        """Provisioner 監聽函數 (在串口接收執行緒中呼叫)"""
+        if self._subscribers and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._publish, parse_event(line))
+
+    def _publish(self, event: Dict[str, Any]):
+        self.stats["events"] += 1
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+                self.stats["events_dropped"] += 1
+            queue.put_nowait(event)
+
+    # ---- 請求處理 ----
+
+    async def _call(self, op: str, *args, **params) -> Any:
+        """經由閘道執行需要 dongle 的操作，等待中的請求過多時拒絕"""
+        if self._pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise HTTPError(503, f"等待中的請求已達上限 ({self.max_pending})，請稍後再試")
+        self._pending += 1
+        try:
+            return await self.gateway.execute_async(op, *args, **params)
+        finally:
+            self._pending -= 1
+
+    def _device(self, addr: str) -> Dict[str, Any]:
+        device = self.gateway.execute("get_device", addr)
+        if not device:
+            raise HTTPError(404, f"找不到設備: {addr}")
+        return device
+
+    async def _read_sensors(self, addr: str, query: Dict[str, str]) -> Any:
+        device_type = (self._device(addr).get("devName") or "").upper()
+        slave = int(query.get("slave", "1"), 0)
+        if device_type == "AIR_BOX":
+            return await self._call("read_air_box", addr, slave)
+        if device_type == "POWER_METER":
+            return await self._call("read_power_meter", addr, slave)
+        raise HTTPError(400, f"設備類型 {device_type or '未知'} 沒有感測器讀取")
+
+    async def _bulk_control(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        commands = body.get("commands")
+        if not isinstance(commands, list) or not commands:
+            raise HTTPError(400, "commands 必須是非空的列表")
+        if self._pending + len(commands) > self.max_pending:
+            self.stats["rejected"] += 1
+            raise HTTPError(503, f"批次命令數超過可用的等待額度 ({self.max_pending - self._pending})")
+        results = await asyncio.gather(*(
+            self._call("control", command["addr"], command["action"], **command.get("params", {}))
+            for command in commands), return_exceptions=True)
+        return {"results": [{"result": "error", "error": str(result)} if isinstance(result, Exception) else result
+                            for result in results]}
+
+    async def _route(self, method: str, path: str, query: Dict[str, str], body: Dict[str, Any]) -> Tuple[int, Any]:
+        parts = [part for part in path.split("/") if part]
+        if method == "GET":
+            if parts == ["health"]:
+                return 200, self.gateway.execute("ping")
+            if parts == ["devices"]:
+                return 200, self.gateway.execute("list")
+            if len(parts) == 2 and parts[0] == "devices":
+                return 200, self._device(parts[1])
+            if len(parts) == 3 and parts[0] == "devices" and parts[2] == "sensors":
+                return 200, await self._read_sensors(parts[1], query)
+        elif method == "POST":
+            if len(parts) == 3 and parts[0] in ("devices", "groups") and parts[2] == "control":
+                if "action" not in body:
+                    raise HTTPError(400, "缺少 action")
+                op = "control" if parts[0] == "devices" else "control_group"
+                return 200, await self._call(op, parts[1], body["action"], **body.get("params", {}))
+            if parts == ["control"]:
+                return 200, await self._bulk_control(body)
+            if parts == ["scan"]:
+                return 200, await self._call("scan", scan_time=float(body.get("time", 3.0)))
+            if parts == ["provision"]:
+                if "uuid" not in body:
+                    raise HTTPError(400, "缺少 uuid")
+                return 200, await self._call("provision", body["uuid"], body.get("name", ""),
+                                             body.get("type", "RGB_LED"), body.get("position", ""), body.get("mac"))
+        else:
+            raise HTTPError(405, f"不支援的方法: {method}")
+        raise HTTPError(404, f"找不到路徑: {path}")
+
+    # ---- HTTP / WebSocket ----
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """讀取一個 HTTP 請求，連線結束時返回 None"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "無效的請求行")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            raise HTTPError(400, "無效的 Content-Length")
+        if length < 0:
+            raise HTTPError(400, "無效的 Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "請求內容過大")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, payload: Any, content_type: str = None,
+                        keep_alive: bool = True):
+        if content_type is None:
+            data = json.dumps(payload, ensure_ascii=False, default=json_default).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        else:
+            data = payload.encode("utf-8")
+        head = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}",
+                f"Content-Type: {content_type}",
+                f"Content-Length: {len(data)}",
+                f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status == 503:
+            head.append("Retry-After: 1")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """處理一個 HTTP 連線 (支援 keep-alive)"""
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    self._write_response(writer, e.status, {"result": "error", "error": str(e)}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                method, target, headers, raw_body = request
+                url = urlsplit(target)
+                if url.path == "/events" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._websocket(reader, writer, headers)
+                    break
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self.stats["requests"] += 1
+                try:
+                    if url.path == "/metrics" and method == "GET":
+                        text = self.gateway.provisioner.metrics.render_prometheus()
+                        self._write_response(writer, 200, text, "text/plain; version=0.0.4; charset=utf-8", keep_alive)
+                    else:
+                        body = json.loads(raw_body) if raw_body else {}
+                        if not isinstance(body, dict):
+                            raise HTTPError(400, "請求內容必須是 JSON 物件")
+                        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                        status, payload = await self._route(method, url.path, query, body)
+                        self._write_response(writer, status, payload, keep_alive=keep_alive)
+                except HTTPError as e:
+                    self._write_response(writer, e.status, {"result": "error", "error": str(e)}, keep_alive=keep_alive)
+                except (ValueError, TypeError, KeyError) as e:
+                    self._write_response(writer, 400, {"result": "error", "error": f"無效的請求: {e}"}, keep_alive=keep_alive)
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    logging.error(f"API 請求 {method} {url.path} 發生錯誤: {e}")
+                    self._write_response(writer, 500, {"result": "error", "error": str(e)}, keep_alive=keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    @staticmethod
+    def _ws_frame(opcode: int, payload: bytes) -> bytes:
+        """伺服器端 WebSocket 訊框 (不遮罩)"""
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        return header + payload
+
+    @staticmethod
+    async def _ws_read(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+        """讀取一個用戶端 WebSocket 訊框，返回 (opcode, payload)
+
+        Raises:
+            ValueError: 訊框長度超過 MAX_BODY_BYTES
+        """
+        first, second = await reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if length > MAX_BODY_BYTES:
+            raise ValueError(f"WebSocket 訊框過大: {length} bytes")
+        mask = await reader.readexactly(4) if second & 0x80 else b"\x00\x00\x00\x00"
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(await reader.readexactly(length)))
+        return first & 0x0F, payload
+
+    async def _websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, headers: Dict[str, str]):
+        """完成 WebSocket 握手並推送事件，直到用戶端關閉"""
+        key = headers.get("sec-websocket-key")
+        if not key:
+            self._write_response(writer, 400, {"result": "error", "error": "缺少 Sec-WebSocket-Key"}, keep_alive=False)
+            return
+        accept = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+        queue = asyncio.Queue(self.event_queue_size)
+        self._subscribers.add(queue)
+
+        async def receive():
+            while True:
+                try:
+                    opcode, payload = await self._ws_read(reader)
+                except ValueError as e:
+                    logging.warning(str(e))
+                    writer.write(self._ws_frame(0x8, struct.pack("!H", 1009)))  # 1009: message too big
+                    await writer.drain()
+                    return
+                if opcode == 0x8:  # close
+                    writer.write(self._ws_frame(0x8, payload[:2]))
+                    return
+                if opcode == 0x9:  # ping
+                    writer.write(self._ws_frame(0xA, payload))
+
+        receiver = asyncio.ensure_future(receive())
+        try:
+            while not receiver.done():
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait({getter, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    break
+                data = json.dumps(getter.result(), ensure_ascii=False).encode("utf-8")
+                writer.write(self._ws_frame(0x1, data))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._subscribers.discard(queue)
+            receiver.cancel()
+            await asyncio.gather(receiver, return_exceptions=True)
+
+    # ---- 啟動與停止 ----
+
+    async def start(self):
+        """開始監聽並註冊 Provisioner 監聽函數"""
+        self._loop = asyncio.get_running_loop()
+        self.gateway.provisioner.add_listener(self._on_line)
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        sockets = self._server.sockets or []
+        if sockets:
+            self.port = sockets[0].getsockname()[1]
+        logging.info(f"API 伺服器監聽於 http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        """開始監聽並持續服務"""
+        if self._server is None:
+            await self.start()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            self.gateway.provisioner.remove_listener(self._on_line)
+
+    async def close(self):
+        """停止監聽並中斷所有連線"""
+        if self._server is not None:
+            self.gateway.provisioner.remove_listener(self._on_line)
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得統計 (requests / rejected / errors / events / events_dropped / pending / subscribers)"""
+        return dict(self.stats, pending=self._pending, subscribers=len(self._subscribers))
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+RL Mesh 增量自動綁定
+保留現有健康的綁定，只重新綁定缺少的設備；掃描與綁定同時進行，
+每收到預期 MAC 的 DIS-MSG 就立即開始綁定
+"""
+
+import time
+import queue
+import logging
+from typing import Any, Dict, Iterator, List, Optional
+
+from .utils import format_mac_address
+
+
+class IncrementalBinder:
+    """
+    增量自動綁定器
+
+    與 Auto_mesh_device_manager 的 auto_bind_from_json 不同，不會重置整個 Mesh 網路，
+    也不會先掃描固定時間再逐一綁定，而是以事件串流回報進度:
+
+    - kept: 設備已有健康的綁定，保留不動
+    - scan_started: 開始掃描，pending 為待綁定數量
+    - discovered: 掃描到預期的設備
+    - bound / failed: 綁定成功或重試後仍失敗
+    - missing: 掃描結束仍未發現的設備
+    - done: 總結 (bound / kept / failed / missing / elapsed)
+    """
+
+    def __init__(self, device_manager, retries: int = 3, retry_delay: float = 1.0):
+        """
+        初始化增量綁定器
+
+        Args:
+            device_manager (MeshDeviceManager): 設備管理器
+            retries (int): 每個設備的綁定嘗試次數
+            retry_delay (float): 重試間隔 (秒)
+        """
+        self.device_manager = device_manager
+        self.provisioner = device_manager.provisioner
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.logger = logging.getLogger(__name__)
+
+    def _online_addresses(self) -> set:
+        """以 AT+NL 取得在線節點的 unicast 地址"""
+        online = set()
+        for line in self.provisioner.get_node_list():
+            parts = line.split()
+            # NL-MSG <index> <unicast_addr> <element_num> <state_online>
+            if len(parts) >= 5 and parts[4] == '1':
+                online.add(parts[2].lower())
+        return online
+
+    def _split_expected(self, expected_devices: List[Dict[str, Any]], verify_online: bool):
+        """將預期設備分為健康 (保留) 與待綁定兩類"""
+        online = self._online_addresses() if verify_online else None
+        kept = []
+        pending = {}
+        for device_info in expected_devices:
+            mac = device_info.get('devMac')
+            if not mac:
+                continue
+            mac = format_mac_address(mac)
+            current = self.device_manager.get_device_by_mac(mac)
+            uid = current.get('uid') if current else None
+            if uid and (online is None or uid.lower() in online):
+                kept.append(current)
+            else:
+                pending[mac] = device_info
+        return kept, pending
+
+    def run(self, expected_devices: Optional[List[Dict[str, Any]]] = None, scan_time: float = 10.0,
+            verify_online: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        執行增量綁定並以產生器回報進度
+
+        Args:
+            expected_devices (list): 預期的設備列表 (與設備記錄相同格式，需含 devMac、devName、devType)，
+                                     預設為設備管理器目前的記錄
+            scan_time (float): 掃描時間上限 (秒，從開始掃描起計算)，所有待綁定設備都完成時會提前結束
+            verify_online (bool): 是否以 AT+NL 確認現有綁定在線，離線的設備會重新綁定
+
+        Yields:
+            dict: 進度事件，event 欄位為事件類型
+        """
+        start_time = time.monotonic()
+        if expected_devices is None:
+            expected_devices = [dict(device) for device in self.device_manager.get_all_devices()]
+
+        kept, pending = self._split_expected(expected_devices, verify_online)
+        for device in kept:
+            yield {"event": "kept", "mac": device.get('devMac'), "name": device.get('devType'),
+                   "unicast_addr": device.get('uid')}
+
+        bound = []
+        failed = []
+        if pending:
+            discovered = queue.Queue()
+
+            def on_line(line: str):
+                if line.startswith('DIS-MSG '):
+                    parts = line.split()
+                    if len(parts) == 4:
+                        discovered.put((format_mac_address(parts[1]), parts[3]))
+
+            self.provisioner.add_listener(on_line)
+            try:
+                self.provisioner.start_discovery()
+                # 掃描時間從開始掃描起計算，不包含 verify_online 的 AT+NL 查詢
+                deadline = time.monotonic() + scan_time
+                yield {"event": "scan_started", "pending": len(pending)}
+                while pending and time.monotonic() < deadline:
+                    try:
+                        mac, uuid = discovered.get(timeout=min(0.2, max(deadline - time.monotonic(), 0.01)))
+                    except queue.Empty:
+                        continue
+                    device_info = pending.pop(mac, None)
+                    if device_info is None:
+                        continue
+                    yield {"event": "discovered", "mac": mac, "uuid": uuid}
+                    # 綁定期間掃描持續進行，新的 DIS-MSG 會在佇列中等待
+                    event = self._bind(device_info, mac, uuid)
+                    (bound if event["event"] == "bound" else failed).append(event)
+                    yield event
+            finally:
+                self.provisioner.stop_discovery()
+                self.provisioner.remove_listener(on_line)
+
+        for mac, device_info in pending.items():
+            yield {"event": "missing", "mac": mac, "name": device_info.get('devType')}
+
+        yield {
+            "event": "done",
+            "bound": len(bound),
+            "kept": len(kept),
+            "failed": len(failed),
+            "missing": len(pending),
+            "elapsed": time.monotonic() - start_time,
+        }
+
+    def _bind(self, device_info: Dict[str, Any], mac: str, uuid: str) -> Dict[str, Any]:
+        """綁定單一設備，失敗時重試"""
+        name = device_info.get('devType')
+        last_error = "未知錯誤"
+        for attempt in range(1, self.retries + 1):
+            result = self.device_manager.provision_device(
+                uuid=uuid,
+                device_name=name or "",
+                device_type=device_info.get('devName') or "RGB_LED",
+                position=device_info.get('devPosition') or device_info.get('position') or "",
+                mac_address=mac
+            )
+            if result.get("result") == "success":
+                unicast_addr = result['unicast_addr']
+                self.logger.info(f"設備 {name} (MAC: {mac}) 綁定成功! UID: {unicast_addr}")
+                return {"event": "bound", "mac": mac, "name": name, "uuid": uuid,
+                        "unicast_addr": unicast_addr, "attempts": attempt,
+                        "restored": self._restore_channels(device_info, unicast_addr)}
+            last_error = result.get('error', '未知錯誤')
+            self.logger.warning(f"綁定設備 {name} (MAC: {mac}) 失敗 (第 {attempt} 次嘗試): {last_error}")
+            if attempt < self.retries:
+                time.sleep(self.retry_delay)
+        return {"event": "failed", "mac": mac, "name": name, "uuid": uuid, "error": last_error,
+                "attempts": self.retries}
+
+    def _restore_channels(self, device_info: Dict[str, Any], unicast_addr: str) -> Dict[str, Any]:
+        """重新綁定後恢復原有的訂閱與推播設定，全部完成後只儲存一次"""
+        restored = {"subscribe": [], "publish": None}
+        for group_addr in device_info.get('subscribe') or []:
+            result = self.device_manager.set_subscription(unicast_addr, group_addr, save_after_set=False)
+            if result.get("result") == "success":
+                restored["subscribe"].append(group_addr)
+        publish_addr = device_info.get('publish')
+        if publish_addr:
+            result = self.device_manager.set_publication(unicast_addr, publish_addr, save_after_set=False)
+            if result.get("result") == "success":
+                restored["publish"] = publish_addr
+        if restored["subscribe"] or restored["publish"]:
+            self.device_manager.save_device_data()
+        return restored
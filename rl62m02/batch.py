@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+批次腳本
+在同一個連線中依序執行 scan / provision / subscribe / publish / control 等命令，
+避免每個命令都重新開啟串口與檢查角色；每行結果以 JSON Lines 輸出
+
+腳本格式 (每行一個命令，# 之後為註解):
+    set GROUP=0xC000
+    scan --time 3
+    provision 123E4567E89B12D3A456655600000000 --name 客廳燈 --type RGB_LED --as LIGHT
+    subscribe ${LIGHT} ${GROUP}
+    publish ${LIGHT} ${GROUP}
+    control ${LIGHT} set_rgb red=255 green=0
+    control_group ${GROUP} turn_off
+    rename ${LIGHT} 客廳主燈
+    unbind ${LIGHT} --force
+    list
+    sleep 0.5
+
+變數以 ${NAME} 或 $NAME 引用，來源為 --var NAME=VALUE、set 命令與 provision --as
+(綁定成功後存入 unicast address)；未定義的變數保持原樣
+"""
+
+import sys
+import json
+import time
+import shlex
+import string
+import argparse
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+from .gateway import json_default
+
+
+class BatchError(ValueError):
+    """腳本格式錯誤"""
+
+
+class _ArgumentParser(argparse.ArgumentParser):
+    """解析錯誤時拋出 BatchError 而不是結束程式"""
+
+    def error(self, message):
+        raise BatchError(f"{self.prog}: {message}")
+
+
+def _parser(name: str, *positionals: str) -> _ArgumentParser:
+    parser = _ArgumentParser(prog=name, add_help=False)
+    for positional in positionals:
+        parser.add_argument(positional)
+    return parser
+
+
+def _parse_value(value: str) -> Any:
+    """key=value 參數值: 可解析為整數 (含 0x 前綴) 時轉為 int"""
+    try:
+        return int(value, 0)
+    except ValueError:
+        return value
+
+
+def _parse_params(items: List[str]) -> Dict[str, Any]:
+    params = {}
+    for item in items:
+        key, sep, value = item.partition("=")
+        if not sep or not key:
+            raise BatchError(f"參數格式應為 key=value: {item}")
+        params[key] = _parse_value(value)
+    return params
+
+
+def _succeeded(result: Any) -> bool:
+    """操作結果是否成功: 結果字典的 result 欄位不是 success 時視為失敗"""
+    if result is None:
+        return False
+    if isinstance(result, dict) and "result" in result:
+        return result["result"] == "success"
+    if isinstance(result, str):
+        return "ERROR" not in result
+    return True
+
+
+class BatchRunner:
+    """依序執行批次腳本"""
+
+    def __init__(self, provisioner, device_manager, variables: Dict[str, str] = None,
+                 keep_going: bool = False, output: Optional[TextIO] = None):
+        """
+        Args:
+            provisioner: Provisioner (或 GatewayClient.provisioner)
+            device_manager: MeshDeviceManager (或 GatewayClient.device_manager)
+            variables (dict, optional): 初始變數
+            keep_going (bool): 命令失敗時繼續執行後續命令
+            output (TextIO, optional): JSON Lines 輸出，預設為標準輸出
+        """
+        self.provisioner = provisioner
+        self.device_manager = device_manager
+        self.variables = dict(variables or {})
+        self.keep_going = keep_going
+        self.output = output if output is not None else sys.stdout
+        self._parsers = self._build_parsers()
+
+    @staticmethod
+    def _build_parsers() -> Dict[str, _ArgumentParser]:
+        parsers = {
+            "scan": _parser("scan"),
+            "provision": _parser("provision", "uuid"),
+            "unbind": _parser("unbind", "addr"),
+            "subscribe": _parser("subscribe", "addr", "group"),
+            "publish": _parser("publish", "addr", "target"),
+            "control": _parser("control", "addr", "action"),
+            "control_group": _parser("control_group", "group", "action"),
+            "rename": _parser("rename", "addr", "name"),
+            "list": _parser("list"),
+            "set": _parser("set", "assignment"),
+            "sleep": _parser("sleep", "seconds"),
+        }
+        parsers["scan"].add_argument("--time", type=float, default=3.0)
+        parsers["provision"].add_argument("--name", default="")
+        parsers["provision"].add_argument("--type", default="RGB_LED")
+        parsers["provision"].add_argument("--position", default="")
+        parsers["provision"].add_argument("--mac")
+        parsers["provision"].add_argument("--as", dest="variable")
+        parsers["unbind"].add_argument("--force", action="store_true")
+        parsers["control"].add_argument("params", nargs="*")
+        parsers["control_group"].add_argument("params", nargs="*")
+        return parsers
+
+    def substitute(self, text: str) -> str:
+        """以目前的變數替換 ${NAME} / $NAME"""
+        return string.Template(text).safe_substitute(self.variables)
+
+    def execute(self, command: str, args: argparse.Namespace) -> Any:
+        """執行一個已解析的命令並返回結果"""
+        manager = self.device_manager
+        if command == "scan":
+            return self.provisioner.scan_nodes(scan_time=args.time)
+        if command == "provision":
+            result = manager.provision_device(args.uuid, args.name, args.type, args.position, args.mac)
+            if args.variable and _succeeded(result):
+                self.variables[args.variable] = result["unicast_addr"]
+            return result
+        if command == "unbind":
+            return manager.unbind_device(args.addr, force_remove=args.force)
+        if command == "subscribe":
+            return manager.set_subscription(args.addr, args.group)
+        if command == "publish":
+            return manager.set_publication(args.addr, args.target)
+        if command == "control":
+            return manager.control_device(args.addr, args.action, **_parse_params(args.params))
+        if command == "control_group":
+            return manager.control_group(args.group, args.action, **_parse_params(args.params))
+        if command == "rename":
+            return manager.set_device_name(args.addr, args.name)
+        if command == "list":
+            return manager.get_all_devices()
+        if command == "set":
+            name, sep, value = args.assignment.partition("=")
+            if not sep or not name.isidentifier():
+                raise BatchError(f"set 格式應為 NAME=VALUE: {args.assignment}")
+            self.variables[name] = value
+            return {"result": "success", name: value}
+        if command == "sleep":
+            time.sleep(float(args.seconds))
+            return {"result": "success"}
+        raise BatchError(f"未知的命令: {command}")
+
+    def run_line(self, number: int, line: str) -> Optional[Dict[str, Any]]:
+        """
+        執行一行腳本
+
+        Returns:
+            dict: {'line', 'command', 'ok', 'result' 或 'error', 'elapsed_ms'}；空白行與註解返回 None
+        """
+        try:
+            tokens = shlex.split(self.substitute(line), comments=True)
+        except ValueError as e:
+            return {"line": number, "command": line.strip(), "ok": False, "error": str(e), "elapsed_ms": 0.0}
+        if not tokens:
+            return None
+        record = {"line": number, "command": " ".join(tokens)}
+        started = time.perf_counter()
+        try:
+            parser = self._parsers.get(tokens[0])
+            if parser is None:
+                raise BatchError(f"未知的命令: {tokens[0]}")
+            result = self.execute(tokens[0], parser.parse_args(tokens[1:]))
+            record.update(ok=_succeeded(result), result=result)
+        except Exception as e:
+            record.update(ok=False, error=f"{type(e).__name__}: {e}")
+        record["elapsed_ms"] = (time.perf_counter() - started) * 1000
+        return record
+
+    def run(self, lines: Iterable[str]) -> Dict[str, Any]:
+        """
+        執行整個腳本，每行結果寫入 output
+
+        Returns:
+            dict: {'result': 'success' 或 'failed', 'executed', 'failed', 'stopped_at' (未使用 keep_going 時停止的行號)}
+        """
+        summary = {"result": "success", "executed": 0, "failed": 0, "stopped_at": None}
+        for number, line in enumerate(lines, 1):
+            record = self.run_line(number, line)
+            if record is None:
+                continue
+            summary["executed"] += 1
+            self.output.write(json.dumps(record, ensure_ascii=False, default=json_default) + "\n")
+            self.output.flush()
+            if not record["ok"]:
+                summary["failed"] += 1
+                summary["result"] = "failed"
+                if not self.keep_going:
+                    summary["stopped_at"] = number
+                    break
+        return summary
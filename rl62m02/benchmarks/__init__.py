@@ -0,0 +1,4 @@
+"""
+RL62M02 效能基準測試
+每個模組可用 python -m rl62m02.benchmarks.<模組名稱> 執行，--json 輸出機器可讀結果
+"""
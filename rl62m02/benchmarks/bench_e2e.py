@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Provisioner 端對端基準測試
+以模擬 dongle (rl62m02.simulator) 執行公開 API: scan_nodes、auto_provision_node、send_datatrans、
+read_air_box_data 與 MeshDeviceManager.control_device，量測不同網路規模下的
+每秒命令數、p50 / p99 往返時間、掃描到綁定的延遲與每個節點的配置時間
+"""
+
+import os
+import json
+import math
+import time
+import logging
+import argparse
+import platform
+import tempfile
+from typing import Callable, Dict, List
+
+from ..serial_at import SerialAT
+from ..provisioner import Provisioner
+from ..controllers.mesh_controller import RLMeshDeviceController
+from ..device_manager import MeshDeviceManager
+from ..simulator import SimulatedDongle, VirtualMesh
+
+# RGB LED 紅光命令 (87 0100 05 + cold warm red green blue)
+RGB_COMMAND = "870100050000ff0000"
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    """最近序位法的百分位數"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, math.ceil(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _summary(samples: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    """整理一組往返時間 (秒)"""
+    count = len(samples) + errors
+    return {
+        "count": count,
+        "errors": errors,
+        "ops_per_sec": count / elapsed if elapsed > 0 else 0.0,
+        "mean_ms": sum(samples) / len(samples) * 1000 if samples else 0.0,
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "p99_ms": _percentile(samples, 99) * 1000,
+    }
+
+
+def _measure(operation: Callable[[int], object], succeeded: Callable[[object], bool],
+             operations: int) -> Dict[str, float]:
+    """依序執行 operation(i) 並統計成功操作的往返時間"""
+    samples = []
+    errors = 0
+    started = time.perf_counter()
+    for index in range(operations):
+        begin = time.perf_counter()
+        result = operation(index)
+        if succeeded(result):
+            samples.append(time.perf_counter() - begin)
+        else:
+            errors += 1
+    return _summary(samples, errors, time.perf_counter() - started)
+
+
+def run_fleet(size: int, operations: int = 200, provision_sample: int = 10, scan_time: float = 1.0,
+              latency: float = 0.01, jitter: float = 0.005, loss: float = 0.0, seed: int = 1) -> Dict:
+    """
+    以指定節點數量的虛擬網路執行一輪測試
+
+    掃描後只以 auto_provision_node 配置 provision_sample 個節點 (逐一配置 1000 個節點太久)，
+    其餘節點由模擬器直接配置，之後的命令平均分散到所有節點
+
+    Args:
+        size (int): 虛擬節點數量
+        operations (int): 每個 API 執行的次數
+        provision_sample (int): 以 auto_provision_node 配置的節點數
+        scan_time (float): scan_nodes 的掃描時間 (秒)
+        latency (float): Mesh 訊息延遲 (秒)
+        jitter (float): 額外隨機延遲上限 (秒)
+        loss (float): Mesh 訊息遺失率
+        seed (int): 隨機數種子
+
+    Returns:
+        dict: 此網路規模的測試結果
+    """
+    mesh = VirtualMesh(size, latency=latency, jitter=jitter, loss=loss, seed=seed)
+    result = {"fleet_size": size}
+    with SimulatedDongle(mesh) as dongle:
+        serial_at = SerialAT(dongle.port)
+        try:
+            provisioner = Provisioner(serial_at)
+
+            scan_started = time.perf_counter()
+            nodes = provisioner.scan_nodes(scan_time=scan_time)
+            result["scan"] = {"seconds": time.perf_counter() - scan_started, "discovered": len(nodes)}
+
+            provision_times = []
+            failures = 0
+            scan_to_bind = None
+            for node in nodes[:provision_sample]:
+                begin = time.perf_counter()
+                bound = provisioner.auto_provision_node(node["uuid"])
+                if bound.get("result") == "success":
+                    provision_times.append(time.perf_counter() - begin)
+                    if scan_to_bind is None:
+                        scan_to_bind = time.perf_counter() - scan_started
+                else:
+                    failures += 1
+            result["provision"] = _summary(provision_times, failures, sum(provision_times))
+            result["provision"]["per_node_ms"] = result["provision"].pop("mean_ms")
+            result["scan_to_bind_ms"] = None if scan_to_bind is None else scan_to_bind * 1000
+
+            mesh.provision_all()
+            addresses = [node.address for node in mesh.nodes]
+
+            def address(index):
+                return addresses[index % len(addresses)]
+
+            result["send_datatrans"] = _measure(
+                lambda i: provisioner.send_datatrans(address(i), RGB_COMMAND),
+                lambda response: bool(response) and "SUCCESS" in response, operations)
+
+            controller = RLMeshDeviceController(provisioner)
+            for unicast_addr in addresses:
+                controller.register_device(unicast_addr, RLMeshDeviceController.DEVICE_TYPE_AIR_BOX)
+            result["read_air_box_data"] = _measure(
+                lambda i: controller.read_air_box_data(address(i), 1),
+                lambda data: data.get("temperature") is not None, operations)
+
+            with tempfile.TemporaryDirectory() as directory:
+                json_path = os.path.join(directory, "mesh_devices.json")
+                with open(json_path, "w", encoding="utf-8") as f:
+                    json.dump({"gwMac": "", "gwType": "mini_PC", "gwPosition": "", "devices": [
+                        {"devMac": "", "devName": "RGB_LED", "devType": f"LED_{index}", "devPosition": "",
+                         "devGroup": "", "uid": unicast_addr, "state": 0, "subscribe": [], "publish": ""}
+                        for index, unicast_addr in enumerate(addresses)]}, f)
+                manager = MeshDeviceManager(provisioner, device_json_path=json_path)
+                result["control_device"] = _measure(
+                    lambda i: manager.control_device(address(i), "set_rgb", red=255),
+                    lambda response: response.get("result") == "success", operations)
+                manager.controller.close()
+            controller.close()
+            result["dongle"] = dict(dongle.stats)
+        finally:
+            serial_at.close()
+    return result
+
+
+def run(fleets=(10, 100, 1000), operations: int = 200, provision_sample: int = 10, scan_time: float = 1.0,
+        latency: float = 0.01, jitter: float = 0.005, loss: float = 0.0, seed: int = 1):
+    """
+    執行基準測試
+
+    Returns:
+        dict: 測試結果，fleets 為各網路規模的結果
+    """
+    config = {"operations": operations, "provision_sample": provision_sample, "scan_time": scan_time,
+              "latency": latency, "jitter": jitter, "loss": loss, "seed": seed}
+    return {
+        "benchmark": "e2e",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "fleets": [run_fleet(size, **config) for size in fleets],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Provisioner 端對端基準測試 (使用模擬 dongle)')
+    parser.add_argument('--fleets', default='10,100,1000', help='以逗號分隔的網路規模')
+    parser.add_argument('--operations', type=int, default=200, help='每個 API 執行的次數')
+    parser.add_argument('--provision-sample', type=int, default=10, help='以 auto_provision_node 配置的節點數')
+    parser.add_argument('--scan-time', type=float, default=1.0, help='掃描時間 (秒)')
+    parser.add_argument('--latency', type=float, default=0.01, help='Mesh 訊息延遲 (秒)')
+    parser.add_argument('--jitter', type=float, default=0.005, help='額外隨機延遲上限 (秒)')
+    parser.add_argument('--loss', type=float, default=0.0, help='Mesh 訊息遺失率 (0-1)')
+    parser.add_argument('--seed', type=int, default=1, help='隨機數種子')
+    parser.add_argument('--output', help='將 JSON 結果寫入檔案')
+    parser.add_argument('--json', action='store_true', help='輸出 JSON')
+    args = parser.parse_args()
+
+    # 遺失率大於 0 時逾時警告很多，只保留錯誤
+    logging.basicConfig(level=logging.ERROR)
+    fleets = [int(size) for size in args.fleets.split(',') if size]
+    result = run(fleets, args.operations, args.provision_sample, args.scan_time,
+                 args.latency, args.jitter, args.loss, args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    if args.json:
+        print(json.dumps(result))
+        return
+    for fleet in result["fleets"]:
+        print(f"節點數 {fleet['fleet_size']}: 掃描 {fleet['scan']['seconds']:.2f} 秒發現 "
+              f"{fleet['scan']['discovered']} 個，掃描到綁定 {fleet['scan_to_bind_ms'] or 0:.0f} ms，"
+              f"每節點配置 {fleet['provision']['per_node_ms']:.0f} ms")
+        for name in ("send_datatrans", "read_air_box_data", "control_device"):
+            stats = fleet[name]
+            print(f"  {name:<18} {stats['ops_per_sec']:>8.1f} ops/sec  p50 {stats['p50_ms']:>7.1f} ms  "
+                  f"p99 {stats['p99_ms']:>7.1f} ms  錯誤 {stats['errors']}")
+
+
+if __name__ == "__main__":
+    main()
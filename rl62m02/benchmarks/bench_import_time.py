@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+套件載入時間基準測試
+以 python -X importtime 在新的直譯器中導入各目標，統計累計導入時間、載入的模組數與最慢的模組，
+並量測 rl62m02 --help 的整體執行時間；--max-ms 可作為啟動時間退化的檢查門檻
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+# 預設量測的導入目標
+DEFAULT_TARGETS = ("rl62m02", "rl62m02.cli", "rl62m02.provisioner", "rl62m02.device_manager")
+
+_PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _environment() -> Dict[str, str]:
+    """子行程環境: 確保導入的是這份原始碼"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [_PACKAGE_PARENT, env.get("PYTHONPATH")]))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int, int]]:
+    """
+    解析 -X importtime 輸出
+
+    Args:
+        output (str): 子行程的標準錯誤輸出
+
+    Returns:
+        list: [(模組名稱, 自身時間 us, 累計時間 us, 巢狀深度), ...]，依導入完成順序
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        entries.append((name.strip(), self_us, cumulative_us, depth))
+    return entries
+
+
+def _importtime(code: str) -> List[Tuple[str, int, int, int]]:
+    """在新的直譯器中以 -X importtime 執行 code"""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=_environment(),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"執行 {code!r} 失敗:\n{completed.stderr[-2000:]}")
+    return parse_importtime(completed.stderr)
+
+
+def measure_import(target: str, repeat: int = 5, top: int = 10) -> Dict:
+    """
+    在新的直譯器中重複導入 target
+
+    Args:
+        target (str): 模組名稱
+        repeat (int): 重複次數，取中位數
+        top (int): 列出累計時間最長的模組數
+
+    Returns:
+        dict: {'target', 'median_ms', 'min_ms', 'modules', 'package_modules', 'slowest'}；
+              時間與模組數不含直譯器啟動時已導入的模組
+    """
+    # 直譯器啟動時就會導入的模組 (site 等) 不屬於目標的成本
+    startup = {name for name, _, _, _ in _importtime("pass")}
+    totals = []
+    entries = []
+    for _ in range(repeat):
+        entries = [entry for entry in _importtime(f"import {target}") if entry[0] not in startup]
+        totals.append(sum(cumulative for _, _, cumulative, depth in entries if depth == 0))
+    slowest = sorted(((name, cumulative) for name, _, cumulative, _ in entries if name != target),
+                     key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "target": target,
+        "median_ms": statistics.median(totals) / 1000,
+        "min_ms": min(totals) / 1000,
+        "modules": len({name for name, _, _, _ in entries}),
+        "package_modules": sorted({name for name, _, _, _ in entries if name.startswith("rl62m02")}),
+        "slowest": [{"module": name, "cumulative_ms": cumulative / 1000} for name, cumulative in slowest],
+    }
+
+
+def measure_command(argv: List[str], repeat: int = 5) -> Dict:
+    """量測一個命令的整體執行時間 (含直譯器啟動)"""
+    env = _environment()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *argv], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - started)
+    return {"command": " ".join(["python", *argv]), "median_ms": statistics.median(samples) * 1000,
+            "min_ms": min(samples) * 1000}
+
+
+def run(targets=DEFAULT_TARGETS, repeat: int = 5, top: int = 10):
+    """
+    執行基準測試
+
+    Returns:
+        dict: 測試結果，imports 為各目標的導入時間，commands 為命令的整體執行時間
+    """
+    return {
+        "benchmark": "import_time",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "repeat": repeat,
+        "imports": [measure_import(target, repeat, top) for target in targets],
+        "commands": [measure_command(["-c", "pass"], repeat),
+                     measure_command(["-m", "rl62m02.cli", "--help"], repeat)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='rl62m02 套件載入時間基準測試 (python -X importtime)')
+    parser.add_argument('--targets', default=','.join(DEFAULT_TARGETS), help='以逗號分隔的導入目標')
+    parser.add_argument('--repeat', type=int, default=5, help='每個目標重複的次數 (取中位數)')
+    parser.add_argument('--top', type=int, default=10, help='列出累計時間最長的模組數')
+    parser.add_argument('--max-ms', type=float, help='任一目標的導入時間中位數超過此值時以狀態碼 1 結束')
+    parser.add_argument('--json', action='store_true', help='輸出 JSON')
+    args = parser.parse_args()
+
+    targets = [target for target in args.targets.split(',') if target]
+    result = run(targets, args.repeat, args.top)
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for item in result["imports"]:
+            print(f"import {item['target']:<24} {item['median_ms']:>7.1f} ms (最小 {item['min_ms']:.1f} ms)  "
+                  f"{item['modules']} 個模組，套件模組: {', '.join(item['package_modules']) or '-'}")
+            for slow in item["slowest"][:5]:
+                print(f"    {slow['module']:<40} {slow['cumulative_ms']:>7.1f} ms")
+        for command in result["commands"]:
+            print(f"{command['command']:<40} {command['median_ms']:>7.1f} ms (最小 {command['min_ms']:.1f} ms)")
+    if args.max_ms is not None:
+        slow = [item["target"] for item in result["imports"] if item["median_ms"] > args.max_ms]
+        if slow:
+            print(f"導入時間超過 {args.max_ms} ms: {', '.join(slow)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
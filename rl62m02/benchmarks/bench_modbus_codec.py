@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Modbus RTU 編解碼基準測試
+量測各功能碼請求編碼與回應解析的每秒訊框數，以及批次編碼與建立 ModbusRTU 實例的成本
+"""
+
+import argparse
+import json
+import time
+
+from ..modbus import ModbusRTU, ModbusRTUFrameParser, registers_to_float32
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 為選用依賴
+    np = None
+
+
+def _rate(func, count: int) -> float:
+    """執行 func(count 次) 並返回每秒次數"""
+    started = time.perf_counter()
+    func(count)
+    elapsed = time.perf_counter() - started
+    return count / elapsed if elapsed > 0 else float("inf")
+
+
+def run(frames: int = 50000, registers: int = 60):
+    """
+    執行基準測試
+
+    Args:
+        frames (int): 每項測試編碼或解析的訊框數
+        registers (int): 多寄存器寫入與讀取回應的寄存器數量
+
+    Returns:
+        dict: 測試結果 (frames/sec)
+    """
+    modbus = ModbusRTU()
+    values = list(range(registers))
+    read_response = modbus.create_rtu_packet(1, ModbusRTU.READ_HOLDING_REGISTERS,
+                                             bytes([registers * 2]) + bytes(range(registers * 2)))
+    input_response = modbus.create_rtu_packet(1, ModbusRTU.READ_INPUT_REGISTERS,
+                                              bytes([registers * 2]) + bytes(range(registers * 2)))
+    coil_response = modbus.create_rtu_packet(1, ModbusRTU.READ_COILS, bytes([2, 0xA5, 0x3C]))
+    discrete_response = modbus.create_rtu_packet(1, ModbusRTU.READ_DISCRETE_INPUTS, bytes([2, 0x5A, 0xC3]))
+    coils = [bool(i & 1) for i in range(registers)]
+    # 寫入回應回傳地址與值 (FC05 / FC06) 或地址與數量 (FC0F / FC10)
+    write_coil_response = modbus.create_rtu_packet(1, ModbusRTU.WRITE_SINGLE_COIL, bytes([0, 1, 0xFF, 0]))
+    write_register_response = modbus.create_rtu_packet(1, ModbusRTU.WRITE_SINGLE_REGISTER, bytes([0, 1, 0, 42]))
+    write_coils_response = modbus.create_rtu_packet(1, ModbusRTU.WRITE_MULTIPLE_COILS,
+                                                    bytes([0, 1, 0, registers]))
+    write_registers_response = modbus.create_rtu_packet(1, ModbusRTU.WRITE_MULTIPLE_REGISTERS,
+                                                        bytes([0, 1, 0, registers]))
+
+    def loop(build):
+        def body(count):
+            for i in range(count):
+                build(i & 0xFF)
+        return body
+
+    encode = {
+        "fc01_read_coils": loop(lambda i: modbus.read_coils_request(1, i, 16)),
+        "fc02_read_discrete": loop(lambda i: modbus.read_discrete_inputs_request(1, i, 16)),
+        "fc03_read_holding": loop(lambda i: modbus.read_holding_registers_request(1, i, 6)),
+        "fc04_read_input": loop(lambda i: modbus.read_input_registers_request(1, i, 6)),
+        "fc05_write_coil": loop(lambda i: modbus.write_single_coil_request(1, i, True)),
+        "fc06_write_register": loop(lambda i: modbus.write_single_register_request(1, i, i)),
+        "fc0f_write_coils": loop(lambda i: modbus.write_multiple_coils_request(1, i, coils)),
+        "fc10_write_registers": loop(lambda i: modbus.write_multiple_registers_request(1, i, values)),
+    }
+    decode = {
+        "fc01_read_coils": loop(lambda i: modbus.read_coils_response(coil_response)),
+        "fc02_read_discrete": loop(lambda i: modbus.read_discrete_inputs_response(discrete_response)),
+        "fc03_read_holding": loop(lambda i: modbus.read_holding_registers_response(read_response)),
+        "fc04_read_input": loop(lambda i: modbus.read_input_registers_response(input_response)),
+        "fc05_write_coil": loop(lambda i: modbus.write_single_coil_response(write_coil_response)),
+        "fc06_write_register": loop(lambda i: modbus.write_single_register_response(write_register_response)),
+        "fc0f_write_coils": loop(lambda i: modbus.write_multiple_coils_response(write_coils_response)),
+        "fc10_write_registers": loop(lambda i: modbus.write_multiple_registers_response(write_registers_response)),
+        "fc03_register_block": loop(lambda i: modbus.decode_register_block(read_response)),
+        "fc03_float32_pairs": loop(lambda i: registers_to_float32(modbus.decode_register_block(read_response))),
+        "parse_rtu_packet": loop(lambda i: modbus.parse_rtu_packet(read_response)),
+    }
+    if np is not None:
+        decode["fc03_register_block_numpy"] = loop(lambda i: modbus.decode_register_block(read_response, True))
+
+    def stream_parse(count):
+        # 以 MDTG 訊框大小 (17 bytes) 分段輸入連續的回應
+        stream = read_response * 100
+        chunks = [stream[i:i + 17] for i in range(0, len(stream), 17)]
+        parser = ModbusRTUFrameParser()
+        for _ in range(count // 100):
+            for chunk in chunks:
+                parser.feed(chunk)
+
+    buffer = bytearray()
+    batch = [(1, ModbusRTU.READ_HOLDING_REGISTERS, i & 0xFF, 6) for i in range(1000)]
+
+    def batch_encode(count):
+        for _ in range(count // len(batch)):
+            modbus.encode_requests(batch, buffer)
+
+    def batch_decode(count):
+        packets = [read_response] * 1000
+        for _ in range(count // len(packets)):
+            modbus.decode_responses(packets)
+
+    return {
+        "benchmark": "modbus_codec",
+        "frames": frames,
+        "registers": registers,
+        "encode_fps": {name: _rate(func, frames) for name, func in encode.items()},
+        "decode_fps": {name: _rate(func, frames) for name, func in decode.items()},
+        "batch_encode_fps": _rate(batch_encode, frames),
+        "batch_decode_fps": _rate(batch_decode, frames),
+        "stream_parse_fps": _rate(stream_parse, frames),
+        "instances_per_sec": _rate(loop(lambda i: ModbusRTU()), frames // 10),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Modbus RTU 編解碼基準測試')
+    parser.add_argument('--frames', type=int, default=50000, help='每項測試的訊框數')
+    parser.add_argument('--registers', type=int, default=60, help='多寄存器測試的寄存器數量')
+    parser.add_argument('--json', action='store_true', help='輸出 JSON')
+    args = parser.parse_args()
+
+    result = run(args.frames, args.registers)
+    if args.json:
+        print(json.dumps(result))
+        return
+    print("編碼 (frames/sec):")
+    for name, rate in result["encode_fps"].items():
+        print(f"  {name:<26} {rate:>12,.0f}")
+    print("解析 (frames/sec):")
+    for name, rate in result["decode_fps"].items():
+        print(f"  {name:<26} {rate:>12,.0f}")
+    print(f"批次編碼: {result['batch_encode_fps']:,.0f} frames/sec")
+    print(f"批次解析: {result['batch_decode_fps']:,.0f} frames/sec")
+    print(f"串流解析 (17 bytes 分段): {result['stream_parse_fps']:,.0f} frames/sec")
+    print(f"建立 ModbusRTU 實例: {result['instances_per_sec']:,.0f} 次/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多 dongle 集區基準測試
+以數個共用同一個 VirtualMesh 的模擬 dongle 組成 ProvisionerPool，多個執行緒同時對所有節點發送命令，
+量測 dongle 數量增加時的每秒命令數與 p50 / p99 往返時間；故障轉移測試在半途讓一個 dongle 停止回應，
+統計失敗的命令數與改用其他 dongle 的次數
+
+模擬的 dongle 之間不共用無線頻道，結果是集區排程的上限而非實際 Mesh 網路的擴展性
+"""
+
+import json
+import time
+import logging
+import argparse
+import platform
+import threading
+from typing import Dict, List
+
+from ..serial_at import SerialAT
+from ..pool import ProvisionerPool
+from ..simulator import SimulatedDongle, VirtualMesh
+from .bench_e2e import RGB_COMMAND, _summary
+
+
+def _succeeded(response) -> bool:
+    return bool(response) and "SUCCESS" in response
+
+
+def _drive(pool: ProvisionerPool, addresses: List[str], operations: int, workers: int,
+           on_progress=None) -> Dict[str, float]:
+    """
+    以 workers 個執行緒平均分攤 operations 個 send_datatrans
+
+    Args:
+        on_progress (callable, optional): 完成的操作數達到一半時呼叫一次
+    """
+    samples = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(operations))
+    halfway = operations // 2
+
+    def worker():
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                return
+            if index == halfway and on_progress is not None:
+                on_progress()
+            begin = time.perf_counter()
+            response = pool.send_datatrans(addresses[index % len(addresses)], RGB_COMMAND)
+            elapsed = time.perf_counter() - begin
+            with lock:
+                if _succeeded(response):
+                    samples.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return _summary(samples, errors[0], time.perf_counter() - started)
+
+
+def run_pool(dongles: int, nodes: int = 64, operations: int = 200, concurrency: int = 2,
+             routing: str = "shard", fail_one: bool = False, latency: float = 0.01,
+             jitter: float = 0.005, seed: int = 1) -> Dict:
+    """
+    以指定數量的模擬 dongle 執行一輪測試
+
+    Args:
+        dongles (int): 模擬 dongle 數量
+        nodes (int): 虛擬節點數量 (預先配置並綁定)
+        operations (int): send_datatrans 的總次數
+        concurrency (int): 每個 dongle 對應的執行緒數
+        routing (str): 集區分派方式 ('shard' 或 'least_loaded')
+        fail_one (bool): 完成一半操作時讓最後一個 dongle 停止回應
+        latency (float): Mesh 訊息延遲 (秒)
+        jitter (float): 額外隨機延遲上限 (秒)
+        seed (int): 隨機數種子
+
+    Returns:
+        dict: 此 dongle 數量的測試結果
+    """
+    mesh = VirtualMesh(nodes, latency=latency, jitter=jitter, provisioned=True, seed=seed)
+    addresses = [node.address for node in mesh.nodes]
+    simulated = [SimulatedDongle(mesh, mac=f"6556000000{index:02X}") for index in range(dongles)]
+    serial_ats = []
+    try:
+        serial_ats = [SerialAT(dongle.port) for dongle in simulated]
+        with ProvisionerPool(serial_ats=serial_ats, routing=routing) as pool:
+            def fail():
+                simulated[-1].responsive = False
+
+            stats = _drive(pool, addresses, operations, dongles * concurrency,
+                           fail if fail_one and dongles > 1 else None)
+            status = pool.status()
+        return {
+            "dongles": dongles,
+            "routing": routing,
+            "failed_dongle": fail_one and dongles > 1,
+            "send_datatrans": stats,
+            "members": [{"requests": member["requests"], "healthy": member["healthy"],
+                         "failovers": member["failovers"]} for member in status["members"]],
+        }
+    finally:
+        for serial_at in serial_ats:
+            serial_at.close()
+        for dongle in simulated:
+            dongle.close()
+
+
+def run(dongle_counts=(1, 2, 4), nodes: int = 64, operations: int = 200, concurrency: int = 2,
+        routing: str = "shard", failover: bool = True, latency: float = 0.01, jitter: float = 0.005,
+        seed: int = 1):
+    """
+    執行基準測試
+
+    Returns:
+        dict: 測試結果，scaling 為各 dongle 數量的結果，failover 為最多 dongle 時的故障轉移結果
+    """
+    config = {"nodes": nodes, "operations": operations, "concurrency": concurrency, "routing": routing,
+              "latency": latency, "jitter": jitter, "seed": seed}
+    result = {
+        "benchmark": "pool",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "scaling": [run_pool(count, **config) for count in dongle_counts],
+    }
+    if failover and max(dongle_counts) > 1:
+        result["failover"] = run_pool(max(dongle_counts), fail_one=True, **config)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多 dongle 集區基準測試 (使用模擬 dongle)')
+    parser.add_argument('--dongles', default='1,2,4', help='以逗號分隔的 dongle 數量')
+    parser.add_argument('--nodes', type=int, default=64, help='虛擬節點數量')
+    parser.add_argument('--operations', type=int, default=200, help='每輪 send_datatrans 的總次數')
+    parser.add_argument('--concurrency', type=int, default=2, help='每個 dongle 對應的執行緒數')
+    parser.add_argument('--routing', choices=ProvisionerPool.ROUTING_MODES, default='shard', help='分派方式')
+    parser.add_argument('--no-failover', action='store_true', help='略過故障轉移測試')
+    parser.add_argument('--latency', type=float, default=0.01, help='Mesh 訊息延遲 (秒)')
+    parser.add_argument('--jitter', type=float, default=0.005, help='額外隨機延遲上限 (秒)')
+    parser.add_argument('--seed', type=int, default=1, help='隨機數種子')
+    parser.add_argument('--json', action='store_true', help='輸出 JSON')
+    args = parser.parse_args()
+
+    # 故障轉移測試會產生逾時警告，只保留錯誤
+    logging.basicConfig(level=logging.ERROR)
+    counts = [int(count) for count in args.dongles.split(',') if count]
+    result = run(counts, args.nodes, args.operations, args.concurrency, args.routing, not args.no_failover,
+                 args.latency, args.jitter, args.seed)
+    if args.json:
+        print(json.dumps(result))
+        return
+    baseline = result["scaling"][0]["send_datatrans"]["ops_per_sec"] if result["scaling"] else 0.0
+    for item in result["scaling"] + ([result["failover"]] if "failover" in result else []):
+        stats = item["send_datatrans"]
+        label = f"{item['dongles']} 個 dongle" + (" (半途故障一個)" if item["failed_dongle"] else "")
+        speedup = stats["ops_per_sec"] / baseline if baseline else 0.0
+        print(f"{label:<22} {stats['ops_per_sec']:>7.1f} ops/sec (x{speedup:.2f})  p50 {stats['p50_ms']:>7.1f} ms  "
+              f"p99 {stats['p99_ms']:>7.1f} ms  錯誤 {stats['errors']}  "
+              f"分派 {[member['requests'] for member in item['members']]}  "
+              f"故障轉移 {sum(member['failovers'] for member in item['members'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+寄存器對應表解碼基準測試
+比較原本以十六進位字串切片解析 Air-Box / 電錶回應，與編譯後的 struct 解碼的速度
+"""
+
+import argparse
+import json
+import time
+
+from ..register_map import get_register_map
+
+# 實際的 MDTG-MSG 資料 (8276 02 頭部 + RTU 回應)
+AIR_BOX_HEX = "82760201040C00F902C1000B0000000001ECFEAA"
+POWER_METER_HEX = "8276020103080899 04D2 0000 022B 0000".replace(" ", "")
+
+
+def _slice_air_box(data_hex: str):
+    """原本 read_air_box_data 的字串切片解析"""
+    return {
+        "temperature": int(data_hex[12:16], 16) / 10.0,
+        "humidity": int(data_hex[16:20], 16) / 10.0,
+        "pm25": int(data_hex[20:24], 16),
+        "co2": int(data_hex[32:36], 16),
+    }
+
+
+def _slice_power_meter(data_hex: str):
+    """原本 read_power_meter_data 的字串切片解析"""
+    return {
+        "voltage": int(data_hex[12:16], 16) / 10.0,
+        "current": int(data_hex[16:20], 16) / 1000.0,
+        "power": int(data_hex[24:28], 16) / 10.0,
+    }
+
+
+def _measure(func, arg, iterations: int) -> float:
+    """返回每次呼叫的平均微秒數"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func(arg)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def run(iterations: int = 200000):
+    """
+    執行基準測試
+
+    Args:
+        iterations (int): 每種解碼方式的重複次數
+
+    Returns:
+        dict: 測試結果
+    """
+    cases = [
+        ("air_box", AIR_BOX_HEX, _slice_air_box),
+        ("power_meter", POWER_METER_HEX, _slice_power_meter),
+    ]
+    results = {}
+    for model, data_hex, legacy in cases:
+        register_map = get_register_map(model)
+        frame = bytes.fromhex(data_hex[6:])
+        payload = frame[3:3 + frame[2]]
+        assert register_map.decode(payload) == legacy(data_hex)
+        legacy_us = _measure(legacy, data_hex, iterations)
+        # 控制器的 _extract_rtu_frame 已將回應轉成位元組，解碼只需處理資料部分
+        compiled_us = _measure(register_map.decode, payload, iterations)
+        # 另計包含十六進位字串轉換的成本，作為最差情況的比較
+        from_hex_us = _measure(lambda h: register_map.decode(bytes.fromhex(h[12:])), data_hex, iterations)
+        results[model] = {
+            "string_slicing_us": legacy_us,
+            "struct_decode_us": compiled_us,
+            "struct_decode_from_hex_us": from_hex_us,
+            "speedup": legacy_us / compiled_us,
+        }
+    return {"benchmark": "register_map", "iterations": iterations, "models": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='寄存器對應表解碼基準測試')
+    parser.add_argument('--iterations', type=int, default=200000, help='重複次數')
+    parser.add_argument('--json', action='store_true', help='輸出 JSON')
+    args = parser.parse_args()
+
+    result = run(args.iterations)
+    if args.json:
+        print(json.dumps(result))
+        return
+    for model, stats in result["models"].items():
+        print(f"{model}: 字串切片 {stats['string_slicing_us']:.2f} µs，"
+              f"struct 解碼 {stats['struct_decode_us']:.2f} µs ({stats['speedup']:.1f}x)，"
+              f"含十六進位轉換 {stats['struct_decode_from_hex_us']:.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
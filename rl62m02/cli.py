@@ -12,22 +12,10 @@ import sys
 import os
 import json
 
-# 統一導入方式，不再區分直接執行和作為模組導入
-try:
-    # 優先從包內導入
-    from .serial_at import SerialAT
-    from .provisioner import Provisioner
-    from .device_manager import MeshDeviceManager
-    from .controllers.mesh_controller import RLMeshDeviceController
-except ImportError:
-    # 作為腳本直接執行時的導入方式
-    parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    sys.path.insert(0, parent_dir)
-    
-    from rl62m02.serial_at import SerialAT
-    from rl62m02.provisioner import Provisioner
-    from rl62m02.device_manager import MeshDeviceManager
-    from rl62m02.controllers.mesh_controller import RLMeshDeviceController
+# 子模組在各命令處理函數中才導入，--help 與單一命令只載入需要的模組
+if not __package__:
+    # 作為腳本直接執行時，讓 rl62m02 套件可被導入
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 def setup_logger():
     """設置日誌紀錄器"""
@@ -36,11 +24,41 @@ def setup_logger():
         format='[%(levelname)s][%(module)s:%(lineno)d] %(message)s'
     )
 
+def open_serial(args):
+    """開啟串口，指定 --record 時同時錄製收發內容"""
+    from rl62m02.serial_at import SerialAT
+    return SerialAT(args.port, args.baudrate, record_path=getattr(args, 'record', None))
+
+def open_session(args, with_manager=True):
+    """
+    取得 (連線, Provisioner, MeshDeviceManager)
+
+    指定 --socket 時連線到常駐閘道 (rl62m02 daemon)，返回的物件以相同的方法名稱轉送到閘道；
+    否則開啟串口並在本機建立物件。連線以 close() 關閉
+    """
+    from rl62m02.provisioner import Provisioner
+    from rl62m02.device_manager import MeshDeviceManager
+    from rl62m02.controllers.mesh_controller import RLMeshDeviceController
+    
+    if args.socket:
+        from rl62m02.gateway import GatewayClient
+        client = GatewayClient(args.socket)
+        return client, client.provisioner, client.device_manager
+    if not args.port:
+        raise SystemExit("請指定串口名稱，或以 --socket 連線到常駐閘道")
+    ser = open_serial(args)
+    try:
+        prov = Provisioner(ser)
+        device_manager = MeshDeviceManager(prov, RLMeshDeviceController(prov), args.device_file) if with_manager else None
+    except Exception:
+        ser.close()
+        raise
+    return ser, prov, device_manager
+
 def scan_devices(args):
     """掃描設備命令處理"""
     try:
-        ser = SerialAT(args.port, args.baudrate)
-        prov = Provisioner(ser)
+        ser, prov, _ = open_session(args, with_manager=False)
         
         print(f"掃描 {args.time} 秒...")
         devices = prov.scan_nodes(scan_time=args.time)
@@ -54,10 +72,7 @@ def scan_devices(args):
 def provision_device(args):
     """綁定設備命令處理"""
     try:
-        ser = SerialAT(args.port, args.baudrate)
-        prov = Provisioner(ser)
-        controller = RLMeshDeviceController(prov)
-        device_manager = MeshDeviceManager(prov, controller, args.device_file)
+        ser, prov, device_manager = open_session(args)
         
         if args.scan:
             print(f"掃描設備中...")
@@ -109,10 +124,7 @@ def provision_device(args):
 def unprovision_device(args):
     """解綁設備命令處理"""
     try:
-        ser = SerialAT(args.port, args.baudrate)
-        prov = Provisioner(ser)
-        controller = RLMeshDeviceController(prov)
-        device_manager = MeshDeviceManager(prov, controller, args.device_file)
+        ser, prov, device_manager = open_session(args)
         
         if args.list:
             devices = device_manager.get_all_devices()
@@ -142,11 +154,14 @@ def unprovision_device(args):
 
 def list_devices(args):
     """列出已綁定設備命令處理"""
-    ser = SerialAT(args.port, args.baudrate)
-    prov = Provisioner(ser)
-    controller = RLMeshDeviceController(prov)
-    device_manager = MeshDeviceManager(prov, controller, args.device_file)
-    
+    ser, prov, device_manager = open_session(args)
+    try:
+        list_device_info(device_manager, args)
+    finally:
+        ser.close()
+
+def list_device_info(device_manager, args):
+    """顯示設備列表與群組信息"""
     # 直接使用 display_devices 方法顯示格式化的設備列表
     devices_info = device_manager.display_devices()
     print(devices_info)
@@ -179,11 +194,11 @@ def list_devices(args):
 
 def control_device(args):
     """控制設備命令處理"""
+    if args.socket and args.port and not args.command:
+        # 使用 --socket 時沒有串口參數，第一個位置參數是控制命令
+        args.command, args.port = args.port, None
     try:
-        ser = SerialAT(args.port, args.baudrate)
-        prov = Provisioner(ser)
-        controller = RLMeshDeviceController(prov)
-        device_manager = MeshDeviceManager(prov, controller, args.device_file)
+        ser, prov, device_manager = open_session(args)
         
         # 選擇控制的設備
         if args.addr:
@@ -276,24 +291,168 @@ def control_device(args):
         if 'ser' in locals():
             ser.close()
 
+def apply_config(args):
+    """套用宣告式設定檔命令處理"""
+    from rl62m02.provisioner import Provisioner
+    from rl62m02.device_manager import MeshDeviceManager
+    from rl62m02.controllers.mesh_controller import RLMeshDeviceController
+    from rl62m02.mesh_config import MeshConfigApplier
+    
+    ser = None
+    try:
+        if args.port:
+            ser = open_serial(args)
+            prov = Provisioner(ser)
+        elif args.dry_run:
+            # dry-run 只比較設定與設備記錄，不需要連接設備
+            prov = None
+        else:
+            print("套用設定需要指定串口，或使用 --dry-run 僅顯示計畫")
+            return
+        device_manager = MeshDeviceManager(prov, RLMeshDeviceController(prov), args.device_file)
+        applier = MeshConfigApplier.from_file(device_manager, args.config)
+        result = applier.apply(dry_run=args.dry_run, verify_nodes=args.verify_nodes)
+        
+        print(f"計畫步驟 ({len(result['steps'])}):")
+        for i, step in enumerate(result['steps']):
+            status = f" [{step['status']}]" if 'status' in step else ""
+            print(f"{i+1}. {step['action']} {step['device']}: {step['command'] or step.get('changes')}{status}")
+        for error in result['errors']:
+            print(f"錯誤: {error['device']} - {error['error']}")
+        for item in result['extra']:
+            print(f"設定以外的訂閱: {item['device']} - {item['subscribe']}")
+        print(f"結果: {result['result']}，發送 {result['sent_commands']} 個 AT 步驟")
+    finally:
+        if ser:
+            ser.close()
+
+def modbus_tcp_gateway(args):
+    """Modbus TCP 閘道命令處理"""
+    import asyncio
+    from rl62m02.provisioner import Provisioner
+    from rl62m02.controllers.mesh_controller import RLMeshDeviceController
+    from rl62m02.modbus_tcp import ModbusTCPGateway, parse_unit_map
+    
+    try:
+        unit_map = parse_unit_map(args.map)
+    except ValueError as e:
+        print(e)
+        return
+    if not unit_map:
+        print("請以 --map unit=unicast:slave 指定至少一個 unit 對應")
+        return
+    
+    ser = None
+    try:
+        ser = open_serial(args)
+        prov = Provisioner(ser)
+        controller = RLMeshDeviceController(prov)
+        gateway = ModbusTCPGateway.from_controller(controller, unit_map, host=args.host, port=args.listen_port,
+                                                   cache_ttl=args.cache_ttl)
+        for unit_id, (unicast_addr, slave_address) in sorted(unit_map.items()):
+            print(f"unit {unit_id} -> Smart-Box {unicast_addr} 從站 {slave_address}")
+        print(f"Modbus TCP 閘道監聽於 {args.host}:{args.listen_port} (Ctrl+C 結束)")
+        asyncio.run(gateway.serve_forever())
+    except KeyboardInterrupt:
+        print("閘道已停止")
+    finally:
+        if ser:
+            ser.close()
+
+def run_daemon(args):
+    """常駐閘道命令處理"""
+    import asyncio
+    import signal
+    from rl62m02.gateway import DEFAULT_SOCKET_PATH, GatewayServer, MeshGateway
+    
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    
+    # 以 SIGTERM 停止時同樣清除 socket 檔案並關閉串口
+    signal.signal(signal.SIGTERM, stop)
+    socket_path = args.socket or DEFAULT_SOCKET_PATH
+    gateway = MeshGateway(args.port, args.baudrate, args.device_file, record_path=args.record)
+    try:
+        gateway.open()
+        server = GatewayServer(gateway, socket_path)
+        print(f"閘道監聽於 {socket_path} (Ctrl+C 結束)，其他命令可加上 --socket {socket_path}")
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("閘道已停止")
+    except RuntimeError as e:
+        print(f"錯誤: {e}")
+    finally:
+        gateway.close()
+
+def run_api_server(args):
+    """REST / WebSocket API 伺服器命令處理"""
+    import asyncio
+    from rl62m02.gateway import MeshGateway
+    from rl62m02.api_server import MeshAPIServer
+    
+    gateway = MeshGateway(args.port, args.baudrate, args.device_file, record_path=args.record)
+    try:
+        gateway.open()
+        server = MeshAPIServer(gateway, args.host, args.listen_port, max_pending=args.max_pending)
+        print(f"API 伺服器監聽於 http://{args.host}:{args.listen_port} (Ctrl+C 結束)")
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("API 伺服器已停止")
+    finally:
+        gateway.close()
+
+def run_batch(args):
+    """批次腳本命令處理"""
+    from rl62m02.batch import BatchRunner
+    
+    variables = {}
+    for item in args.var:
+        name, sep, value = item.partition('=')
+        if not sep:
+            print(f"變數格式應為 NAME=VALUE: {item}")
+            sys.exit(2)
+        variables[name] = value
+    
+    script = sys.stdin if args.script == '-' else open(args.script, encoding='utf-8')
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    ser = None
+    try:
+        lines = script.readlines()
+        ser, prov, device_manager = open_session(args)
+        runner = BatchRunner(prov, device_manager, variables, keep_going=args.keep_going, output=output)
+        summary = runner.run(lines)
+        print(f"執行 {summary['executed']} 個命令，失敗 {summary['failed']} 個", file=sys.stderr)
+    finally:
+        if ser:
+            ser.close()
+        if script is not sys.stdin:
+            script.close()
+        if output is not sys.stdout:
+            output.close()
+    if summary['result'] != 'success':
+        sys.exit(1)
+
 def parse_args():
     """解析命令行參數"""
     parser = argparse.ArgumentParser(description='RL62M02 Mesh 設備管理工具')
     parser.add_argument('--debug', action='store_true', help='啟用調試模式')
     parser.add_argument('--device-file', default='mesh_devices.json', help='設備管理文件路徑')
+    parser.add_argument('--record', help='將 AT 收發內容錄製到記錄檔 (可用 session_log.ReplaySerialAT 重播)')
+    parser.add_argument('--trace', help='將操作追蹤 span 以 JSON Lines 寫入檔案')
+    parser.add_argument('--socket', help='連線到常駐閘道 (rl62m02 daemon) 的 socket，而不直接開啟串口；daemon 命令的監聽路徑 (預設為暫存目錄下的 rl62m02.sock)')
     
     subparsers = parser.add_subparsers(dest='command', help='可用命令')
     
     # 掃描設備
     scan_parser = subparsers.add_parser('scan', help='掃描周圍的 RL Mesh 設備')
-    scan_parser.add_argument('port', help='串口名稱，如 COM3')
+    scan_parser.add_argument('port', nargs='?', help='串口名稱，如 COM3 (使用 --socket 時省略)')
     scan_parser.add_argument('--baudrate', type=int, default=115200, help='串口鮑率')
     scan_parser.add_argument('--time', type=float, default=5.0, help='掃描時間，單位為秒')
     scan_parser.set_defaults(func=scan_devices)
     
     # 綁定設備
     bind_parser = subparsers.add_parser('bind', help='綁定新 RL Mesh 設備')
-    bind_parser.add_argument('port', help='串口名稱，如 COM3')
+    bind_parser.add_argument('port', nargs='?', help='串口名稱，如 COM3 (使用 --socket 時省略)')
     bind_parser.add_argument('--baudrate', type=int, default=115200, help='串口鮑率')
     bind_group = bind_parser.add_mutually_exclusive_group(required=True)
     bind_group.add_argument('--scan', action='store_true', help='掃描並選擇設備綁定')
@@ -305,7 +464,7 @@ def parse_args():
     
     # 解綁設備
     unbind_parser = subparsers.add_parser('unbind', help='解綁 RL Mesh 設備')
-    unbind_parser.add_argument('port', help='串口名稱，如 COM3')
+    unbind_parser.add_argument('port', nargs='?', help='串口名稱，如 COM3 (使用 --socket 時省略)')
     unbind_parser.add_argument('--baudrate', type=int, default=115200, help='串口鮑率')
     unbind_group = unbind_parser.add_mutually_exclusive_group(required=True)
     unbind_group.add_argument('--list', action='store_true', help='列出並選擇設備解綁')
@@ -315,13 +474,13 @@ def parse_args():
     # 列出設備
     list_parser = subparsers.add_parser('list', help='列出已綁定的 RL Mesh 設備')
     list_parser.add_argument('--groups', action='store_true', help='同時顯示群組信息')
-    list_parser.add_argument('port', help='串口名稱，如 COM3')
+    list_parser.add_argument('port', nargs='?', help='串口名稱，如 COM3 (使用 --socket 時省略)')
     list_parser.add_argument('--baudrate', type=int, default=115200, help='串口鮑率')
     list_parser.set_defaults(func=list_devices)
     
     # 控制設備
     control_parser = subparsers.add_parser('control', help='控制 RL Mesh 設備')
-    control_parser.add_argument('port', help='串口名稱，如 COM3')
+    control_parser.add_argument('port', nargs='?', help='串口名稱，如 COM3 (使用 --socket 時省略)')
     control_parser.add_argument('--baudrate', type=int, default=115200, help='串口鮑率')
     control_parser.add_argument('--addr', help='設備地址')
     control_parser.add_argument('command', nargs='?', help='控制命令')
@@ -332,6 +491,50 @@ def parse_args():
     control_parser.add_argument('--reg_value', type=int, help='寄存器/線圈值')
     control_parser.set_defaults(func=control_device)
     
+    # 套用宣告式設定
+    apply_parser = subparsers.add_parser('apply', help='套用宣告式設定檔，只發送收斂所需的命令')
+    apply_parser.add_argument('config', help='期望狀態設定檔 (JSON)')
+    apply_parser.add_argument('port', nargs='?', help='串口名稱，如 COM3 (--dry-run 時可省略)')
+    apply_parser.add_argument('--baudrate', type=int, default=115200, help='串口鮑率')
+    apply_parser.add_argument('--dry-run', action='store_true', help='只顯示計畫，不發送命令')
+    apply_parser.add_argument('--verify-nodes', action='store_true', help='以 AT+NL 確認節點是否仍存在')
+    apply_parser.set_defaults(func=apply_config)
+    
+    # Modbus TCP 閘道
+    tcp_parser = subparsers.add_parser('modbus-tcp', help='啟動 Modbus TCP 閘道，將請求轉送到 Smart-Box')
+    tcp_parser.add_argument('port', help='串口名稱，如 COM3')
+    tcp_parser.add_argument('--baudrate', type=int, default=115200, help='串口鮑率')
+    tcp_parser.add_argument('--map', action='append', default=[], help='unit id 對應，格式 unit=unicast:slave (可重複)')
+    tcp_parser.add_argument('--host', default='0.0.0.0', help='監聽地址')
+    tcp_parser.add_argument('--listen-port', type=int, default=502, help='監聽埠')
+    tcp_parser.add_argument('--cache-ttl', type=float, default=0.5, help='讀取回應快取秒數')
+    tcp_parser.set_defaults(func=modbus_tcp_gateway)
+    
+    # 常駐閘道
+    daemon_parser = subparsers.add_parser('daemon', help='啟動常駐閘道，持有串口並以 Unix socket 接受其他命令 (搭配 --socket)')
+    daemon_parser.add_argument('port', help='串口名稱，如 /dev/ttyUSB0')
+    daemon_parser.add_argument('--baudrate', type=int, default=115200, help='串口鮑率')
+    daemon_parser.set_defaults(func=run_daemon)
+    
+    # REST / WebSocket API
+    api_parser = subparsers.add_parser('api', help='啟動 REST / WebSocket API 伺服器')
+    api_parser.add_argument('port', help='串口名稱，如 COM3')
+    api_parser.add_argument('--baudrate', type=int, default=115200, help='串口鮑率')
+    api_parser.add_argument('--host', default='127.0.0.1', help='監聽地址')
+    api_parser.add_argument('--listen-port', type=int, default=8080, help='監聽埠')
+    api_parser.add_argument('--max-pending', type=int, default=16, help='同時等待 dongle 的請求上限，超過時回應 503')
+    api_parser.set_defaults(func=run_api_server)
+    
+    # 批次腳本
+    batch_parser = subparsers.add_parser('batch', help='在同一個連線中依序執行腳本中的命令，結果以 JSON Lines 輸出')
+    batch_parser.add_argument('script', help='腳本檔案，- 表示標準輸入')
+    batch_parser.add_argument('port', nargs='?', help='串口名稱，如 COM3 (使用 --socket 時省略)')
+    batch_parser.add_argument('--baudrate', type=int, default=115200, help='串口鮑率')
+    batch_parser.add_argument('--var', action='append', default=[], help='腳本變數 NAME=VALUE (可重複)')
+    batch_parser.add_argument('--keep-going', action='store_true', help='命令失敗時繼續執行後續命令')
+    batch_parser.add_argument('--output', help='將 JSON Lines 結果寫入檔案 (預設為標準輸出)')
+    batch_parser.set_defaults(func=run_batch)
+    
     return parser.parse_args()
 
 def main():
@@ -344,11 +547,20 @@ def main():
     else:
         logging.basicConfig(level=logging.INFO)
     
+    if args.trace:
+        from rl62m02.tracing import configure_tracing, JsonFileExporter
+        configure_tracing(JsonFileExporter(args.trace))
+    
     # 執行對應的命令處理函數
-    if hasattr(args, 'func'):
-        args.func(args)
-    else:
-        print("請指定操作命令，使用 --help 查看幫助")
+    try:
+        if hasattr(args, 'func'):
+            args.func(args)
+        else:
+            print("請指定操作命令，使用 --help 查看幫助")
+    finally:
+        if args.trace:
+            from rl62m02.tracing import disable_tracing
+            disable_tracing()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
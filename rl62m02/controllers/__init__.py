@@ -4,5 +4,6 @@ RL Mesh 設備控制器模塊。
 """
 
 from .mesh_controller import RLMeshDeviceController
+from .command_queue import CoalescingCommandQueue
 
-__all__ = ['RLMeshDeviceController']
\ No newline at end of file
+__all__ = ['RLMeshDeviceController', 'CoalescingCommandQueue']
\ No newline at end of file
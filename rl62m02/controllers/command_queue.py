@@ -0,0 +1,158 @@
+"""
+RL Mesh 控制命令合併佇列
+每個設備只保留最新一筆尚未送出的設定命令，舊的命令直接被取代，
+避免滑桿或自動化規則在短時間內送出大量命令塞滿 Mesh
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+
+
+class CoalescingCommandQueue:
+    """
+    最新狀態優先的控制命令佇列
+
+    - RGB LED 與插座的設定命令是冪等的，只有最後的狀態有意義
+    - 每個 (設備, 命令類型) 只保留一筆待送命令；新命令會取代舊命令，
+      被取代的命令以 {"result": "superseded"} 完成並計入 superseded
+    - 單一工作執行緒依設備先後順序送出命令，同一時間只有一個命令在等待 MDTS-MSG
+    - 收到 MDTS-MSG SUCCESS 的命令計入 sent，錯誤訊息、逾時或例外計入 failed
+    """
+
+    KIND_RGB_LED = "rgb_led"
+    KIND_PLUG = "plug"
+
+    def __init__(self, controller):
+        """
+        初始化命令佇列
+
+        Args:
+            controller (RLMeshDeviceController): 用於實際發送命令的控制器
+        """
+        self.controller = controller
+        # (unicast_addr, kind) -> (發送函數, 參數, Future)，依最早等待的順序排列
+        self._pending: "OrderedDict[Tuple[str, str], Tuple[Callable, tuple, Future]]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._busy = False
+        self.stats = {"submitted": 0, "sent": 0, "superseded": 0, "failed": 0}
+
+    def start(self):
+        """啟動工作執行緒"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="CoalescingCommandQueue", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """停止工作執行緒，尚未送出的命令以 {"result": "cancelled"} 完成"""
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+        with self._cond:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for _, _, future in pending:
+            future.set_result({"result": "cancelled"})
+
+    def _submit(self, unicast_addr: str, kind: str, func: Callable, args: tuple) -> Future:
+        """加入或取代一筆待送命令"""
+        future = Future()
+        key = (unicast_addr, kind)
+        with self._cond:
+            self.stats["submitted"] += 1
+            previous = self._pending.get(key)
+            if previous is not None:
+                # 保留原本的排隊位置，只替換內容
+                self.stats["superseded"] += 1
+                previous[2].set_result({"result": "superseded"})
+            self._pending[key] = (func, args, future)
+            self._cond.notify()
+        return future
+
+    def submit_rgb_led(self, unicast_addr: str, cold: int, warm: int, red: int, green: int, blue: int) -> Future:
+        """
+        提交 RGB LED 設定命令
+
+        Args:
+            unicast_addr (str): 設備的 unicast address
+            cold, warm, red, green, blue (int): 與 control_rgb_led 相同的亮度值 (0-255)
+
+        Returns:
+            Future: 結果為 control_rgb_led 的返回值，被取代時為 {"result": "superseded"}
+        """
+        return self._submit(unicast_addr, self.KIND_RGB_LED, self.controller.control_rgb_led,
+                            (unicast_addr, cold, warm, red, green, blue))
+
+    def submit_plug(self, unicast_addr: str, state: bool) -> Future:
+        """
+        提交插座開關命令
+
+        Args:
+            unicast_addr (str): 設備的 unicast address
+            state (bool): True 為開啟，False 為關閉
+
+        Returns:
+            Future: 結果為 control_plug 的返回值，被取代時為 {"result": "superseded"}
+        """
+        return self._submit(unicast_addr, self.KIND_PLUG, self.controller.control_plug, (unicast_addr, state))
+
+    def pending_count(self) -> int:
+        """尚未送出的命令數量"""
+        with self._cond:
+            return len(self._pending)
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        等待所有待送命令送出
+
+        Args:
+            timeout (float, optional): 最長等待秒數
+
+        Returns:
+            bool: 是否在時間內全部送出
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def _run(self):
+        """工作執行緒主迴圈"""
+        while not self._stop_event.is_set():
+            with self._cond:
+                while not self._pending and not self._stop_event.is_set():
+                    self._cond.wait()
+                if self._stop_event.is_set():
+                    break
+                _, (func, args, future) = self._pending.popitem(last=False)
+                self._busy = True
+
+            try:
+                result = func(*args)
+            except Exception as e:
+                logging.error(f"發送合併命令到 {args[0]} 時發生錯誤: {e}")
+                result = {"result": "failed", "error": str(e)}
+            with self._cond:
+                self.stats["sent" if self._succeeded(result) else "failed"] += 1
+            future.set_result(result)
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    @staticmethod
+    def _succeeded(result) -> bool:
+        """控制器返回 MDTS-MSG SUCCESS 時視為已送出；錯誤訊息 (例如設備未註冊)、逾時與 ERROR 皆為失敗"""
+        return isinstance(result, str) and "SUCCESS" in result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得統計 (submitted / sent / superseded / failed / pending)"""
+        with self._cond:
+            stats = dict(self.stats)
+            stats["pending"] = len(self._pending)
+        return stats
@@ -5,9 +5,15 @@ RL Mesh 設備控制模組
 
 import time
 import logging
+import threading
+from contextlib import contextmanager
 from typing import Dict, List, Optional, Tuple, Union
 from ..provisioner import Provisioner
-from ..modbus import ModbusRTU
+from ..modbus import ModbusRTU, decode_bits, decode_registers
+from ..utils import format_mesh_address, is_group_address
+from ..register_map import RegisterMap, get_register_map
+from .read_cache import ReadCache
+from .rtu_transport import SmartBoxTransport
 
 class RLMeshDeviceController:
     """
@@ -54,6 +60,122 @@ class RLMeshDeviceController:
         self.provisioner = provisioner
         self.modbus = ModbusRTU()
         self.device_map = {}  # 用於儲存裝置 UUID 與類型的對應
+        # 互動式控制狀態，背景輪詢會避開正在進行的互動式命令
+        self._interactive_lock = threading.Lock()
+        self._interactive_pending = 0
+        self._last_interactive = 0.0
+        # Smart-Box 讀取的最後值快取，預設停用 (參考 configure_read_cache)
+        self.read_cache = None
+        # Smart-Box RTU 交易層，驗證回應並允許不同 Smart-Box 同時進行交易；
+        # 沒有 Provisioner 時 (例如 apply --dry-run 只比較設定與設備記錄) 不建立交易層與指標
+        self.rtu_transport = None
+        if provisioner is None:
+            return
+        self.rtu_transport = SmartBoxTransport(provisioner, self.modbus)
+        provisioner.metrics.describe('rl62m02_rtu_transaction_seconds', 'Smart-Box RTU 交易 (MDTS 到完整 MDTG 回應) 的時間，依目標地址區分')
+        provisioner.metrics.describe('rl62m02_rtu_failures_total', '重試後仍未取得有效回應的 Smart-Box RTU 交易數')
+        provisioner.metrics.add_collector('smart_box', self._collect_metrics)
+
+    def close(self):
+        """關閉 Smart-Box RTU 交易層，沒有 Provisioner (例如 apply --dry-run) 時不做任何事"""
+        if self.rtu_transport is not None:
+            self.rtu_transport.close()
+
+    def _collect_metrics(self):
+        """匯出 RTU 交易層與讀取快取的統計，丟棄的過時 / CRC 錯誤訊框也在其中"""
+        samples = [(f'rl62m02_rtu_{key}_total', 'counter', f'Smart-Box RTU 交易層統計: {key}', {}, value)
+                   for key, value in self.rtu_transport.stats.items()]
+        if self.read_cache is not None:
+            samples.extend((f'rl62m02_read_cache_{key}_total', 'counter', f'Smart-Box 讀取快取統計: {key}', {}, value)
+                           for key, value in self.read_cache.stats.items())
+        return samples
+    
+    def configure_read_cache(self, ttl: float = 2.0, stale_while_revalidate: float = 0.0):
+        """
+        啟用或停用 Smart-Box RTU 讀取的最後值快取
+        
+        啟用後，讀取到的值以 (設備, 從站, 功能碼, 地址) 逐一快取，範圍內每個地址都在 ttl 秒內讀取過時
+        直接由快取值組成回應 (不論當時讀取的範圍為何)，同時進行中的相同讀取只會發送一次命令。
+        Air-Box 與電錶讀取也會經過此快取
+        
+        Args:
+            ttl (float): 回應視為新鮮的秒數，0 或負數表示停用快取
+            stale_while_revalidate (float): 過期後仍先返回舊回應並在背景重新讀取的秒數
+            
+        Returns:
+            ReadCache: 快取實例，停用時為 None
+        """
+        if ttl <= 0:
+            self.read_cache = None
+        else:
+            self.read_cache = ReadCache(ttl, stale_while_revalidate)
+        return self.read_cache
+    
+    def invalidate_read_cache(self, unicast_addr: str = None, slave_address: int = None):
+        """
+        移除快取的讀取回應
+        
+        Args:
+            unicast_addr (str, optional): 只移除此設備的快取，未指定時清除全部
+            slave_address (int, optional): 只移除此從站的快取
+            
+        Returns:
+            int: 移除的數量
+        """
+        if self.read_cache is None:
+            return 0
+        return self.read_cache.invalidate(
+            lambda key: (unicast_addr is None or key[0] == unicast_addr)
+            and (slave_address is None or key[1] == slave_address))
+    
+    @contextmanager
+    def _interactive(self):
+        """標記一個互動式控制命令的執行期間"""
+        with self._interactive_lock:
+            self._interactive_pending += 1
+        try:
+            yield
+        finally:
+            with self._interactive_lock:
+                self._interactive_pending -= 1
+                self._last_interactive = time.monotonic()
+    
+    def is_interactive_busy(self, window: float = 0.5):
+        """
+        檢查是否有互動式控制命令正在執行或剛執行完畢
+        
+        Args:
+            window (float): 互動式命令完成後仍視為忙碌的時間 (秒)
+            
+        Returns:
+            bool: 有互動式命令進行中或在 window 秒內完成時返回 True
+        """
+        with self._interactive_lock:
+            return self._interactive_pending > 0 or time.monotonic() - self._last_interactive < window
+    
+    def _extract_rtu_frame(self, mdtg_msg: str):
+        """
+        從 Smart-Box 的 MDTG-MSG 回應中取出 Modbus RTU 封包
+        
+        Args:
+            mdtg_msg (str): 例如 'MDTG-MSG 0x0101 0 827602010404...'
+            
+        Returns:
+            bytes: Modbus RTU 封包 (不含 8276 02 頭部)，格式不符時返回 None
+        """
+        if not mdtg_msg or not mdtg_msg.startswith("MDTG-MSG"):
+            return None
+        parts = mdtg_msg.split()
+        if len(parts) < 4:
+            return None
+        data_hex = parts[3]
+        prefix = f"{self.SMART_BOX_HEADER:04x}{self.SMART_BOX_TYPE_RTU:02x}"
+        if not data_hex.lower().startswith(prefix):
+            return None
+        try:
+            return bytes.fromhex(data_hex[len(prefix):])
+        except ValueError:
+            return None
         
     def register_device(self, unicast_addr: str, device_type: str, device_name: str = None):
         """
@@ -75,7 +197,8 @@ class RLMeshDeviceController:
         resolved_name = device_name or unicast_addr
         self.device_map[unicast_addr] = {
             "type": device_type,
-            "name": resolved_name
+            "name": resolved_name,
+            "groups": []
         }
         logging.info(f"已註冊設備: {unicast_addr} 類型: {device_type} 名稱: {resolved_name}")
         return True
@@ -89,6 +212,133 @@ class RLMeshDeviceController:
         """
         return self.device_map
     
+    def add_group_member(self, unicast_addr: str, group_addr: str):
+        """
+        記錄設備已訂閱指定的群組地址 (對應 AT+MSAA 的結果)
+        
+        Args:
+            unicast_addr (str): 設備的 unicast address
+            group_addr (str): 群組地址 (0xC000 ~ 0xFFFF)
+            
+        Returns:
+            bool: 記錄成功返回 True，設備未註冊或群組地址無效返回 False
+        """
+        device_info = self.device_map.get(unicast_addr)
+        if not device_info:
+            logging.error(f"加入群組失敗：設備 {unicast_addr} 未註冊")
+            return False
+        if not is_group_address(group_addr):
+            logging.error(f"加入群組失敗：無效的群組地址 {group_addr}")
+            return False
+        group_addr = format_mesh_address(group_addr)
+        groups = device_info.setdefault("groups", [])
+        if group_addr not in groups:
+            groups.append(group_addr)
+        return True
+    
+    def remove_group_member(self, unicast_addr: str, group_addr: str):
+        """
+        移除設備的群組訂閱記錄
+        
+        Args:
+            unicast_addr (str): 設備的 unicast address
+            group_addr (str): 群組地址
+            
+        Returns:
+            bool: 有移除記錄返回 True，否則返回 False
+        """
+        device_info = self.device_map.get(unicast_addr)
+        if not device_info:
+            return False
+        group_addr = format_mesh_address(group_addr)
+        groups = device_info.get("groups", [])
+        if group_addr in groups:
+            groups.remove(group_addr)
+            return True
+        return False
+    
+    def get_group_members(self, group_addr: str, device_type: str = None):
+        """
+        取得訂閱指定群組地址的設備
+        
+        Args:
+            group_addr (str): 群組地址
+            device_type (str, optional): 只返回此類型的設備
+            
+        Returns:
+            List[str]: 設備 unicast address 列表 (依地址排序)
+        """
+        group_addr = format_mesh_address(group_addr)
+        members = [
+            addr for addr, info in self.device_map.items()
+            if group_addr in info.get("groups", []) and (device_type is None or info["type"] == device_type)
+        ]
+        return sorted(members, key=lambda addr: int(addr, 16) if addr.lower().startswith('0x') else 0)
+    
+    def _build_rgb_led_command(self, cold: int, warm: int, red: int, green: int, blue: int):
+        """
+        構建 RGB LED 命令字串
+        
+        Returns:
+            Tuple[Optional[str], Optional[str]]: (命令, 錯誤訊息)，參數有誤時命令為 None
+        """
+        # 檢查參數範圍
+        for value, name in [(cold, "cold"), (warm, "warm"), (red, "red"), (green, "green"), (blue, "blue")]:
+            if not (0 <= value <= 255):
+                logging.warning(f"{name} 值必須在 0-255 範圍內，當前值: {value}")
+                return None, f"錯誤: {name} 值必須在 0-255 範圍內"
+        
+        header = "87"
+        opcode = f"{self.OPCODE_RGB_LED:04x}"
+        payload_len = "05"
+        payload = f"{cold:02x}{warm:02x}{red:02x}{green:02x}{blue:02x}"
+        return f"{header}{opcode}{payload_len}{payload}", None
+    
+    def _build_plug_command(self, state: bool):
+        """構建插座命令字串"""
+        header = "87"
+        opcode = f"{self.OPCODE_PLUG:04x}"
+        payload_len = "01"
+        payload = "01" if state else "00"
+        return f"{header}{opcode}{payload_len}{payload}"
+    
+    def _send_group_command(self, group_addr: str, device_type: str, cmd: str):
+        """
+        以一個 AT+MDTS 將命令發送到群組地址
+        
+        Args:
+            group_addr (str): 群組地址
+            device_type (str): 預期執行此命令的設備類型
+            cmd (str): 已構建的命令字串
+            
+        Returns:
+            dict: 包含結果、預期執行的成員與 MDTS 回應的字典
+        """
+        if not is_group_address(group_addr):
+            error_msg = f"錯誤：{group_addr} 不是有效的群組地址 (0xC000 ~ 0xFFFF)。"
+            logging.error(error_msg)
+            return {"result": "failed", "error": error_msg}
+        group_addr = format_mesh_address(group_addr)
+        
+        members = self.get_group_members(group_addr, device_type)
+        # 同群組但類型不符的設備也會收到封包，但不會執行此命令
+        ignored = [addr for addr in self.get_group_members(group_addr) if addr not in members]
+        if not members:
+            error_msg = f"錯誤：群組 {group_addr} 中沒有已註冊的 {device_type} 設備。"
+            logging.error(error_msg)
+            return {"result": "failed", "error": error_msg, "group_addr": group_addr, "ignored": ignored}
+        
+        logging.debug(f"發送群組命令: {cmd} 到 {group_addr} (成員: {members})")
+        with self._interactive():
+            resp = self.provisioner.send_datatrans(group_addr, cmd)
+        return {
+            "result": "success" if resp and resp.startswith("MDTS-MSG SUCCESS") else "failed",
+            "group_addr": group_addr,
+            "members": members,
+            "ignored": ignored,
+            "response": resp
+        }
+    
     def control_rgb_led(self, unicast_addr: str, cold: int, warm: int, red: int, green: int, blue: int):
         """
         控制 RGB LED 設備
@@ -111,24 +361,37 @@ class RLMeshDeviceController:
             logging.error(error_msg)
             return error_msg
         
-        # 檢查參數範圍
-        for value, name in [(cold, "cold"), (warm, "warm"), (red, "red"), (green, "green"), (blue, "blue")]:
-            if not (0 <= value <= 255):
-                logging.warning(f"{name} 值必須在 0-255 範圍內，當前值: {value}")
-                return f"錯誤: {name} 值必須在 0-255 範圍內"
-        
         # 構建 RGB LED 命令
-        header = "87"
-        opcode = f"{self.OPCODE_RGB_LED:04x}"
-        payload_len = "05"
-        payload = f"{cold:02x}{warm:02x}{red:02x}{green:02x}{blue:02x}"
-        cmd = f"{header}{opcode}{payload_len}{payload}"
+        cmd, error_msg = self._build_rgb_led_command(cold, warm, red, green, blue)
+        if cmd is None:
+            return error_msg
         
         # 發送命令
         logging.debug(f"發送 RGB LED 命令: {cmd} 到 {unicast_addr}")
-        resp = self.provisioner.send_datatrans(unicast_addr, cmd)
+        with self._interactive():
+            resp = self.provisioner.send_datatrans(unicast_addr, cmd)
         return resp
     
+    def control_group_rgb_led(self, group_addr: str, cold: int, warm: int, red: int, green: int, blue: int):
+        """
+        以單一群組訊息控制群組內所有 RGB LED 設備
+        
+        Args:
+            group_addr (str): 群組地址 (0xC000 ~ 0xFFFF)
+            cold (int): 冷光值 (0-255)
+            warm (int): 暖光值 (0-255)
+            red (int): 紅色值 (0-255)
+            green (int): 綠色值 (0-255)
+            blue (int): 藍色值 (0-255)
+            
+        Returns:
+            dict: 包含結果、預期執行的成員 (members)、類型不符的成員 (ignored) 與 MDTS 回應的字典
+        """
+        cmd, error_msg = self._build_rgb_led_command(cold, warm, red, green, blue)
+        if cmd is None:
+            return {"result": "failed", "error": error_msg}
+        return self._send_group_command(group_addr, self.DEVICE_TYPE_RGB_LED, cmd)
+    
     def control_plug(self, unicast_addr: str, state: bool):
         """
         控制插座設備
@@ -148,17 +411,28 @@ class RLMeshDeviceController:
             return error_msg
         
         # 構建插座命令
-        header = "87"
-        opcode = f"{self.OPCODE_PLUG:04x}"
-        payload_len = "01"
-        payload = "01" if state else "00"
-        cmd = f"{header}{opcode}{payload_len}{payload}"
+        cmd = self._build_plug_command(state)
         
         # 發送命令
         logging.debug(f"發送插座命令: {cmd} 到 {unicast_addr}")
-        resp = self.provisioner.send_datatrans(unicast_addr, cmd)
+        with self._interactive():
+            resp = self.provisioner.send_datatrans(unicast_addr, cmd)
         return resp
     
+    def control_group_plug(self, group_addr: str, state: bool):
+        """
+        以單一群組訊息控制群組內所有插座設備
+        
+        Args:
+            group_addr (str): 群組地址 (0xC000 ~ 0xFFFF)
+            state (bool): True 代表開，False 代表關
+            
+        Returns:
+            dict: 包含結果、預期執行的成員 (members)、類型不符的成員 (ignored) 與 MDTS 回應的字典
+        """
+        cmd = self._build_plug_command(state)
+        return self._send_group_command(group_addr, self.DEVICE_TYPE_PLUG, cmd)
+    
     def control_smart_box_rtu(self, unicast_addr: str, modbus_packet: bytes):
         """
         控制 Smart-Box 設備使用 RTU 模式
@@ -178,25 +452,27 @@ class RLMeshDeviceController:
             error_msg = f"錯誤：設備 {unicast_addr} 未註冊或不是支援 RTU 的類型 (SMART_BOX, AIR_BOX, POWER_METER)。"
             logging.error(error_msg)
             return {"initial_response": "ERROR", "mdtg_response": error_msg}
+        if self.rtu_transport is None:
+            error_msg = f"錯誤：控制器沒有 Provisioner，無法對 {unicast_addr} 發送 RTU 命令。"
+            logging.error(error_msg)
+            return {"result": "error", "error": error_msg, "initial_response": None, "mdtg_response": None}
 
-        # 構建 Smart-Box RTU 命令
-        header = f"{self.SMART_BOX_HEADER:04x}"
-        device_type = f"{self.SMART_BOX_TYPE_RTU:02x}"
-        payload = ''.join([f"{b:02x}" for b in modbus_packet])
-        cmd = f"{header}{device_type}{payload}"
-        
-        # 發送命令
-        logging.debug(f"發送 Smart-Box RTU 命令: {cmd} 到 {unicast_addr}")
-        initial_resp = self.provisioner.send_datatrans(unicast_addr, cmd)
-        
-        # 等待 MDTG-MSG 回應，檢查 UID 是否與請求的設備地址相符
-        # 超時時間設定為3秒，因為RTU回應可能需要一些時間
-        mdtg_resp = self.provisioner.serial_at.wait_for_response("MDTG-MSG", target_uid=unicast_addr, timeout=3.0)
+        # 由交易層發送並等待通過 CRC、從站地址與功能碼檢查的 MDTG-MSG 回應，
+        # 過時或損壞的訊框會被丟棄，逾時後自動重試
+        started = time.perf_counter()
+        transaction = self.rtu_transport.transact(unicast_addr, modbus_packet)
+        metrics = self.provisioner.metrics
+        metrics.observe('rl62m02_rtu_transaction_seconds', time.perf_counter() - started,
+                        {'destination': unicast_addr})
+        if not transaction["mdtg_response"]:
+            metrics.inc('rl62m02_rtu_failures_total', labels={'destination': unicast_addr})
         
         # 返回結構化結果
         result = {
-            "initial_response": initial_resp,
-            "mdtg_response": mdtg_resp
+            "initial_response": transaction["initial_response"],
+            "mdtg_response": transaction["mdtg_response"],
+            "attempts": transaction["attempts"],
+            "fragments": transaction["fragments"]
         }
         
         return result
@@ -224,12 +500,97 @@ class RLMeshDeviceController:
             modbus_packet = self.modbus.read_input_registers_request(slave_address, start_address, quantity)
         elif function_code == ModbusRTU.READ_COILS:
             modbus_packet = self.modbus.read_coils_request(slave_address, start_address, quantity)
+        elif function_code == ModbusRTU.READ_DISCRETE_INPUTS:
+            modbus_packet = self.modbus.read_discrete_inputs_request(slave_address, start_address, quantity)
         else:
             logging.warning(f"不支援的功能碼: {function_code}")
             return "錯誤: 不支援的功能碼"
         
         # 發送 RTU 命令
-        return self.control_smart_box_rtu(unicast_addr, modbus_packet)
+        if self.read_cache is None:
+            return self.control_smart_box_rtu(unicast_addr, modbus_packet)
+        # 以 (設備, 從站, 功能碼, 地址) 逐一快取解碼後的值，範圍內每個地址都有快取時由快取值組成回應，
+        # 因此較大範圍的讀取 (例如 ModbusReadPlanner 合併後的讀取) 之後，其中的子範圍不需再發送命令；
+        # 失敗或異常回應不會被快取，下次會重新發送
+        keys = [(unicast_addr, slave_address, function_code, address)
+                for address in range(start_address, start_address + quantity)]
+        values, response = self.read_cache.get_many(
+            (unicast_addr, slave_address, function_code, start_address, quantity), keys,
+            lambda: self.control_smart_box_rtu(unicast_addr, modbus_packet),
+            lambda resp: self.decode_read_response(resp, function_code, quantity, slave_address))
+        if response is None:
+            return self._cached_read_response(unicast_addr, slave_address, function_code, values)
+        return response
+    
+    def decode_read_response(self, response, function_code: int, quantity: int,
+                             slave_address: Optional[int] = None):
+        """
+        將 read_smart_box_rtu 的回應解析為數值列表
+        
+        Args:
+            response (dict): read_smart_box_rtu 或 control_smart_box_rtu 的回應
+            function_code (int): 讀取使用的功能碼 (FC01 / FC02 / FC03 / FC04)
+            quantity (int): 讀取數量
+            slave_address (int, optional): 指定時回應的從站地址也必須相同
+            
+        Returns:
+            list: 寄存器值 (FC01 / FC02 為線圈或離散輸入的布林值) 列表，
+                  讀取失敗、收到異常回應、從站或功能碼不符、數量不足時返回 None
+        """
+        if not isinstance(response, dict) or not response.get("mdtg_response"):
+            return None
+        frame = self._extract_rtu_frame(response["mdtg_response"])
+        parsed = self.modbus.parse_rtu_packet(frame) if frame else None
+        if parsed is None or parsed["is_exception"] or parsed["function_code"] != function_code:
+            return None
+        if slave_address is not None and parsed["slave_address"] != slave_address:
+            return None
+        payload = parsed["data"][1:]
+        if function_code in (ModbusRTU.READ_COILS, ModbusRTU.READ_DISCRETE_INPUTS):
+            values = decode_bits(payload, quantity)
+        else:
+            values = decode_registers(payload[:quantity * 2]).tolist()
+        return values if len(values) == quantity else None
+    
+    def _cached_read_response(self, unicast_addr: str, slave_address: int, function_code: int, values: list):
+        """
+        以快取值組成與 control_smart_box_rtu 相同格式的回應 (attempts 為 0 表示沒有發送命令)
+        """
+        if function_code in (ModbusRTU.READ_COILS, ModbusRTU.READ_DISCRETE_INPUTS):
+            data = bytearray((len(values) + 7) // 8)
+            for index, value in enumerate(values):
+                if value:
+                    data[index >> 3] |= 1 << (index & 7)
+        else:
+            data = b"".join(value.to_bytes(2, "big") for value in values)
+        frame = self.modbus.create_rtu_packet(slave_address, function_code, bytes([len(data)]) + bytes(data))
+        prefix = f"{self.SMART_BOX_HEADER:04X}{self.SMART_BOX_TYPE_RTU:02X}"
+        return {
+            "initial_response": "CACHED",
+            "mdtg_response": f"MDTG-MSG {unicast_addr} 0 {prefix}{frame.hex().upper()}",
+            "attempts": 0,
+            "fragments": 0
+        }
+    
+    def read_smart_box_registers(self, unicast_addr: str, slave_address: int, function_code: int,
+                                 start_address: int, quantity: int):
+        """
+        以單一邏輯操作讀取一段寄存器或線圈並解析為數值列表
+        
+        回應超過一個 MDTG 訊框時 (例如一次讀取 125 個寄存器)，由交易層跨多個 MDTG-MSG 重組
+        
+        Args:
+            unicast_addr (str): 設備的 unicast address
+            slave_address (int): Modbus 從站地址
+            function_code (int): Modbus 功能碼 (FC01 / FC02 / FC03 / FC04)
+            start_address (int): 起始地址
+            quantity (int): 讀取數量
+            
+        Returns:
+            list: 寄存器值 (或線圈狀態) 列表，讀取失敗或收到異常回應時返回 None
+        """
+        response = self.read_smart_box_rtu(unicast_addr, slave_address, function_code, start_address, quantity)
+        return self.decode_read_response(response, function_code, quantity, slave_address)
     
     def write_smart_box_register(self, unicast_addr: str, slave_address: int, register_address: int, register_value: int):
         """
@@ -245,7 +606,11 @@ class RLMeshDeviceController:
             str: 指令執行結果
         """
         modbus_packet = self.modbus.write_single_register_request(slave_address, register_address, register_value)
-        return self.control_smart_box_rtu(unicast_addr, modbus_packet)
+        with self._interactive():
+            result = self.control_smart_box_rtu(unicast_addr, modbus_packet)
+        # 寫入後該從站的快取值已過時
+        self.invalidate_read_cache(unicast_addr, slave_address)
+        return result
     
     def write_smart_box_registers(self, unicast_addr: str, slave_address: int, start_address: int, register_values: List[int]):
         """
@@ -261,7 +626,11 @@ class RLMeshDeviceController:
             str: 指令執行結果
         """
         modbus_packet = self.modbus.write_multiple_registers_request(slave_address, start_address, register_values)
-        return self.control_smart_box_rtu(unicast_addr, modbus_packet)
+        with self._interactive():
+            result = self.control_smart_box_rtu(unicast_addr, modbus_packet)
+        # 寫入後該從站的快取值已過時
+        self.invalidate_read_cache(unicast_addr, slave_address)
+        return result
     
     def write_smart_box_coil(self, unicast_addr: str, slave_address: int, coil_address: int, coil_value: bool):
         """
@@ -277,7 +646,44 @@ class RLMeshDeviceController:
             str: 指令執行結果
         """
         modbus_packet = self.modbus.write_single_coil_request(slave_address, coil_address, coil_value)
-        return self.control_smart_box_rtu(unicast_addr, modbus_packet)
+        with self._interactive():
+            result = self.control_smart_box_rtu(unicast_addr, modbus_packet)
+        # 寫入後該從站的快取值已過時
+        self.invalidate_read_cache(unicast_addr, slave_address)
+        return result
+    
+    def read_mapped_data(self, unicast_addr: str, slave_address: int, register_map: Union[str, RegisterMap]):
+        """
+        依寄存器對應表讀取並解析 Smart-Box 後方的 Modbus 設備
+        
+        Args:
+            unicast_addr (str): 設備的 unicast address
+            slave_address (int): Modbus 從站地址
+            register_map (str | RegisterMap): 內建型號名稱 (例如 'power_meter')、對應表檔案路徑或 RegisterMap
+            
+        Returns:
+            dict: 各欄位的換算值 (讀取失敗時為 None) 與原始回應 raw_data
+        """
+        register_map = get_register_map(register_map)
+        response = self.read_smart_box_rtu(unicast_addr, slave_address, register_map.function_code,
+                                           register_map.start_address, register_map.quantity)
+        
+        result = dict.fromkeys(register_map.field_names())
+        result["raw_data"] = response
+        
+        if not isinstance(response, dict) or not response.get("mdtg_response"):
+            return result
+        # 例如: MDTG-MSG 0x0101 0 82760201040C00F902C1000B0000000001ECFEAA
+        frame = self._extract_rtu_frame(response["mdtg_response"])
+        if not frame or len(frame) < 3 or frame[1] != register_map.function_code:
+            logging.warning(f"無效的 MDTG-MSG 格式: {response['mdtg_response']}")
+            return result
+        values = register_map.decode(frame[3:3 + frame[2]])
+        if values is None:
+            logging.warning(f"{register_map.model} 回應資料長度不足: {frame.hex()}")
+            return result
+        result.update(values)
+        return result
     
     def read_air_box_data(self, unicast_addr: str, slave_address: int):
         """
@@ -294,60 +700,10 @@ class RLMeshDeviceController:
         if unicast_addr in self.device_map and self.device_map[unicast_addr]["type"] != self.DEVICE_TYPE_AIR_BOX:
             logging.warning(f"設備 {unicast_addr} 不是 Air-Box 空氣盒子類型")
         
-        # 固定起始位置 0x0000，讀取長度為 3
-        start_address = 0x0000
-        quantity = 6
-        
-        # 使用 RTU 讀取保持寄存器
-        response = self.read_smart_box_rtu(unicast_addr, slave_address, ModbusRTU.READ_INPUT_REGISTERS, 
-                                          start_address, quantity)
-        
-        result = {
-            "temperature": None,
-            "humidity": None,
-            "co2": None,
-            "pm25": None,
-            "raw_data": response
-        }
-        
-        # 解析 MDTG-MSG 回應
-        if response and 'mdtg_response' in response and response['mdtg_response']:
-            mdtg_msg = response['mdtg_response']
-            
-            # 從 MDTG-MSG 解析出數據部分
-            # 格式例如: 0x0101 0 82 76 02 01 04 0C 00F9 02C1 000B 0000 0000 01EC FEAA
-            
-            if mdtg_msg and "MDTG-MSG" in mdtg_msg:
-                parts = mdtg_msg.split()
-                if len(parts) >= 4:
-                    data_hex = parts[3]
-                    
-                    # 檢查數據是否有效
-                    if len(data_hex) >= 24 and data_hex.startswith('8276'):
-                        # 溫度 (例: 0101 => 0x0101/10 = 25.7°C)
-                        temp_hex = data_hex[12:16]
-  
-                        temp_value = int(temp_hex, 16) / 10.0
-                        result["temperature"] = temp_value
-                        
-                        humid_hex = data_hex[16:20]
-                        humid_value = int(humid_hex, 16) / 10.0
-                        result["humidity"] = humid_value
-
-                        pm25_hex = data_hex[20:24]
-                        pm25_value = int(pm25_hex, 16)
-                        result["pm25"] = pm25_value
-
-                        co2_hex = data_hex[32:36]
-                        co2_value = int(co2_hex, 16)
-                        result["co2"] = co2_value
-                                                
-                        logging.info(f"成功解析 Air-Box 數據: {result}")
-                    else:
-                        logging.warning(f"無效的數據格式: {data_hex}")
-                else:
-                    logging.warning(f"無效的 MDTG-MSG 格式: {mdtg_msg}")
-                    
+        # 欄位定義見 regmaps/air_box.json (FC04，起始位置 0x0000，讀取長度 6)
+        result = self.read_mapped_data(unicast_addr, slave_address, "air_box")
+        if result["temperature"] is not None:
+            logging.info(f"成功解析 Air-Box 數據: {result}")
         return result
         
     def read_power_meter_data(self, unicast_addr: str, slave_address: int):
@@ -359,58 +715,14 @@ class RLMeshDeviceController:
             slave_address (int): Modbus 從站地址
             
         Returns:
-            dict: 包含電壓、電流、功率、電能的電力資料
+            dict: 包含電壓、電流、功率的電力資料
         """
         # 檢查設備是否已註冊為 POWER_METER 類型
         if unicast_addr in self.device_map and self.device_map[unicast_addr]["type"] != self.DEVICE_TYPE_POWER_METER:
             logging.warning(f"設備 {unicast_addr} 不是電錶類型")
         
-        # 固定起始位置 0x000E，讀取長度為 4
-        start_address = 0x000E
-        quantity = 4
-        
-        # 使用 RTU 讀取輸入寄存器
-        response = self.read_smart_box_rtu(unicast_addr, slave_address, ModbusRTU.READ_HOLDING_REGISTERS, 
-                                          start_address, quantity)
-        
-        result = {
-            "voltage": None,
-            "current": None,
-            "power": None,
-            "raw_data": response
-        }
-        
-        # 解析 MDTG-MSG 回應
-        if response and 'mdtg_response' in response and response['mdtg_response']:
-            mdtg_msg = response['mdtg_response']
-            
-            # 從 MDTG-MSG 解析出數據部分
-            if mdtg_msg and "MDTG-MSG" in mdtg_msg:
-                parts = mdtg_msg.split()
-                if len(parts) >= 4:
-                    data_hex = parts[3]
-                    
-                    # 檢查數據是否有效
-                    if len(data_hex) >= 28 and data_hex.startswith('8276'):
-                        # 電壓 (V) - 假設寄存器位置和格式
-                        voltage_hex = data_hex[12:16]
-                        voltage_value = int(voltage_hex, 16) / 10.0  # 除以10得到真實值
-                        result["voltage"] = voltage_value
-                        
-                        # 電流 (A)
-                        current_hex = data_hex[16:20]
-                        current_value = int(current_hex, 16) / 1000.0  # 除以100得到真實值
-                        result["current"] = current_value
-                        
-                        # 功率 (W)
-                        power_hex = data_hex[24:28]
-                        power_value = int(power_hex, 16) /10.0
-                        result["power"] = power_value
-                                           
-                        logging.info(f"成功解析電錶數據: {result}")
-                    else:
-                        logging.warning(f"無效的數據格式: {data_hex}")
-                else:
-                    logging.warning(f"無效的 MDTG-MSG 格式: {mdtg_msg}")
-        
+        # 欄位定義見 regmaps/power_meter.json (FC03，起始位置 0x000E，讀取長度 4)
+        result = self.read_mapped_data(unicast_addr, slave_address, "power_meter")
+        if result["voltage"] is not None:
+            logging.info(f"成功解析電錶數據: {result}")
         return result
\ No newline at end of file
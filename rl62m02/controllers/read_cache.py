@@ -0,0 +1,169 @@
+"""
+RL Mesh 讀取快取模組
+提供具 TTL、stale-while-revalidate 與 single-flight 的最後值快取，
+避免多個使用者在短時間內對同一寄存器重複發送 Mesh 讀取
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+class _Flight:
+    """進行中的讀取，後到的相同請求會等待它的結果"""
+
+    def __init__(self, keys: Sequence[Hashable] = (), generations: Sequence[int] = ()):
+        self.keys = keys
+        self.generations = generations  # 開始讀取時各鍵的世代
+        self.event = threading.Event()
+        self.result = None
+        self.values = None
+        self.error = None
+
+
+class ReadCache:
+    """
+    最後值快取
+
+    - 每個鍵保存一個值 (例如單一寄存器)，一次讀取可同時更新多個鍵
+    - 在 ttl 秒內的值直接返回 (不發送任何命令)
+    - 超過 ttl 但在 ttl + stale_while_revalidate 秒內的值先返回舊值，並在背景重新讀取
+    - 相同 flight_key 同時只會有一個讀取在進行 (single-flight)，其他呼叫者等待同一個結果
+    - 讀取進行中被 invalidate 的鍵會增加世代，讀取完成時世代已改變就不保存結果 (可能是寫入前的值)
+    """
+
+    def __init__(self, ttl: float = 2.0, stale_while_revalidate: float = 0.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        初始化快取
+
+        Args:
+            ttl (float): 值視為新鮮的秒數
+            stale_while_revalidate (float): 過期後仍可返回舊值並背景更新的秒數
+            clock (callable): 時間來源，預設為 time.monotonic
+        """
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+        self._clock = clock
+        self._entries: Dict[Hashable, tuple] = {}  # key -> (值, 取得時間)
+        self._inflight: Dict[Hashable, _Flight] = {}
+        self._generations: Dict[Hashable, int] = {}  # key -> 世代，只保存進行中讀取涵蓋的鍵
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0,
+                      "invalidated_loads": 0}
+
+    def get_many(self, flight_key: Hashable, keys: Sequence[Hashable], loader: Callable[[], Any],
+                 decode: Callable[[Any], Optional[List[Any]]]) -> Tuple[Optional[List[Any]], Any]:
+        """
+        取得多個鍵的快取值，任一鍵缺少或過期時呼叫 loader 一次讀取全部
+
+        Args:
+            flight_key: 進行中讀取的識別鍵，相同 flight_key 的同時讀取只會呼叫一次 loader
+            keys: 快取鍵列表
+            loader (callable): 實際讀取的函數
+            decode (callable): 將讀取結果轉換為與 keys 等長的值列表，讀取失敗時返回 None (不會被快取)
+
+        Returns:
+            tuple: (值列表, 讀取結果)；值全部來自快取時讀取結果為 None，讀取失敗時值列表為 None
+        """
+        with self._lock:
+            now = self._clock()
+            entries = [self._entries.get(key) for key in keys]
+            if entries and all(entry is not None for entry in entries):
+                values = [entry[0] for entry in entries]
+                age = now - min(entry[1] for entry in entries)
+                if age <= self.ttl:
+                    self.stats["hits"] += 1
+                    return values, None
+                if age <= self.ttl + self.stale_while_revalidate:
+                    self.stats["stale_hits"] += 1
+                    if flight_key not in self._inflight:
+                        flight = self._start_flight(flight_key, keys)
+                        self.stats["refreshes"] += 1
+                        threading.Thread(target=self._load, args=(flight_key, keys, loader, decode, flight),
+                                         daemon=True).start()
+                    return values, None
+
+            flight = self._inflight.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self._start_flight(flight_key, keys)
+                self.stats["misses"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if leader:
+            self._load(flight_key, keys, loader, decode, flight)
+        else:
+            flight.event.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.values, flight.result
+
+    def _start_flight(self, flight_key: Hashable, keys: Sequence[Hashable]) -> _Flight:
+        """登記進行中的讀取並記下各鍵目前的世代，呼叫者需持有 _lock"""
+        flight = self._inflight[flight_key] = _Flight(keys, [self._generations.get(key, 0) for key in keys])
+        return flight
+
+    def _load(self, flight_key: Hashable, keys: Sequence[Hashable], loader: Callable[[], Any],
+              decode: Callable[[Any], Optional[List[Any]]], flight: _Flight):
+        """執行讀取、逐鍵保存解碼後的值並通知所有等待者"""
+        try:
+            flight.result = loader()
+            flight.values = decode(flight.result)
+            if flight.values is not None:
+                with self._lock:
+                    if any(self._generations.get(key, 0) != generation
+                           for key, generation in zip(keys, flight.generations)):
+                        # 讀取期間有鍵被 invalidate (例如寫入)，讀到的值可能已過時，只返回給本次的呼叫者
+                        self.stats["invalidated_loads"] += 1
+                    else:
+                        fetched_at = self._clock()
+                        for key, value in zip(keys, flight.values):
+                            self._entries[key] = (value, fetched_at)
+        except Exception as e:
+            logging.error(f"快取讀取 {flight_key} 時發生錯誤: {e}")
+            flight.error = e
+        finally:
+            with self._lock:
+                self._inflight.pop(flight_key, None)
+                # 沒有其他進行中的讀取涵蓋的鍵不再需要世代
+                covered = {key for other in self._inflight.values() for key in other.keys}
+                for key in keys:
+                    if key not in covered:
+                        self._generations.pop(key, None)
+            flight.event.set()
+
+    def peek(self, key: Hashable) -> Optional[tuple]:
+        """
+        不觸發讀取地查看快取
+
+        Returns:
+            tuple: (值, 已存在秒數)，沒有快取時返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            return entry[0], self._clock() - entry[1]
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """
+        移除快取值，並讓涵蓋這些鍵的進行中讀取不保存結果
+
+        Args:
+            predicate (callable, optional): 判斷鍵是否要移除，未指定時清除全部
+
+        Returns:
+            int: 移除的數量
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate is None or predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            loading = {key for flight in self._inflight.values() for key in flight.keys}
+            for key in loading:
+                if predicate is None or predicate(key):
+                    self._generations[key] = self._generations.get(key, 0) + 1
+            return len(keys)
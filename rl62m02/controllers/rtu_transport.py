@@ -0,0 +1,316 @@
+"""
+Smart-Box RTU 交易層
+解析 MDTG-MSG 中的 8276 02 頭部，驗證 Modbus CRC，依從站地址與功能碼配對回應，
+丟棄過時或損壞的訊框並自動重試；不同 Smart-Box 的交易可以同時進行。
+超過單一 MDTS / MDTG 訊框 (20 bytes) 的 Modbus 封包會自動分段發送，回應則跨多個 MDTG-MSG 重組
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..modbus import ModbusRTU, ModbusRTUFrameParser
+from ..tracing import start_span
+
+
+class _PendingTransaction:
+    """等待回應中的 RTU 交易"""
+
+    def __init__(self, request: bytes):
+        self.request = request
+        self.slave_address = request[0]
+        self.function_code = request[1]
+        self.event = threading.Event()
+        self.mdtg_response = None
+        self.frame = None
+        self.parsed = None
+        self.parser = ModbusRTUFrameParser()  # 重組中的回應
+        self.fragments = 0  # 目前回應已收到的 MDTG-MSG 數量
+        self.last_fragment = None  # 最後收到片段的時間
+
+
+class SmartBoxTransport:
+    """
+    Smart-Box RTU 交易層
+
+    - 以 Provisioner 的訊息監聽函數接收 MDTG-MSG，依 unicast address 分派給等待中的交易
+    - 每個 Smart-Box 同一時間只有一個交易 (Smart-Box 一次只轉送一個 RTU 請求)，
+      不同 Smart-Box 的交易互不阻擋
+    - 回應必須通過 CRC 檢查，且從站地址、功能碼 (含異常回應) 與長度都符合請求，
+      否則視為過時或損壞的訊框丟棄，繼續等待；逾時後重新發送
+    - 請求超過單一訊框時依序以多個 AT+MDTS 發送 (每段 17 bytes Modbus 資料加上 8276 02 頭部)；
+      回應由 ModbusRTUFrameParser 依功能碼的長度規則跨多個 MDTG-MSG 重組，
+      片段間隔超過 fragment_timeout 時捨棄未完成的部分
+    """
+
+    DEFAULT_TIMEOUT = 3.0
+    DEFAULT_RETRIES = 2
+    DEFAULT_FRAGMENT_TIMEOUT = 1.0
+    HEADER = "827602"  # Smart-Box 頭部 0x8276 + RTU 類型 0x02
+    MAX_FRAME_BYTES = 20  # AT+MDTS / MDTG-MSG 單一訊框的資料上限
+    CHUNK_BYTES = MAX_FRAME_BYTES - len(HEADER) // 2  # 每個訊框可放的 Modbus 資料
+
+    def __init__(self, provisioner, modbus: Optional[ModbusRTU] = None,
+                 timeout: float = DEFAULT_TIMEOUT, retries: int = DEFAULT_RETRIES,
+                 fragment_timeout: float = DEFAULT_FRAGMENT_TIMEOUT):
+        """
+        初始化交易層
+
+        Args:
+            provisioner (Provisioner): 用於發送 AT+MDTS 並接收 MDTG-MSG 的 Provisioner
+            modbus (ModbusRTU, optional): 用於 CRC 驗證與解析的 ModbusRTU 實例
+            timeout (float): 每次嘗試等待 MDTG-MSG 的秒數
+            retries (int): 逾時或發送失敗後的重試次數
+            fragment_timeout (float): 多訊框回應中兩個片段之間的最長間隔 (秒)
+        """
+        self.provisioner = provisioner
+        self.modbus = modbus or ModbusRTU()
+        self.timeout = timeout
+        self.retries = retries
+        self.fragment_timeout = fragment_timeout
+        self._lock = threading.Lock()
+        self._pending: Dict[str, _PendingTransaction] = {}  # unicast address (小寫) -> 交易
+        self._device_locks: Dict[str, threading.Lock] = {}
+        self.stats = {"transactions": 0, "retries": 0, "timeouts": 0, "crc_errors": 0, "stale": 0,
+                      "fragments_sent": 0, "fragments_received": 0, "fragment_timeouts": 0}
+        provisioner.add_listener(self._on_line)
+
+    def close(self):
+        """移除訊息監聽函數"""
+        self.provisioner.remove_listener(self._on_line)
+
+    def _device_lock(self, unicast_addr: str) -> threading.Lock:
+        """取得設備的交易鎖"""
+        with self._lock:
+            lock = self._device_locks.get(unicast_addr)
+            if lock is None:
+                lock = self._device_locks[unicast_addr] = threading.Lock()
+            return lock
+
+    def parse_mdtg(self, line: str):
+        """
+        解析 MDTG-MSG 中的 Smart-Box RTU 回應
+
+        Args:
+            line (str): 例如 'MDTG-MSG 0x0101 0 82760201040C...'
+
+        Returns:
+            tuple: (unicast address, RTU 封包 bytes)，不是 Smart-Box RTU 回應時返回 None
+        """
+        parts = line.split()
+        if len(parts) < 4 or parts[0] != "MDTG-MSG":
+            return None
+        data_hex = parts[3].lower()
+        if not data_hex.startswith(self.HEADER):
+            return None
+        try:
+            return parts[1], bytes.fromhex(data_hex[len(self.HEADER):])
+        except ValueError:
+            return None
+
+    def _matches(self, pending: _PendingTransaction, parsed: Dict[str, Any]) -> bool:
+        """檢查已通過 CRC 驗證的回應是否為此交易的回應"""
+        if parsed['slave_address'] != pending.slave_address or parsed['function_code'] != pending.function_code:
+            return False
+        data = parsed['data']
+        if parsed['is_exception']:
+            return len(data) == 1
+        request = pending.request
+        function_code = pending.function_code
+        if function_code in (ModbusRTU.READ_COILS, ModbusRTU.READ_DISCRETE_INPUTS):
+            quantity = (request[4] << 8) | request[5]
+            return len(data) >= 1 and data[0] == len(data) - 1 == (quantity + 7) // 8
+        if function_code in (ModbusRTU.READ_HOLDING_REGISTERS, ModbusRTU.READ_INPUT_REGISTERS):
+            quantity = (request[4] << 8) | request[5]
+            return len(data) >= 1 and data[0] == len(data) - 1 == quantity * 2
+        if function_code in (ModbusRTU.WRITE_SINGLE_COIL, ModbusRTU.WRITE_SINGLE_REGISTER,
+                             ModbusRTU.WRITE_MULTIPLE_COILS, ModbusRTU.WRITE_MULTIPLE_REGISTERS):
+            # 寫入回應回傳請求的地址與值 (或地址與數量)
+            return data == request[2:6]
+        return True
+
+    @staticmethod
+    def expected_length(buffer: bytes) -> Optional[int]:
+        """
+        依功能碼的長度規則計算回應訊框的總長度 (含 CRC)
+
+        Args:
+            buffer (bytes): 目前已收到的回應開頭
+
+        Returns:
+            int: 訊框總長度，資料不足以判斷時返回 None
+        """
+        length = ModbusRTUFrameParser.frame_length(buffer)
+        return len(buffer) if length == 0 else length  # 未知功能碼視為單一訊框
+
+    def _on_line(self, line: str):
+        """Provisioner 訊息監聽函數，在接收執行緒中執行"""
+        if not line.startswith("MDTG-MSG"):
+            return
+        result = self.parse_mdtg(line)
+        if result is None:
+            return
+        unicast_addr, fragment = result
+        if not fragment:
+            return
+        with self._lock:
+            pending = self._pending.get(unicast_addr.lower())
+            if pending is None:
+                self.stats["stale"] += 1
+                logging.debug(f"丟棄沒有對應交易的 RTU 回應: {line}")
+                return
+            self.stats["fragments_received"] += 1
+            now = time.monotonic()
+            parser = pending.parser
+            if parser.buffered and now - pending.last_fragment > self.fragment_timeout:
+                self.stats["fragment_timeouts"] += 1
+                logging.warning(f"{unicast_addr} 的回應片段間隔逾時，捨棄未完成的 {parser.buffered} bytes")
+                parser.reset()
+                pending.fragments = 0
+            pending.fragments += 1
+            pending.last_fragment = now
+
+            if pending.function_code in ModbusRTUFrameParser.FUNCTION_CODES:
+                crc_errors = parser.stats["crc_errors"]
+                frames = parser.feed(fragment)
+                head = parser.peek()
+                if parser.stats["crc_errors"] != crc_errors:
+                    # 損壞訊框之後的剩餘片段無法再對齊，整個捨棄
+                    self.stats["crc_errors"] += 1
+                    logging.warning(f"RTU 回應 CRC 錯誤，已丟棄: {line}")
+                    parser.reset()
+                # 新訊框的從站地址或功能碼不符時，不必等待其餘片段即可丟棄
+                elif head and (head[0] != pending.slave_address or
+                             (len(head) >= 2 and head[1] & 0x7F != pending.function_code)):
+                    self.stats["stale"] += 1
+                    logging.debug(f"丟棄與目前請求不符的 RTU 回應: {line}")
+                    parser.reset()
+            else:
+                # 無法依長度規則切分的功能碼，每個 MDTG-MSG 視為一個完整訊框
+                frames = [fragment] if self.modbus._verify_crc(fragment) else []
+                if not frames:
+                    self.stats["crc_errors"] += 1
+                    logging.warning(f"RTU 回應 CRC 錯誤，已丟棄: {fragment.hex()}")
+
+            frame = parsed = None
+            for candidate in frames:
+                candidate_parsed = self.modbus.parse_rtu_packet(candidate)
+                if candidate_parsed is not None and self._matches(pending, candidate_parsed):
+                    frame, parsed = candidate, candidate_parsed
+                    break
+                self.stats["stale"] += 1
+                logging.debug(f"丟棄與目前請求不符的 RTU 回應: {candidate.hex()}")
+            if frame is None:
+                if not parser.buffered:
+                    pending.fragments = 0
+                return  # 等待其餘片段或下一個回應
+            if pending.fragments > 1:
+                # 以重組後的完整訊框組成單一 MDTG-MSG，讓既有的解析程式不需修改
+                parts = line.split()
+                line = f"{parts[0]} {parts[1]} {parts[2]} {self.HEADER}{frame.hex().upper()}"
+            pending.mdtg_response = line
+            pending.frame = frame
+            pending.parsed = parsed
+            del self._pending[unicast_addr.lower()]
+        pending.event.set()
+
+    def fragment(self, modbus_packet: bytes) -> List[str]:
+        """
+        將 Modbus 請求切成可放入 AT+MDTS 的片段
+
+        Args:
+            modbus_packet (bytes): 完整的 Modbus RTU 請求 (含 CRC)
+
+        Returns:
+            List[str]: 每個片段的十六進位資料 (含 8276 02 頭部)
+        """
+        return [self.HEADER + modbus_packet[i:i + self.CHUNK_BYTES].hex()
+                for i in range(0, len(modbus_packet), self.CHUNK_BYTES)]
+
+    def _wait(self, pending: _PendingTransaction, timeout: float) -> bool:
+        """等待回應；多訊框回應在持續收到片段時延長等待時間"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if pending.event.wait(max(deadline - time.monotonic(), 0)):
+                return True
+            with self._lock:
+                last_fragment = pending.last_fragment if pending.parser.buffered else None
+            if last_fragment is None or time.monotonic() - last_fragment >= self.fragment_timeout:
+                return False
+            deadline = last_fragment + self.fragment_timeout
+
+    def transact(self, unicast_addr: str, modbus_packet: bytes, timeout: float = None,
+                 retries: int = None) -> Dict[str, Any]:
+        """
+        執行一個 RTU 交易: 發送請求並等待已驗證的回應
+
+        Args:
+            unicast_addr (str): Smart-Box 的 unicast address
+            modbus_packet (bytes): 完整的 Modbus RTU 請求 (含 CRC)
+            timeout (float, optional): 每次嘗試的逾時秒數
+            retries (int, optional): 重試次數
+
+        Returns:
+            dict: {'initial_response', 'mdtg_response', 'frame', 'parsed', 'attempts', 'fragments'}；
+                  失敗時 mdtg_response、frame 與 parsed 為 None。多訊框回應的 mdtg_response
+                  為以重組後完整訊框組成的單一 MDTG-MSG
+        """
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+        fragments = self.fragment(modbus_packet)
+        key = unicast_addr.lower()
+        result = {"initial_response": None, "mdtg_response": None, "frame": None, "parsed": None,
+                  "attempts": 0, "fragments": 0}
+
+        with start_span("rtu.transaction", {"destination": unicast_addr, "request": modbus_packet.hex()}) as span, \
+                self._device_lock(key):
+            for attempt in range(1, retries + 2):
+                result["attempts"] = attempt
+                pending = _PendingTransaction(modbus_packet)
+                # 先登記交易再發送，避免回應比登記更早到達
+                with self._lock:
+                    self.stats["transactions" if attempt == 1 else "retries"] += 1
+                    self._pending[key] = pending
+                try:
+                    if not self._send_fragments(unicast_addr, fragments, attempt, result):
+                        continue
+                    with start_span("rtu.wait_response", {"attempt": attempt}) as wait_span:
+                        received = self._wait(pending, timeout)
+                        wait_span.set_attribute("fragments", pending.fragments)
+                        if not received:
+                            wait_span.set_status("error", "timeout")
+                    if received:
+                        result.update(mdtg_response=pending.mdtg_response, frame=pending.frame,
+                                      parsed=pending.parsed, fragments=pending.fragments)
+                        span.set_attribute("attempts", attempt)
+                        return result
+                    with self._lock:
+                        self.stats["timeouts"] += 1
+                    logging.warning(f"等待 {unicast_addr} 的 RTU 回應逾時 (第 {attempt} 次)")
+                finally:
+                    with self._lock:
+                        if self._pending.get(key) is pending:
+                            del self._pending[key]
+            span.set_attribute("attempts", result["attempts"])
+            span.set_status("error", "no valid response")
+        return result
+
+    def _send_fragments(self, unicast_addr: str, fragments: List[str], attempt: int,
+                        result: Dict[str, Any]) -> bool:
+        """依序發送請求的所有片段，任何一段失敗時返回 False"""
+        for index, payload in enumerate(fragments, 1):
+            logging.debug(f"發送 Smart-Box RTU 命令: {payload} 到 {unicast_addr} "
+                          f"(片段 {index}/{len(fragments)}，第 {attempt} 次)")
+            result["initial_response"] = self.provisioner.send_datatrans(unicast_addr, payload)
+            with self._lock:
+                self.stats["fragments_sent"] += 1
+            if result["initial_response"] and "SUCCESS" not in result["initial_response"]:
+                logging.warning(f"發送 RTU 命令到 {unicast_addr} 失敗: {result['initial_response']}")
+                return False
+        return True
+
+    def pending_devices(self) -> List[str]:
+        """目前有交易進行中的設備"""
+        with self._lock:
+            return list(self._pending.keys())
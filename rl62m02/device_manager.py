@@ -13,7 +13,8 @@ import traceback
 
 from .provisioner import Provisioner
 from .controllers.mesh_controller import RLMeshDeviceController
-from .utils import format_mac_address
+from .utils import format_mac_address, format_mesh_address, is_group_address
+from .tracing import start_span, traced
 
 class MeshDeviceManager:
     """Mesh 設備管理器，整合設備資訊管理、操作等功能"""
@@ -67,6 +68,7 @@ class MeshDeviceManager:
                 "devices": []
             }
     
+    @traced("device_manager.save_device_data")
     def save_device_data(self) -> bool:
         """保存設備數據到檔案"""
         try:
@@ -99,6 +101,9 @@ class MeshDeviceManager:
                 
                 if uid:
                     self.controller.register_device(uid, controller_type, name)
+                    # 同步群組訂閱關係，供群組控制驗證成員
+                    for group_addr in device.get('subscribe') or []:
+                        self.controller.add_group_member(uid, group_addr)
                     self.logger.debug(f"已註冊設備: {name} ({uid}), 類型: {device_type_str}")
             except Exception as e:
                 self.logger.error(f"註冊設備到控制器時發生錯誤: {e}")
@@ -173,6 +178,18 @@ class MeshDeviceManager:
         Returns:
             包含操作結果和信息的字典
         """
+        with start_span("device_manager.provision_device", {"uuid": uuid, "device_type": device_type}) as span:
+            result = self._provision_device(uuid, device_name, device_type, position, mac_address)
+            span.set_attribute("result", result["result"])
+            if "unicast_addr" in result:
+                span.set_attribute("unicast_addr", result["unicast_addr"])
+            if "error" in result:
+                span.set_status("error", result["error"])
+            return result
+
+    def _provision_device(self, uuid: str, device_name: str, device_type: str, position: str,
+                          mac_address: Optional[str]) -> Dict[str, Any]:
+        """provision_device 的實作: 綁定、註冊到控制器並寫入設備記錄"""
         self.logger.info(f"開始綁定設備 UUID: {uuid}")
 
         try:
@@ -358,6 +375,7 @@ class MeshDeviceManager:
                 device["subscribe"] = [sub for sub in device["subscribe"] if sub != group_addr]
                 # 添加新的訂閱
                 device["subscribe"].append(group_addr)
+                self.controller.add_group_member(device.get('uid', ''), group_addr)
                 
                 # 只有在 save_after_set 為 True 時才儲存
                 if save_after_set:
@@ -511,6 +529,7 @@ class MeshDeviceManager:
             traceback.print_exc()
             return {"result": "error", "error": str(e)}
     
+    @traced("device_manager.control_device")
     def control_device(self, device_id: Union[int, str], action: str, **params) -> Dict[str, Any]:
         """控制設備執行特定動作
         
@@ -659,6 +678,82 @@ class MeshDeviceManager:
             traceback.print_exc()
             return {"result": "error", "error": str(e)}
     
+    def get_group_members(self, group_addr: str) -> List[Dict[str, Any]]:
+        """獲取訂閱指定群組地址的設備
+        
+        Args:
+            group_addr: 群組地址，例如 '0xC000'
+            
+        Returns:
+            設備信息字典列表
+        """
+        group_addr = format_mesh_address(group_addr)
+        return [
+            device for device in self.devices_data.get("devices", [])
+            if group_addr in [format_mesh_address(sub) for sub in device.get('subscribe') or []]
+        ]
+    
+    def control_group(self, group_addr: str, action: str, **params) -> Dict[str, Any]:
+        """以單一群組訊息控制群組內所有同類型設備
+        
+        只發送一個 AT+MDTS 到群組地址，而不是對每個成員各發一次 unicast。
+        
+        Args:
+            group_addr: 群組地址，例如 '0xC000'
+            action: 動作名稱，支援 'turn_on', 'turn_off', 'set_rgb', 'set_white'
+            **params: 動作需要的參數，可用 device_type 指定目標類型 ('RGB_LED' 或 'PLUG')，
+                      未指定時依群組成員推斷
+            
+        Returns:
+            操作結果字典，members 欄位列出預期會執行命令的設備地址
+        """
+        try:
+            if not is_group_address(group_addr):
+                return {"result": "failed", "error": f"無效的群組地址: {group_addr}"}
+            group_addr = format_mesh_address(group_addr)
+            
+            device_type = params.get('device_type')
+            if device_type is None:
+                member_types = {device.get('devName') or 'RGB_LED' for device in self.get_group_members(group_addr)}
+                if len(member_types) != 1:
+                    return {"result": "failed", "error": f"群組 {group_addr} 成員類型為 {sorted(member_types)}，請以 device_type 指定目標類型"}
+                device_type = member_types.pop()
+            
+            if device_type == "RGB_LED":
+                if action == "set_rgb":
+                    values = [params.get(name, 0) for name in ('cold', 'warm', 'red', 'green', 'blue')]
+                elif action == "turn_on":
+                    values = [params.get('cold', 0), params.get('warm', 255), 0, 0, 0]
+                elif action == "set_white":
+                    values = [params.get('cold', 255), params.get('warm', 0), 0, 0, 0]
+                elif action == "turn_off":
+                    values = [0, 0, 0, 0, 0]
+                else:
+                    return {"result": "failed", "error": f"不支援的動作: {action}"}
+                result = self.controller.control_group_rgb_led(group_addr, *values)
+                new_state = 1 if any(values) else 0
+            elif device_type == "PLUG":
+                if action not in ("turn_on", "turn_off"):
+                    return {"result": "failed", "error": f"PLUG 群組不支援的動作: {action}"}
+                new_state = 1 if action == "turn_on" else 0
+                result = self.controller.control_group_plug(group_addr, bool(new_state))
+            else:
+                return {"result": "failed", "error": f"不支援群組控制的設備類型: {device_type}"}
+            
+            if result.get("result") == "success":
+                # 一次更新所有成員狀態並只儲存一次
+                members = set(result.get("members", []))
+                for device in self.devices_data.get("devices", []):
+                    if device.get('uid') in members:
+                        device['state'] = new_state
+                self.save_device_data()
+            return result
+        
+        except Exception as e:
+            self.logger.error(f"群組控制時發生錯誤: {e}")
+            traceback.print_exc()
+            return {"result": "error", "error": str(e)}
+    
     def display_devices(self) -> str:
         """格式化顯示所有設備信息
         
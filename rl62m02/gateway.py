@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+常駐閘道
+MeshGateway 長時間持有串口、Provisioner、控制器與設備管理器，所有操作經由 execute() 依序交給 dongle；
+GatewayServer 以 Unix domain socket 提供 JSON Lines 介面，GatewayClient 讓命令行工具或其他程式
+不必重新開啟串口、等待角色檢查與重新載入設備檔案，重複的命令只需數毫秒，多個工具也能安全共用同一個 dongle
+
+協定 (每行一個 JSON):
+    請求: {"id": 1, "op": "control", "args": ["0x0100", "turn_on"], "params": {}}
+    回應: {"id": 1, "ok": true, "result": ...} 或 {"id": 1, "ok": false, "error": "..."}
+"""
+
+import os
+import json
+import time
+import socket
+import asyncio
+import logging
+import tempfile
+import threading
+from array import array
+from typing import Any, Dict, Optional
+
+from .serial_at import SerialAT
+from .provisioner import Provisioner
+from .controllers.mesh_controller import RLMeshDeviceController
+from .device_manager import MeshDeviceManager
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), "rl62m02.sock")
+
+# 操作名稱 -> (目標物件, 方法名稱, 是否需要使用 dongle)
+OPERATIONS = {
+    "ping": ("gateway", "ping", False),
+    "metrics": ("gateway", "metrics_snapshot", False),
+    "list": ("manager", "get_all_devices", False),
+    "get_device": ("manager", "get_device_by_uid", False),
+    "display": ("manager", "display_devices", False),
+    "group_members": ("manager", "get_group_members", False),
+    "scan": ("provisioner", "scan_nodes", True),
+    "node_list": ("provisioner", "get_node_list", True),
+    "provision": ("manager", "provision_device", True),
+    "unbind": ("manager", "unbind_device", True),
+    "rename": ("manager", "set_device_name", True),
+    "subscribe": ("manager", "set_subscription", True),
+    "publish": ("manager", "set_publication", True),
+    "control": ("manager", "control_device", True),
+    "control_group": ("manager", "control_group", True),
+    "read_registers": ("controller", "read_smart_box_registers", True),
+    "read_air_box": ("controller", "read_air_box_data", True),
+    "read_power_meter": ("controller", "read_power_meter_data", True),
+    "read_mapped": ("controller", "read_mapped_data", True),
+}
+
+
+class GatewayError(RuntimeError):
+    """閘道回報的操作錯誤"""
+
+
+def json_default(obj: Any) -> Any:
+    """將 bytes、array 等轉為可序列化為 JSON 的值"""
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.hex()
+    if isinstance(obj, (array, tuple, set)):
+        return list(obj)
+    if hasattr(obj, "tolist"):  # numpy 陣列
+        return obj.tolist()
+    return str(obj)
+
+
+class MeshGateway:
+    """
+    持有 dongle 的常駐閘道
+
+    需要使用 dongle 的操作以鎖依序執行；只讀取設備記錄的操作不等待 dongle
+    """
+
+    def __init__(self, port: str = None, baudrate: int = 115200,
+                 device_file: str = MeshDeviceManager.DEFAULT_JSON_PATH,
+                 serial_at: SerialAT = None, record_path: str = None):
+        """
+        初始化閘道，呼叫 open() 後才連接設備
+
+        Args:
+            port (str, optional): 串口名稱，如 COM3 或 /dev/ttyUSB0
+            baudrate (int): 串口鮑率
+            device_file (str): 設備記錄檔路徑
+            serial_at (SerialAT, optional): 已開啟的 SerialAT (例如模擬器或重播)，指定時忽略 port
+            record_path (str, optional): 錄製 AT 收發內容的記錄檔
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.device_file = device_file
+        self.record_path = record_path
+        self.serial_at = serial_at
+        self.provisioner = None
+        self.controller = None
+        self.manager = None
+        self.started = None
+        self._owns_serial = serial_at is None
+        self._dongle_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "pending": 0}
+
+    def open(self) -> "MeshGateway":
+        """開啟串口並建立 Provisioner、控制器與設備管理器"""
+        if self.serial_at is None:
+            if not self.port:
+                raise ValueError("需要指定串口或 SerialAT 實例")
+            self.serial_at = SerialAT(self.port, self.baudrate, record_path=self.record_path)
+        try:
+            self.provisioner = Provisioner(self.serial_at)
+            self.controller = RLMeshDeviceController(self.provisioner)
+            self.manager = MeshDeviceManager(self.provisioner, self.controller, self.device_file)
+        except Exception:
+            self.close()
+            raise
+        self.started = time.time()
+        logging.info(f"閘道已連接 {self.serial_at.port}，設備記錄 {self.device_file}")
+        return self
+
+    def close(self):
+        """關閉交易層與串口 (只關閉由閘道開啟的串口)"""
+        if self.controller is not None:
+            self.controller.close()
+        if self.serial_at is not None and self._owns_serial:
+            self.serial_at.close()
+            self.serial_at = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def ping(self) -> Dict[str, Any]:
+        """閘道狀態"""
+        return {"result": "success", "port": self.serial_at.port if self.serial_at else self.port,
+                "uptime": time.time() - self.started if self.started else 0.0,
+                "stats": dict(self.stats)}
+
+    def metrics_snapshot(self) -> Dict[str, Any]:
+        """Provisioner 指標快照"""
+        return self.provisioner.metrics.snapshot()
+
+    def execute(self, op: str, *args, **params) -> Any:
+        """
+        執行一個操作
+
+        Args:
+            op (str): 操作名稱，參考 OPERATIONS
+            *args, **params: 傳給對應方法的參數
+
+        Returns:
+            對應方法的返回值
+
+        Raises:
+            ValueError: 不支援的操作
+        """
+        if op not in OPERATIONS:
+            raise ValueError(f"不支援的操作: {op}")
+        if self.provisioner is None:
+            raise RuntimeError("閘道尚未開啟")
+        target, method, uses_dongle = OPERATIONS[op]
+        func = getattr(self if target == "gateway" else getattr(self, target), method)
+        with self._stats_lock:
+            self.stats["requests"] += 1
+            self.stats["pending"] += 1
+        try:
+            if not uses_dongle:
+                return func(*args, **params)
+            with self._dongle_lock:
+                return func(*args, **params)
+        except Exception:
+            with self._stats_lock:
+                self.stats["errors"] += 1
+            raise
+        finally:
+            with self._stats_lock:
+                self.stats["pending"] -= 1
+
+    async def execute_async(self, op: str, *args, **params) -> Any:
+        """在執行緒池中執行操作，不阻塞事件迴圈"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: self.execute(op, *args, **params))
+
+
+class GatewayServer:
+    """以 Unix domain socket 提供 MeshGateway 的 JSON Lines 伺服器"""
+
+    def __init__(self, gateway: MeshGateway, path: str = DEFAULT_SOCKET_PATH):
+        """
+        Args:
+            gateway (MeshGateway): 已開啟的閘道
+            path (str): socket 檔案路徑
+        """
+        self.gateway = gateway
+        self.path = path
+        self._server = None
+        self._listening = False  # socket 檔案是否由此伺服器建立
+
+    async def _handle_request(self, line: bytes) -> Dict[str, Any]:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            result = await self.gateway.execute_async(request["op"], *request.get("args", ()),
+                                                      **request.get("params", {}))
+            return {"id": request_id, "ok": True, "result": result}
+        except Exception as e:
+            logging.debug(f"閘道請求失敗: {e}")
+            return {"id": request_id, "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                response = await self._handle_request(line)
+                writer.write(json.dumps(response, ensure_ascii=False, default=json_default).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _socket_in_use(self) -> bool:
+        """
+        檢查 socket 檔案是否仍有閘道在監聽
+
+        Returns:
+            bool: 連線成功 (有閘道在監聽) 時返回 True，連線被拒 (殘留的檔案) 或檔案不存在時返回 False；
+                  其他錯誤 (例如權限不足) 直接拋出，不移除檔案
+        """
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        probe.settimeout(1.0)
+        try:
+            probe.connect(self.path)
+            return True
+        except (ConnectionRefusedError, FileNotFoundError):
+            return False
+        finally:
+            probe.close()
+
+    async def start(self):
+        """
+        開始監聽並只允許目前使用者連線
+
+        socket 檔案已存在時先嘗試連線，只有連線被拒 (上次執行殘留的檔案) 才移除
+
+        Raises:
+            RuntimeError: 已有閘道在同一個路徑上監聽
+        """
+        if os.path.exists(self.path):
+            if self._socket_in_use():
+                raise RuntimeError(f"已有閘道在 {self.path} 上監聽")
+            logging.info(f"移除殘留的 socket 檔案 {self.path}")
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle_client, self.path, limit=1 << 20)
+        self._listening = True
+        os.chmod(self.path, 0o600)
+        logging.info(f"閘道監聽於 {self.path}")
+
+    async def serve_forever(self):
+        """開始監聽並持續服務"""
+        if self._server is None:
+            await self.start()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            self._remove_socket()
+
+    async def close(self):
+        """停止監聽"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self._remove_socket()
+
+    def _remove_socket(self):
+        # 只移除自己建立的 socket 檔案，啟動失敗時檔案屬於另一個閘道
+        if self._listening and os.path.exists(self.path):
+            os.unlink(self.path)
+        self._listening = False
+
+
+class _RemoteProxy:
+    """將方法呼叫轉為閘道操作，讓使用 Provisioner / MeshDeviceManager 的程式可改為連線閘道"""
+
+    def __init__(self, client: "GatewayClient", target: str):
+        self._client = client
+        self._operations = {method: op for op, (owner, method, _) in OPERATIONS.items() if owner == target}
+
+    def __getattr__(self, name):
+        op = self.__dict__.get("_operations", {}).get(name)
+        if op is None:
+            raise AttributeError(f"閘道不支援 {name}")
+        return lambda *args, **params: self._client.call(op, *args, **params)
+
+
+class GatewayClient:
+    """
+    閘道用戶端，以單一連線依序發送請求
+
+    provisioner 與 device_manager 屬性提供與本機物件相同名稱的方法 (限 OPERATIONS 中的方法)
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET_PATH, timeout: Optional[float] = None):
+        """
+        連線到閘道
+
+        Args:
+            path (str): socket 檔案路徑
+            timeout (float, optional): 等待回應的逾時秒數，None 表示不限 (掃描與配置可能需要數秒)
+
+        Raises:
+            OSError: 無法連線 (閘道未啟動)
+        """
+        self.path = path
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(path)
+        except OSError:
+            self._sock.close()
+            raise
+        self._file = self._sock.makefile("rwb")
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.provisioner = _RemoteProxy(self, "provisioner")
+        self.device_manager = _RemoteProxy(self, "manager")
+        self.controller = _RemoteProxy(self, "controller")
+
+    def call(self, op: str, *args, **params) -> Any:
+        """
+        執行閘道操作
+
+        Returns:
+            操作的返回值
+
+        Raises:
+            GatewayError: 閘道回報錯誤
+            ConnectionError: 連線中斷
+        """
+        with self._lock:
+            self._next_id += 1
+            request = {"id": self._next_id, "op": op, "args": list(args), "params": params}
+            self._file.write(json.dumps(request, ensure_ascii=False, default=json_default).encode("utf-8") + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        if not line:
+            raise ConnectionError("閘道已中斷連線")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise GatewayError(response.get("error"))
+        return response.get("result")
+
+    def close(self):
+        """關閉連線"""
+        try:
+            self._file.close()
+        finally:
+            self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
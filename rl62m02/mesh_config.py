@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+RL Mesh 宣告式設定套用
+讀取期望狀態的設定檔 (例如 mesh_devices.json)，與設備記錄比較後，
+只發送收斂所需的綁定 / AT+MSAA / AT+MPAS 命令
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from .provisioner import Provisioner
+from .utils import format_mac_address, format_mesh_address, is_group_address
+
+# 步驟執行順序：先綁定 (取得 unicast 地址)，再訂閱，最後設定推播
+ACTION_ORDER = {"provision": 0, "update": 1, "subscribe": 2, "publish": 3}
+
+
+def load_mesh_config(path: str) -> Dict[str, Any]:
+    """
+    載入期望狀態設定檔
+
+    Args:
+        path (str): JSON 設定檔路徑
+
+    Returns:
+        dict: 設定內容
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+class MeshConfigApplier:
+    """
+    宣告式 Mesh 設定套用引擎
+
+    設定檔格式與 mesh_devices.json 相同，每個設備可包含:
+    uuid, mac_address, unicast_addr, name, type, group (字串或列表，可為 groups 中的名稱),
+    publish 與 linked_devices (以名稱、UUID、MAC 或 unicast 地址引用其他設備)。
+    也相容 mesh_devices_config.json 的 device_name / subscribe_uid / publish_uid 欄位。
+    """
+
+    def __init__(self, device_manager, config: Dict[str, Any]):
+        """
+        初始化套用引擎
+
+        Args:
+            device_manager (MeshDeviceManager): 設備管理器，提供設備記錄與 AT 命令操作
+            config (dict): 期望狀態設定
+        """
+        self.device_manager = device_manager
+        self.config = config
+        self.logger = logging.getLogger(__name__)
+        self._group_names = {
+            name: format_mesh_address(addr) for name, addr in (config.get("groups") or {}).items()
+            if isinstance(addr, (str, int))
+        }
+        self._desired = [self._normalize_entry(idx, entry) for idx, entry in enumerate(config.get("devices", []))]
+
+    @classmethod
+    def from_file(cls, device_manager, path: str) -> 'MeshConfigApplier':
+        """從設定檔建立套用引擎"""
+        return cls(device_manager, load_mesh_config(path))
+
+    def _resolve_group(self, value) -> Optional[str]:
+        """將群組名稱或地址轉換為 0xXXXX 格式的群組地址"""
+        if value in self._group_names:
+            return self._group_names[value]
+        if is_group_address(value):
+            return format_mesh_address(value)
+        return None
+
+    def _normalize_entry(self, idx: int, entry: Dict[str, Any]) -> Dict[str, Any]:
+        """將不同格式的設備設定統一為內部格式"""
+        mac = entry.get("mac_address") or entry.get("devMac") or ""
+        groups = entry.get("group")
+        if groups is None:
+            groups = []
+        elif not isinstance(groups, list):
+            groups = [groups]
+        if entry.get("subscribe_uid"):
+            groups = groups + [entry["subscribe_uid"]]
+
+        resolved_groups = []
+        invalid_groups = []
+        for group in groups:
+            group_addr = self._resolve_group(group)
+            if group_addr is None:
+                invalid_groups.append(group)
+            elif group_addr not in resolved_groups:
+                resolved_groups.append(group_addr)
+
+        unicast_addr = entry.get("unicast_addr")
+        return {
+            "index": idx,
+            "uuid": entry.get("uuid") or "",
+            "mac": format_mac_address(mac) if mac else "",
+            "unicast_addr": format_mesh_address(unicast_addr) if unicast_addr else "",
+            "name": entry.get("name") or entry.get("device_name") or f"Device_{idx + 1}",
+            "type": entry.get("type") or "RGB_LED",
+            "position": entry.get("position") or "",
+            "groups": resolved_groups,
+            "invalid_groups": invalid_groups,
+            "publish": entry.get("publish") or entry.get("publish_uid") or "",
+            "linked_devices": list(entry.get("linked_devices") or []),
+        }
+
+    def _find_registry_device(self, desired: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """在設備記錄中尋找對應的設備 (先比對 MAC，沒有 MAC 時比對 unicast 地址與類型)"""
+        devices = self.device_manager.get_all_devices()
+        if desired["mac"]:
+            for device in devices:
+                if device.get("devMac") and format_mac_address(device["devMac"]) == desired["mac"]:
+                    return device
+            return None
+        if desired["unicast_addr"]:
+            for device in devices:
+                if device.get("uid") and format_mesh_address(device["uid"]) == desired["unicast_addr"] \
+                        and (device.get("devName") or "RGB_LED") == desired["type"]:
+                    return device
+        return None
+
+    def _find_desired(self, ref) -> Optional[Dict[str, Any]]:
+        """依名稱、UUID、MAC 或 unicast 地址尋找設定中的設備"""
+        for desired in self._desired:
+            if ref in (desired["name"], desired["uuid"]):
+                return desired
+            if desired["mac"] and format_mac_address(str(ref)) == desired["mac"]:
+                return desired
+            if desired["unicast_addr"] and format_mesh_address(ref) == desired["unicast_addr"]:
+                return desired
+        return None
+
+    def _node_addresses(self) -> Optional[set]:
+        """以 AT+NL 取得 Provisioner 上實際存在的節點地址"""
+        node_list = self.device_manager.provisioner.get_node_list()
+        addresses = set()
+        for line in node_list:
+            parts = line.split()
+            if len(parts) >= 3:
+                addresses.add(format_mesh_address(parts[2]))
+        return addresses
+
+    def plan(self, verify_nodes: bool = False) -> Dict[str, Any]:
+        """
+        比較期望狀態與目前狀態，產生收斂所需的步驟 (不發送任何命令，可作為 dry-run)
+
+        Args:
+            verify_nodes (bool): 是否以 AT+NL 確認記錄中的節點仍存在於 Provisioner，
+                                 不存在的節點會重新綁定 (此檢查會發送一個 AT 命令)
+
+        Returns:
+            dict: {'steps': 依相依順序排列的步驟列表, 'errors': 無法處理的設定, 'extra': 設定以外的狀態}
+        """
+        steps = []
+        errors = []
+        extra = []
+        node_addresses = self._node_addresses() if verify_nodes else None
+
+        # 第一輪：決定每個設備的 unicast 地址 (已綁定) 或佔位符 (待綁定)
+        addresses = {}
+        registry = {}
+        for desired in self._desired:
+            device = self._find_registry_device(desired)
+            if device and node_addresses is not None and format_mesh_address(device.get("uid", "")) not in node_addresses:
+                self.logger.info(f"設備 {desired['name']} ({device.get('uid')}) 不在節點清單中，需要重新綁定")
+                device = None
+            registry[desired["index"]] = device
+            if device:
+                addresses[desired["index"]] = format_mesh_address(device["uid"])
+                continue
+
+            addresses[desired["index"]] = f"<{desired['name']}>"
+            if not desired["uuid"]:
+                errors.append({"device": desired["name"], "error": "設備尚未綁定且設定中缺少 UUID"})
+                continue
+            steps.append({
+                "action": "provision",
+                "device": desired["name"],
+                "uuid": desired["uuid"],
+                "mac": desired["mac"],
+                "type": desired["type"],
+                "position": desired["position"],
+                "command": f"AT+PBADVCON {desired['uuid']} / AT+PROV / AT+AKA / AT+MAKB",
+                "depends_on": [],
+            })
+
+        # 第二輪：訂閱、推播與本地記錄更新
+        for desired in self._desired:
+            name = desired["name"]
+            device = registry[desired["index"]]
+            addr = addresses[desired["index"]]
+            depends = [name] if device is None else []
+            if device is None and not desired["uuid"]:
+                continue
+
+            for group in desired["invalid_groups"]:
+                errors.append({"device": name, "error": f"無效的群組: {group}"})
+
+            if device is not None:
+                changes = {}
+                if (device.get("devName") or "RGB_LED") != desired["type"]:
+                    changes["devName"] = desired["type"]
+                if device.get("devType") != desired["name"]:
+                    changes["devType"] = desired["name"]
+                if changes:
+                    steps.append({"action": "update", "device": name, "unicast_addr": addr,
+                                  "changes": changes, "command": None, "depends_on": []})
+
+            current_subs = set()
+            if device is not None:
+                current_subs = {format_mesh_address(sub) for sub in device.get("subscribe") or []}
+                extra_subs = sorted(current_subs - set(desired["groups"]))
+                if extra_subs:
+                    extra.append({"device": name, "subscribe": extra_subs})
+            for group_addr in desired["groups"]:
+                if group_addr in current_subs:
+                    continue
+                steps.append({
+                    "action": "subscribe",
+                    "device": name,
+                    "unicast_addr": addr,
+                    "group_addr": group_addr,
+                    "command": f"AT+MSAA {addr} 0 {Provisioner.MODEL_ID} {group_addr}",
+                    "depends_on": list(depends),
+                })
+
+            publish_addr, publish_depends, error = self._resolve_publish(desired, addresses)
+            if error:
+                errors.append({"device": name, "error": error})
+            elif publish_addr:
+                current_pub = device.get("publish") if device is not None else ""
+                if not current_pub or format_mesh_address(current_pub) != publish_addr:
+                    steps.append({
+                        "action": "publish",
+                        "device": name,
+                        "unicast_addr": addr,
+                        "publish_addr": publish_addr,
+                        "command": f"AT+MPAS {addr} 0 {Provisioner.MODEL_ID} {publish_addr} 0",
+                        "depends_on": sorted(set(depends + publish_depends)),
+                    })
+
+        steps.sort(key=lambda step: ACTION_ORDER[step["action"]])
+        return {"steps": steps, "errors": errors, "extra": extra}
+
+    def _resolve_publish(self, desired: Dict[str, Any], addresses: Dict[int, str]):
+        """
+        決定設備的推播地址
+
+        Returns:
+            Tuple[Optional[str], List[str], Optional[str]]: (推播地址, 相依的待綁定設備, 錯誤訊息)
+        """
+        if desired["publish"]:
+            target = self._resolve_group(desired["publish"])
+            if target:
+                return target, [], None
+            linked = [desired["publish"]]
+        else:
+            linked = desired["linked_devices"]
+        if not linked:
+            return None, [], None
+
+        targets = []
+        for ref in linked:
+            target = self._find_desired(ref)
+            if target is None:
+                if isinstance(ref, (str, int)) and not is_group_address(ref) and format_mesh_address(ref).startswith("0x"):
+                    # 設定檔以外、直接指定的 unicast 地址
+                    return format_mesh_address(ref), [], None
+                return None, [], f"找不到連動設備: {ref}"
+            targets.append(target)
+
+        if len(targets) == 1:
+            target = targets[0]
+            addr = addresses[target["index"]]
+            return addr, [target["name"]] if addr.startswith("<") else [], None
+
+        # 多個連動設備：推播到它們共同訂閱的群組
+        common = set(targets[0]["groups"])
+        for target in targets[1:]:
+            common &= set(target["groups"])
+        if not common:
+            names = [target["name"] for target in targets]
+            return None, [], f"連動設備 {names} 沒有共同訂閱的群組，無法設定推播"
+        # 群組訂閱會在推播前完成，推播只需等待這些設備綁定
+        pending = [target["name"] for target in targets if addresses[target["index"]].startswith("<")]
+        return sorted(common)[0], pending, None
+
+    def apply(self, dry_run: bool = False, verify_nodes: bool = False) -> Dict[str, Any]:
+        """
+        套用設定，依相依順序只執行需要的步驟
+
+        Args:
+            dry_run (bool): 只返回計畫，不發送任何命令
+            verify_nodes (bool): 參考 plan()
+
+        Returns:
+            dict: 包含 result、計畫步驟 (含各步驟 status) 與實際發送的 AT 步驟數
+        """
+        plan = self.plan(verify_nodes=verify_nodes)
+        if dry_run:
+            return {"result": "dry_run", **plan, "sent_commands": 0}
+
+        manager = self.device_manager
+        failed = set()
+        resolved = {}  # 設備名稱 -> 綁定後取得的 unicast 地址
+        records = {}  # 設備名稱 -> 設備記錄，每個設備只查找一次
+        sent = 0
+        changed = False
+
+        for step in plan["steps"]:
+            if any(dep in failed for dep in step["depends_on"]):
+                step["status"] = "skipped"
+                failed.add(step["device"])
+                continue
+
+            action = step["action"]
+            if action == "provision":
+                result = manager.provision_device(step["uuid"], step["device"], step["type"],
+                                                  step["position"], step["mac"] or None)
+                sent += 1
+                if result.get("result") == "success":
+                    resolved[step["device"]] = result["unicast_addr"]
+                    step["status"] = "success"
+                    step["unicast_addr"] = result["unicast_addr"]
+                else:
+                    step["status"] = "failed"
+                    step["error"] = result.get("error")
+                    failed.add(step["device"])
+                continue
+
+            addr = self._substitute(step["unicast_addr"], resolved)
+            step["unicast_addr"] = addr
+            device = records.get(step["device"])
+            if device is None:
+                device = self._find_device(addr)
+                if device is None:
+                    step["status"] = "failed"
+                    step["error"] = f"設備記錄中找不到 {addr}"
+                    failed.add(step["device"])
+                    continue
+                records[step["device"]] = device
+
+            if action == "update":
+                device.update(step["changes"])
+                step["status"] = "success"
+                changed = True
+                continue
+
+            # 以設備記錄中的 uid 呼叫，MeshDeviceManager 以完全相同的字串查找設備
+            if action == "subscribe":
+                result = manager.set_subscription(device["uid"], step["group_addr"], save_after_set=False)
+            else:
+                target = self._substitute(step["publish_addr"], resolved)
+                result = manager.set_publication(device["uid"], target, save_after_set=False)
+            sent += 1
+            step["status"] = "success" if result.get("result") == "success" else "failed"
+            if step["status"] == "success":
+                changed = True
+            else:
+                step["error"] = result.get("error")
+                failed.add(step["device"])
+
+        if changed:
+            manager.save_device_data()
+
+        result = "success" if not failed and not plan["errors"] else "partial"
+        self.logger.info(f"設定套用完成: {result}，發送 {sent} 個 AT 步驟")
+        return {"result": result, **plan, "sent_commands": sent}
+
+    def _find_device(self, unicast_addr: str) -> Optional[Dict[str, Any]]:
+        """以 format_mesh_address 比對設備記錄 (記錄中的 uid 大小寫不一定與設定檔相同)"""
+        unicast_addr = format_mesh_address(unicast_addr)
+        return next((device for device in self.device_manager.get_all_devices()
+                     if format_mesh_address(device.get("uid", "")) == unicast_addr), None)
+
+    @staticmethod
+    def _substitute(addr: str, resolved: Dict[str, str]) -> str:
+        """將佔位符 <設備名稱> 替換為綁定後取得的地址"""
+        if addr.startswith("<") and addr.endswith(">"):
+            return resolved.get(addr[1:-1], addr)
+        return addr
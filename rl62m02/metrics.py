@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+執行期指標
+以計數器、量表與直方圖記錄 AT 命令延遲、逾時、錯誤、TX 佇列深度與 RX 行數等資訊，
+提供 snapshot() 快照與 Prometheus 文字格式輸出，並可啟動本機 HTTP 端點供抓取
+"""
+
+import json
+import time
+import bisect
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# 預設的延遲直方圖區間 (秒)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+# 收集函數返回的樣本: (名稱, 類型 counter / gauge, 說明, 標籤, 值)
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+    """將標籤字典轉為可作為字典鍵的排序元組"""
+    return tuple(sorted((key, str(value)) for key, value in labels.items())) if labels else ()
+
+
+def _escape(value: str) -> str:
+    """Prometheus 標籤值跳脫"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    """格式化為 {key="value",...}"""
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _label_key(labels: Labels) -> str:
+    """快照中使用的標籤字串，例如 'command=AT+MDTS'"""
+    return ",".join(f"{key}={value}" for key, value in labels)
+
+
+class Histogram:
+    """固定區間的直方圖"""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # 最後一格為 +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """記錄一個觀察值"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """以區間上限估計分位數，沒有資料時返回 None"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+class RateMeter:
+    """以每秒區間統計最近 window 秒內的平均速率"""
+
+    def __init__(self, window: int = 10, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self._clock = clock
+        self._slots = deque()  # [秒, 次數]
+
+    def mark(self, count: int = 1):
+        """記錄 count 次事件"""
+        second = int(self._clock())
+        if self._slots and self._slots[-1][0] == second:
+            self._slots[-1][1] += count
+        else:
+            self._slots.append([second, count])
+            self._trim(second)
+
+    def _trim(self, now: int):
+        while self._slots and self._slots[0][0] <= now - self.window:
+            self._slots.popleft()
+
+    def rate(self) -> float:
+        """最近 window 秒內的每秒平均次數"""
+        now = int(self._clock())
+        self._trim(now)
+        return sum(count for _, count in self._slots) / self.window
+
+
+class MetricsRegistry:
+    """
+    執行緒安全的指標登錄表
+
+    指標以 (名稱, 標籤) 區分，第一次使用時自動建立；
+    add_collector() 註冊的函數在輸出時才被呼叫，用於匯出其他元件既有的統計字典
+    """
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._help: Dict[str, str] = {}
+        self._collectors: Dict[str, Callable[[], List[Sample]]] = {}
+
+    def describe(self, name: str, help_text: str):
+        """設定指標說明 (Prometheus 的 HELP)"""
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, labels: Dict[str, str] = None):
+        """計數器加 value"""
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Dict[str, str] = None):
+        """設定量表的值"""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_labels(labels)] = value
+
+    def add_gauge(self, name: str, delta: float, labels: Dict[str, str] = None):
+        """量表加減 delta"""
+        key = _labels(labels)
+        with self._lock:
+            series = self._gauges.setdefault(name, {})
+            series[key] = series.get(key, 0) + delta
+
+    def observe(self, name: str, value: float, labels: Dict[str, str] = None):
+        """直方圖記錄一個觀察值"""
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def add_collector(self, name: str, collector: Callable[[], List[Sample]]):
+        """
+        註冊收集函數，同名的收集函數會被取代
+
+        Args:
+            name (str): 收集函數名稱
+            collector (callable): 返回 [(名稱, 'counter' 或 'gauge', 說明, 標籤, 值), ...]
+        """
+        with self._lock:
+            self._collectors[name] = collector
+
+    def remove_collector(self, name: str):
+        """移除收集函數"""
+        with self._lock:
+            self._collectors.pop(name, None)
+
+    def _collect(self):
+        """複製目前的指標並合併收集函數的樣本"""
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            gauges = {name: dict(series) for name, series in self._gauges.items()}
+            histograms = {name: {key: (tuple(h.counts), h.count, h.sum, h.quantile(0.5), h.quantile(0.99))
+                                 for key, h in series.items()}
+                          for name, series in self._histograms.items()}
+            collectors = list(self._collectors.values())
+        for collector in collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                logging.debug(f"指標收集函數發生錯誤: {e}")
+                continue
+            for name, kind, help_text, labels, value in samples:
+                target = counters if kind == "counter" else gauges
+                target.setdefault(name, {})[_labels(labels)] = value
+                self._help.setdefault(name, help_text)
+        return counters, gauges, histograms
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        取得目前所有指標的快照
+
+        Returns:
+            dict: {'counters': {名稱: {標籤: 值}}, 'gauges': {...},
+                   'histograms': {名稱: {標籤: {'count', 'sum', 'mean', 'p50', 'p99', 'buckets'}}}}；
+                  標籤以 'key=value,...' 表示，沒有標籤時為空字串，p50 / p99 為區間上限的估計值
+        """
+        counters, gauges, histograms = self._collect()
+        result = {
+            "counters": {name: {_label_key(key): value for key, value in series.items()}
+                         for name, series in counters.items()},
+            "gauges": {name: {_label_key(key): value for key, value in series.items()}
+                       for name, series in gauges.items()},
+            "histograms": {},
+        }
+        for name, series in histograms.items():
+            result["histograms"][name] = {
+                _label_key(key): {
+                    "count": count,
+                    "sum": total,
+                    "mean": total / count if count else 0.0,
+                    "p50": p50,
+                    "p99": p99,
+                    "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], counts)),
+                }
+                for key, (counts, count, total, p50, p99) in series.items()
+            }
+        return result
+
+    def render_prometheus(self) -> str:
+        """
+        以 Prometheus 文字格式 (0.0.4) 輸出所有指標
+
+        Returns:
+            str: 可直接作為 /metrics 回應的內容
+        """
+        counters, gauges, histograms = self._collect()
+        lines = []
+        for kind, metrics in (("counter", counters), ("gauge", gauges)):
+            for name in sorted(metrics):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(metrics[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+        bounds = [repr(float(b)) for b in self.buckets] + ["+Inf"]
+        for name in sorted(histograms):
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, (counts, count, total, _, _) in sorted(histograms[name].items()):
+                cumulative = 0
+                for bound, bucket_count in zip(bounds, counts):
+                    cumulative += bucket_count
+                    le = f'le="{bound}"'
+                    lines.append(f"{name}_bucket{_format_labels(key, le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> "ThreadingHTTPServer":
+        """
+        在背景執行緒啟動 HTTP 端點: /metrics 為 Prometheus 文字格式，/metrics.json 為 snapshot()
+
+        Args:
+            port (int): 監聽埠，0 表示自動選擇
+            host (str): 監聽地址，預設只接受本機連線
+
+        Returns:
+            ThreadingHTTPServer: 伺服器實例，呼叫 shutdown() 與 server_close() 停止
+        """
+        # http.server 只在啟動端點時導入，避免拖慢套件載入
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body = registry.render_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = json.dumps(registry.snapshot()).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug(f"metrics HTTP: {format % args}")
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        logging.info(f"指標端點已啟動: http://{host}:{server.server_address[1]}/metrics")
+        return server
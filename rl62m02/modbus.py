@@ -3,6 +3,193 @@ MODBUS RTU 協議處理類別
 包含產生 RTU 封包與解析 RTU 封包的功能
 """
 
+import sys
+import struct
+from array import array
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+
+def _numpy():
+    """延遲導入 NumPy (選用依賴，導入需數十毫秒，只在 as_numpy=True 時才需要)"""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("as_numpy=True 需要安裝 NumPy")
+    return numpy
+
+
+def _is_ndarray(values) -> bool:
+    """是否為 NumPy 陣列；尚未導入 NumPy 時不可能是，不觸發導入"""
+    numpy = sys.modules.get("numpy")
+    return numpy is not None and isinstance(values, numpy.ndarray)
+
+
+def _generate_crc_table():
+    """生成 CRC16 (MODBUS) 查表法所需的表"""
+    crc_table = []
+    for i in range(256):
+        crc = i
+        for j in range(8):
+            if crc & 0x01:
+                crc = (crc >> 1) ^ 0xA001  # MODBUS CRC-16 多項式 0xA001
+            else:
+                crc = crc >> 1
+        crc_table.append(crc)
+    return crc_table
+
+
+# 模組載入時只計算一次，所有 ModbusRTU 實例共用
+CRC_TABLE = tuple(_generate_crc_table())
+
+# 讀取 / 單一寫入請求: 從站、功能碼、地址、數量或值
+_REQUEST = struct.Struct(">BBHH")
+_REQUEST_SIZE = _REQUEST.size + 2
+# CRC 以低位在前的方式附加在封包最後
+_CRC = struct.Struct("<H")
+
+
+def crc16(data, crc: int = 0xFFFF) -> int:
+    """
+    計算 MODBUS CRC-16
+
+    Args:
+        data: bytes、bytearray 或 memoryview
+        crc (int): 初始值，可傳入前一段資料的結果以連續計算
+
+    Returns:
+        int: CRC 值；對包含正確 CRC 的完整封包計算時結果為 0
+    """
+    table = CRC_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+# array('H') 以原生位元組順序儲存，Modbus 寄存器為大端序
+_NATIVE_LITTLE = sys.byteorder == "little"
+# 每個位元組對應的 8 個線圈狀態 (低位元在前)
+_BIT_TABLE = tuple(tuple(bool(byte >> bit & 1) for bit in range(8)) for byte in range(256))
+
+
+def decode_registers(data, as_numpy: bool = False):
+    """
+    將大端序的寄存器資料一次轉換為數值陣列，不需逐一處理每個寄存器
+
+    Args:
+        data: 寄存器資料 (bytes / bytearray / memoryview)，奇數長度時忽略最後一個位元組
+        as_numpy (bool): 返回 NumPy '>u2' 檢視 (不複製資料)，需安裝 NumPy
+
+    Returns:
+        array('H') 或 numpy.ndarray
+    """
+    count = len(data) // 2
+    if as_numpy:
+        return _numpy().frombuffer(data, dtype='>u2', count=count)
+    registers = array('H')
+    registers.frombytes(bytes(data[:count * 2]))
+    if _NATIVE_LITTLE:
+        registers.byteswap()
+    return registers
+
+
+def decode_bits(data, quantity: Optional[int] = None, as_numpy: bool = False):
+    """
+    將線圈 / 離散輸入資料轉換為布林值 (每個位元組低位元在前)
+
+    Args:
+        data: 位元資料
+        quantity (int, optional): 只返回前 quantity 個
+        as_numpy (bool): 返回 NumPy 布林陣列，需安裝 NumPy
+
+    Returns:
+        list 或 numpy.ndarray
+    """
+    if as_numpy:
+        np = _numpy()
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder='little').astype(bool)
+        return bits[:quantity]
+    table = _BIT_TABLE
+    bits = [bit for byte in data for bit in table[byte]]
+    return bits if quantity is None else bits[:quantity]
+
+
+def _register_bytes(registers, word_order: str) -> bytes:
+    """將寄存器序列轉為大端序位元組，word_order 為 'little' 時交換每對寄存器"""
+    if word_order not in ("big", "little"):
+        raise ValueError(f"無效的字組順序: {word_order}")
+    if len(registers) % 2:
+        raise ValueError("32 位元數值需要偶數個寄存器")
+    if _is_ndarray(registers):
+        words = registers.astype('>u2', copy=False)
+        if word_order == "little":
+            words = words.reshape(-1, 2)[:, ::-1]
+        return _numpy().ascontiguousarray(words).tobytes()
+    words = array('H', registers)
+    if word_order == "little":
+        words[0::2], words[1::2] = words[1::2], words[0::2]
+    if _NATIVE_LITTLE:
+        words.byteswap()
+    return words.tobytes()
+
+
+def _unpack_pairs(registers, code: str, word_order: str):
+    """將寄存器對解為 32 位元數值"""
+    data = _register_bytes(registers, word_order)
+    if _is_ndarray(registers):
+        return _numpy().frombuffer(data, dtype={'I': '>u4', 'i': '>i4', 'f': '>f4'}[code])
+    return list(struct.unpack(f">{len(data) // 4}{code}", data))
+
+
+def registers_to_int32(registers, signed: bool = False, word_order: str = "big"):
+    """
+    將寄存器對 (高位寄存器在前) 合併為 32 位元整數
+
+    Args:
+        registers: 寄存器值序列 (list / array('H') / NumPy 陣列)，長度需為偶數
+        signed (bool): 是否為有號整數
+        word_order (str): 'big' 為高位寄存器在前，'little' 為低位寄存器在前
+
+    Returns:
+        list，輸入為 NumPy 陣列時返回 NumPy 陣列
+    """
+    return _unpack_pairs(registers, 'i' if signed else 'I', word_order)
+
+
+def registers_to_float32(registers, word_order: str = "big"):
+    """
+    將寄存器對合併為 IEEE 754 單精度浮點數
+
+    Args:
+        registers: 寄存器值序列，長度需為偶數
+        word_order (str): 'big' 為高位寄存器在前，'little' 為低位寄存器在前
+
+    Returns:
+        list，輸入為 NumPy 陣列時返回 NumPy 陣列
+    """
+    return _unpack_pairs(registers, 'f', word_order)
+
+
+def _pack_pairs(values, code: str, word_order: str) -> List[int]:
+    """將 32 位元數值拆為寄存器對"""
+    data = struct.pack(f">{len(values)}{code}", *values)
+    registers = list(decode_registers(data))
+    if word_order == "little":
+        registers[0::2], registers[1::2] = registers[1::2], registers[0::2]
+    elif word_order != "big":
+        raise ValueError(f"無效的字組順序: {word_order}")
+    return registers
+
+
+def int32_to_registers(values: Sequence[int], signed: bool = False, word_order: str = "big") -> List[int]:
+    """將 32 位元整數拆為寄存器對，可直接用於 write_multiple_registers_request"""
+    return _pack_pairs(values, 'i' if signed else 'I', word_order)
+
+
+def float32_to_registers(values: Sequence[float], word_order: str = "big") -> List[int]:
+    """將單精度浮點數拆為寄存器對，可直接用於 write_multiple_registers_request"""
+    return _pack_pairs(values, 'f', word_order)
+
+
 class ModbusRTU:
     """
     MODBUS RTU 協議處理類別
@@ -32,21 +219,12 @@ class ModbusRTU:
     
     def __init__(self):
         """初始化 ModbusRTU 類別"""
-        # 初始化 CRC 表
-        self._crc_table = self._generate_crc_table()
+        # CRC 表於模組載入時計算一次，此屬性保留給既有程式使用
+        self._crc_table = CRC_TABLE
     
     def _generate_crc_table(self):
         """生成 CRC16 (MODBUS) 查表法所需的表"""
-        crc_table = []
-        for i in range(256):
-            crc = i
-            for j in range(8):
-                if crc & 0x01:
-                    crc = (crc >> 1) ^ 0xA001  # MODBUS CRC-16 多項式 0xA001
-                else:
-                    crc = crc >> 1
-            crc_table.append(crc)
-        return crc_table
+        return list(CRC_TABLE)
     
     def _calculate_crc(self, data):
         """
@@ -58,11 +236,8 @@ class ModbusRTU:
         Returns:
             bytes: 2 bytes CRC 校驗碼 (低位在前，高位在後)
         """
-        crc = 0xFFFF
-        for byte in data:
-            crc = (crc >> 8) ^ self._crc_table[(crc ^ byte) & 0xFF]
         # 返回低位在前，高位在後的 CRC
-        return bytes([crc & 0xFF, crc >> 8])
+        return _CRC.pack(crc16(data))
     
     def _verify_crc(self, data):
         """
@@ -76,10 +251,8 @@ class ModbusRTU:
         """
         if len(data) < 2:
             return False
-        message = data[:-2]
-        received_crc = data[-2:]
-        calculated_crc = self._calculate_crc(message)
-        return received_crc == calculated_crc
+        # 對包含 CRC 的完整封包計算 CRC 時結果為 0，不需要切出訊息部分
+        return crc16(data) == 0
     
     def create_rtu_packet(self, slave_address, function_code, data):
         """
@@ -97,14 +270,47 @@ class ModbusRTU:
         if not (0 <= slave_address <= 247):
             raise ValueError("從站地址必須在 0-247 範圍內")
         
-        # 組合封包 (不含 CRC)
-        packet = bytes([slave_address, function_code]) + data
+        # 一次配置完整封包: 從站 + 功能碼 + 數據 + CRC
+        length = len(data) + 4
+        packet = bytearray(length)
+        packet[0] = slave_address
+        packet[1] = function_code
+        packet[2:length - 2] = data
         
-        # 計算並添加 CRC
-        crc = self._calculate_crc(packet)
+        # 計算並寫入 CRC
+        _CRC.pack_into(packet, length - 2, crc16(memoryview(packet)[:length - 2]))
         
         # 返回完整封包
-        return packet + crc
+        return bytes(packet)
+    
+    def _encode_request_into(self, buffer: bytearray, offset: int, slave_address: int, function_code: int,
+                             address: int, value: int) -> int:
+        """
+        將固定長度 (8 bytes) 的請求寫入緩衝區
+        
+        Args:
+            buffer (bytearray): 目標緩衝區
+            offset (int): 寫入位置
+            slave_address (int): 從站地址
+            function_code (int): 功能碼
+            address (int): 起始地址
+            value (int): 數量或寫入值
+            
+        Returns:
+            int: 下一個寫入位置
+        """
+        if not (0 <= slave_address <= 247):
+            raise ValueError("從站地址必須在 0-247 範圍內")
+        _REQUEST.pack_into(buffer, offset, slave_address, function_code, address, value)
+        end = offset + _REQUEST.size
+        _CRC.pack_into(buffer, end, crc16(memoryview(buffer)[offset:end]))
+        return end + 2
+    
+    def _request(self, slave_address: int, function_code: int, address: int, value: int) -> bytes:
+        """建立固定長度 (8 bytes) 的請求封包"""
+        buffer = bytearray(_REQUEST_SIZE)
+        self._encode_request_into(buffer, 0, slave_address, function_code, address, value)
+        return bytes(buffer)
     
     def parse_rtu_packet(self, packet):
         """
@@ -127,8 +333,8 @@ class ModbusRTU:
         if len(packet) < 4:  # 至少需要地址(1) + 功能碼(1) + CRC(2)
             return None
         
-        # 驗證 CRC
-        if not self._verify_crc(packet):
+        # 驗證 CRC (對包含 CRC 的完整封包計算結果為 0)
+        if crc16(packet) != 0:
             return None
         
         # 解析封包
@@ -138,7 +344,7 @@ class ModbusRTU:
         
         # 檢查是否為異常回覆
         is_exception = (function_code & 0x80) != 0
-        exception_code = data[0] if is_exception else None
+        exception_code = data[0] if is_exception and data else None
         
         return {
             'slave_address': slave_address,
@@ -165,14 +371,17 @@ class ModbusRTU:
         if not (1 <= quantity <= 125):
             raise ValueError("寄存器數量必須在 1-125 範圍內")
         
-        data = bytes([
-            (start_address >> 8) & 0xFF,
-            start_address & 0xFF,
-            (quantity >> 8) & 0xFF,
-            quantity & 0xFF
-        ])
-        
-        return self.create_rtu_packet(slave_address, self.READ_HOLDING_REGISTERS, data)
+        return self._request(slave_address, self.READ_HOLDING_REGISTERS, start_address, quantity)
+    
+    def _read_response_data(self, packet, function_code):
+        """驗證讀取回應並返回位元組數之後的資料，失敗時返回 None"""
+        parsed = self.parse_rtu_packet(packet)
+        if parsed is None or parsed['function_code'] != function_code or parsed['is_exception']:
+            return None
+        data = parsed['data']
+        if not data or len(data) != data[0] + 1:
+            return None
+        return data[1:]
     
     def read_holding_registers_response(self, packet):
         """
@@ -184,21 +393,37 @@ class ModbusRTU:
         Returns:
             list: 包含讀取到的寄存器值的列表，如果解析失敗則返回 None
         """
-        parsed = self.parse_rtu_packet(packet)
-        if parsed is None or parsed['function_code'] != self.READ_HOLDING_REGISTERS or parsed['is_exception']:
-            return None
-        
-        byte_count = parsed['data'][0]
-        if len(parsed['data']) != byte_count + 1:
-            return None
+        data = self._read_response_data(packet, self.READ_HOLDING_REGISTERS)
+        return None if data is None else decode_registers(data).tolist()
+    
+    def read_input_registers_response(self, packet):
+        """
+        解析讀取輸入寄存器 (功能碼 0x04) 回覆封包
         
-        # 解析寄存器值 (每個寄存器 2 bytes)
-        registers = []
-        for i in range(1, byte_count, 2):
-            register_value = (parsed['data'][i] << 8) + parsed['data'][i+1]
-            registers.append(register_value)
+        Args:
+            packet (bytes): 完整的 MODBUS RTU 回覆封包
+            
+        Returns:
+            list: 包含讀取到的寄存器值的列表，如果解析失敗則返回 None
+        """
+        data = self._read_response_data(packet, self.READ_INPUT_REGISTERS)
+        return None if data is None else decode_registers(data).tolist()
+    
+    def decode_register_block(self, packet, as_numpy=False):
+        """
+        解析 FC03 / FC04 回覆封包為寄存器陣列 (適合大量寄存器)
         
-        return registers
+        Args:
+            packet (bytes): 完整的 MODBUS RTU 回覆封包
+            as_numpy (bool): 返回 NumPy '>u2' 陣列，需安裝 NumPy
+            
+        Returns:
+            array('H') 或 numpy.ndarray，如果解析失敗則返回 None
+        """
+        if len(packet) < 2 or packet[1] not in (self.READ_HOLDING_REGISTERS, self.READ_INPUT_REGISTERS):
+            return None
+        data = self._read_response_data(packet, packet[1])
+        return None if data is None else decode_registers(data, as_numpy)
     
     def write_single_register_request(self, slave_address, register_address, register_value):
         """
@@ -215,14 +440,7 @@ class ModbusRTU:
         if not (0 <= register_value <= 0xFFFF):
             raise ValueError("寄存器值必須在 0-65535 範圍內")
         
-        data = bytes([
-            (register_address >> 8) & 0xFF,
-            register_address & 0xFF,
-            (register_value >> 8) & 0xFF,
-            register_value & 0xFF
-        ])
-        
-        return self.create_rtu_packet(slave_address, self.WRITE_SINGLE_REGISTER, data)
+        return self._request(slave_address, self.WRITE_SINGLE_REGISTER, register_address, register_value)
     
     def write_multiple_registers_request(self, slave_address, start_address, register_values):
         """
@@ -239,25 +457,22 @@ class ModbusRTU:
         if not (1 <= len(register_values) <= 123):
             raise ValueError("寄存器數量必須在 1-123 範圍內")
         
-        quantity = len(register_values)
-        byte_count = quantity * 2
-        
-        # 頭部: 起始地址 + 數量 + 字節數
-        data = bytes([
-            (start_address >> 8) & 0xFF,
-            start_address & 0xFF,
-            (quantity >> 8) & 0xFF,
-            quantity & 0xFF,
-            byte_count
-        ])
-        
-        # 添加寄存器值
+        if not (0 <= slave_address <= 247):
+            raise ValueError("從站地址必須在 0-247 範圍內")
         for value in register_values:
             if not (0 <= value <= 0xFFFF):
                 raise ValueError(f"寄存器值 {value} 超出範圍 (0-65535)")
-            data += bytes([(value >> 8) & 0xFF, value & 0xFF])
         
-        return self.create_rtu_packet(slave_address, self.WRITE_MULTIPLE_REGISTERS, data)
+        quantity = len(register_values)
+        byte_count = quantity * 2
+        
+        # 一次寫入頭部 (從站 + 功能碼 + 起始地址 + 數量 + 字節數) 與所有寄存器值
+        length = 7 + byte_count + 2
+        packet = bytearray(length)
+        struct.pack_into(f">BBHHB{quantity}H", packet, 0, slave_address, self.WRITE_MULTIPLE_REGISTERS,
+                         start_address, quantity, byte_count, *register_values)
+        _CRC.pack_into(packet, length - 2, crc16(memoryview(packet)[:length - 2]))
+        return bytes(packet)
     
     def read_input_registers_request(self, slave_address, start_address, quantity):
         """
@@ -274,14 +489,7 @@ class ModbusRTU:
         if not (1 <= quantity <= 125):
             raise ValueError("寄存器數量必須在 1-125 範圍內")
         
-        data = bytes([
-            (start_address >> 8) & 0xFF,
-            start_address & 0xFF,
-            (quantity >> 8) & 0xFF,
-            quantity & 0xFF
-        ])
-        
-        return self.create_rtu_packet(slave_address, self.READ_INPUT_REGISTERS, data)
+        return self._request(slave_address, self.READ_INPUT_REGISTERS, start_address, quantity)
     
     def read_coils_request(self, slave_address, start_address, quantity):
         """
@@ -298,14 +506,7 @@ class ModbusRTU:
         if not (1 <= quantity <= 2000):
             raise ValueError("線圈數量必須在 1-2000 範圍內")
         
-        data = bytes([
-            (start_address >> 8) & 0xFF,
-            start_address & 0xFF,
-            (quantity >> 8) & 0xFF,
-            quantity & 0xFF
-        ])
-        
-        return self.create_rtu_packet(slave_address, self.READ_COILS, data)
+        return self._request(slave_address, self.READ_COILS, start_address, quantity)
     
     def read_coils_response(self, packet):
         """
@@ -317,22 +518,38 @@ class ModbusRTU:
         Returns:
             list: 包含讀取到的線圈狀態的列表 (True/False)，如果解析失敗則返回 None
         """
-        parsed = self.parse_rtu_packet(packet)
-        if parsed is None or parsed['function_code'] != self.READ_COILS or parsed['is_exception']:
-            return None
+        data = self._read_response_data(packet, self.READ_COILS)
+        return None if data is None else decode_bits(data)
+    
+    def read_discrete_inputs_request(self, slave_address, start_address, quantity):
+        """
+        生成讀取離散輸入 (功能碼 0x02) 請求封包
         
-        byte_count = parsed['data'][0]
-        if len(parsed['data']) != byte_count + 1:
-            return None
+        Args:
+            slave_address (int): 從站地址
+            start_address (int): 起始輸入地址
+            quantity (int): 要讀取的輸入數量
+            
+        Returns:
+            bytes: 完整的 MODBUS RTU 封包
+        """
+        if not (1 <= quantity <= 2000):
+            raise ValueError("離散輸入數量必須在 1-2000 範圍內")
         
-        coils = []
-        for i in range(1, byte_count + 1):
-            byte_value = parsed['data'][i]
-            for bit in range(8):
-                coil_state = (byte_value & (1 << bit)) != 0
-                coils.append(coil_state)
+        return self._request(slave_address, self.READ_DISCRETE_INPUTS, start_address, quantity)
+    
+    def read_discrete_inputs_response(self, packet):
+        """
+        解析讀取離散輸入 (功能碼 0x02) 回覆封包
         
-        return coils
+        Args:
+            packet (bytes): 完整的 MODBUS RTU 回覆封包
+            
+        Returns:
+            list: 包含讀取到的輸入狀態的列表 (True/False)，如果解析失敗則返回 None
+        """
+        data = self._read_response_data(packet, self.READ_DISCRETE_INPUTS)
+        return None if data is None else decode_bits(data)
     
     def write_single_coil_request(self, slave_address, coil_address, coil_value):
         """
@@ -348,14 +565,122 @@ class ModbusRTU:
         """
         value = 0xFF00 if coil_value else 0x0000
         
-        data = bytes([
-            (coil_address >> 8) & 0xFF,
-            coil_address & 0xFF,
-            (value >> 8) & 0xFF,
-            value & 0xFF
-        ])
+        return self._request(slave_address, self.WRITE_SINGLE_COIL, coil_address, value)
+    
+    def write_multiple_coils_request(self, slave_address, start_address, coil_values):
+        """
+        生成寫入多個線圈 (功能碼 0x0F) 請求封包
         
-        return self.create_rtu_packet(slave_address, self.WRITE_SINGLE_COIL, data)
+        Args:
+            slave_address (int): 從站地址
+            start_address (int): 起始線圈地址
+            coil_values (list): 線圈值列表 (True/False)
+            
+        Returns:
+            bytes: 完整的 MODBUS RTU 封包
+        """
+        quantity = len(coil_values)
+        if not (1 <= quantity <= 1968):
+            raise ValueError("線圈數量必須在 1-1968 範圍內")
+        
+        # 每 8 個線圈組成一個位元組，低位元在前
+        packed = bytearray((quantity + 7) // 8)
+        for index, value in enumerate(coil_values):
+            if value:
+                packed[index >> 3] |= 1 << (index & 7)
+        
+        data = struct.pack(">HHB", start_address, quantity, len(packed)) + packed
+        return self.create_rtu_packet(slave_address, self.WRITE_MULTIPLE_COILS, data)
+    
+    def _write_response_fields(self, packet, function_code):
+        """驗證寫入回覆並返回 (地址, 值或數量)，失敗時返回 None"""
+        parsed = self.parse_rtu_packet(packet)
+        if (parsed is None or parsed['function_code'] != function_code or parsed['is_exception']
+                or len(parsed['data']) != 4):
+            return None
+        return struct.unpack(">HH", parsed['data'])
+    
+    def write_single_coil_response(self, packet):
+        """
+        解析寫入單個線圈 (功能碼 0x05) 回覆封包
+        
+        Returns:
+            dict: {'address', 'value'}，value 為 True/False，如果解析失敗則返回 None
+        """
+        fields = self._write_response_fields(packet, self.WRITE_SINGLE_COIL)
+        if fields is None or fields[1] not in (0xFF00, 0x0000):
+            return None
+        return {'address': fields[0], 'value': fields[1] == 0xFF00}
+    
+    def write_single_register_response(self, packet):
+        """
+        解析寫入單個寄存器 (功能碼 0x06) 回覆封包
+        
+        Returns:
+            dict: {'address', 'value'}，如果解析失敗則返回 None
+        """
+        fields = self._write_response_fields(packet, self.WRITE_SINGLE_REGISTER)
+        return None if fields is None else {'address': fields[0], 'value': fields[1]}
+    
+    def write_multiple_coils_response(self, packet):
+        """
+        解析寫入多個線圈 (功能碼 0x0F) 回覆封包
+        
+        Returns:
+            dict: {'address', 'quantity'}，如果解析失敗則返回 None
+        """
+        fields = self._write_response_fields(packet, self.WRITE_MULTIPLE_COILS)
+        return None if fields is None else {'address': fields[0], 'quantity': fields[1]}
+    
+    def write_multiple_registers_response(self, packet):
+        """
+        解析寫入多個寄存器 (功能碼 0x10) 回覆封包
+        
+        Returns:
+            dict: {'address', 'quantity'}，如果解析失敗則返回 None
+        """
+        fields = self._write_response_fields(packet, self.WRITE_MULTIPLE_REGISTERS)
+        return None if fields is None else {'address': fields[0], 'quantity': fields[1]}
+    
+    def decode_response(self, packet, quantity=None, as_numpy=False):
+        """
+        依功能碼解析任一支援的回覆封包
+        
+        Args:
+            packet (bytes): 完整的 MODBUS RTU 回覆封包
+            quantity (int, optional): 讀取線圈 / 離散輸入時的實際數量，用於去除填充位元
+            as_numpy (bool): 寄存器與位元以 NumPy 陣列返回
+            
+        Returns:
+            dict: parse_rtu_packet 的結果加上 'values' (讀取) 或 'address' 與 'value' / 'quantity' (寫入)，
+                  如果 CRC 錯誤或格式不符則返回 None
+        """
+        parsed = self.parse_rtu_packet(packet)
+        if parsed is None or parsed['is_exception']:
+            return parsed
+        function_code = parsed['function_code']
+        if function_code in (self.READ_HOLDING_REGISTERS, self.READ_INPUT_REGISTERS):
+            values = self.decode_register_block(packet, as_numpy)
+            if values is None:
+                return None
+            parsed['values'] = values
+        elif function_code in (self.READ_COILS, self.READ_DISCRETE_INPUTS):
+            data = self._read_response_data(packet, function_code)
+            if data is None:
+                return None
+            parsed['values'] = decode_bits(data, quantity, as_numpy)
+        else:
+            decoder = {
+                self.WRITE_SINGLE_COIL: self.write_single_coil_response,
+                self.WRITE_SINGLE_REGISTER: self.write_single_register_response,
+                self.WRITE_MULTIPLE_COILS: self.write_multiple_coils_response,
+                self.WRITE_MULTIPLE_REGISTERS: self.write_multiple_registers_response,
+            }.get(function_code)
+            fields = decoder(packet) if decoder else None
+            if fields is None:
+                return None
+            parsed.update(fields)
+        return parsed
     
     def get_exception_message(self, exception_code):
         """
@@ -379,4 +704,183 @@ class ModbusRTU:
             self.EXCEPTION_GATEWAY_TARGET_FAILED: "閘道目標設備回應失敗"
         }
         
-        return exception_messages.get(exception_code, f"未知異常碼 {exception_code}")
\ No newline at end of file
+        return exception_messages.get(exception_code, f"未知異常碼 {exception_code}")
+    
+    # === 批次編碼與解碼 ===
+    
+    # 可批次編碼的固定長度 (8 bytes) 請求功能碼
+    FIXED_LENGTH_REQUESTS = (READ_COILS, READ_DISCRETE_INPUTS, READ_HOLDING_REGISTERS,
+                             READ_INPUT_REGISTERS, WRITE_SINGLE_COIL, WRITE_SINGLE_REGISTER)
+    
+    def encode_requests(self, requests: Iterable[Tuple[int, int, int, int]],
+                        buffer: Optional[bytearray] = None) -> memoryview:
+        """
+        批次編碼多個固定長度的請求到同一個緩衝區
+        
+        Args:
+            requests: (從站地址, 功能碼, 地址, 數量或值) 列表，功能碼需為 FC01-FC06；
+                      FC05 的值需為 0xFF00 或 0x0000
+            buffer (bytearray, optional): 可重複使用的緩衝區，長度不足時會擴充
+            
+        Returns:
+            memoryview: 編碼結果，第 i 個封包位於 [i * 8:(i + 1) * 8]
+        """
+        if not isinstance(requests, (list, tuple)):
+            requests = list(requests)
+        size = len(requests) * _REQUEST_SIZE
+        if buffer is None:
+            buffer = bytearray(size)
+        elif len(buffer) < size:
+            buffer.extend(bytes(size - len(buffer)))
+        offset = 0
+        for slave_address, function_code, address, value in requests:
+            if function_code not in self.FIXED_LENGTH_REQUESTS:
+                raise ValueError(f"功能碼 {function_code} 不是固定長度的請求")
+            offset = self._encode_request_into(buffer, offset, slave_address, function_code, address, value)
+        return memoryview(buffer)[:size]
+    
+    def split_requests(self, encoded) -> List[bytes]:
+        """將 encode_requests 的結果切成個別封包"""
+        return [bytes(encoded[i:i + _REQUEST_SIZE]) for i in range(0, len(encoded), _REQUEST_SIZE)]
+    
+    def decode_responses(self, packets: Sequence[bytes]) -> List[Optional[dict]]:
+        """
+        批次解析多個回應封包
+        
+        Args:
+            packets: 回應封包列表
+            
+        Returns:
+            list: 與 parse_rtu_packet 相同格式的結果列表，CRC 錯誤的封包為 None
+        """
+        parse = self.parse_rtu_packet
+        return [parse(packet) for packet in packets]
+
+
+class ModbusRTUFrameParser:
+    """
+    串流式 Modbus RTU 訊框解析器
+
+    以 feed() 逐段輸入收到的位元組 (可能是不完整的訊框，或多個連在一起的訊框)，
+    依功能碼的長度規則切出完整訊框並驗證 CRC。CRC 隨資料到達持續累算，
+    不完整的訊框在後續資料到達時不需從頭重新計算。
+    CRC 錯誤或無法判斷長度 (未知功能碼) 時丟棄一個位元組後重新同步。
+    """
+
+    MAX_FRAME_BYTES = 256  # Modbus RTU ADU 上限
+
+    # 回應長度固定為 8 bytes 的功能碼 (回傳地址與值或數量)
+    _FIXED_RESPONSES = (ModbusRTU.WRITE_SINGLE_COIL, ModbusRTU.WRITE_SINGLE_REGISTER,
+                        ModbusRTU.WRITE_MULTIPLE_COILS, ModbusRTU.WRITE_MULTIPLE_REGISTERS)
+    # 以位元組數欄位決定長度的讀取回應
+    _COUNTED_RESPONSES = (ModbusRTU.READ_COILS, ModbusRTU.READ_DISCRETE_INPUTS,
+                          ModbusRTU.READ_HOLDING_REGISTERS, ModbusRTU.READ_INPUT_REGISTERS)
+    FUNCTION_CODES = _COUNTED_RESPONSES + _FIXED_RESPONSES
+
+    def __init__(self, requests: bool = False):
+        """
+        初始化解析器
+
+        Args:
+            requests (bool): True 時解析主站發出的請求 (例如模擬從站)，預設解析從站回應
+        """
+        self.requests = requests
+        self._buffer = bytearray()
+        self._start = 0  # 目前候選訊框在緩衝區中的位置
+        self._crc = 0xFFFF  # 目前候選訊框已累算的 CRC
+        self._scanned = 0  # 已計入 _crc 的位元組數
+        self.stats = {"frames": 0, "crc_errors": 0, "discarded_bytes": 0}
+
+    @staticmethod
+    def frame_length(buffer, offset: int = 0, requests: bool = False) -> Optional[int]:
+        """
+        依功能碼的長度規則計算從 offset 開始的訊框總長度 (含 CRC)
+
+        Args:
+            buffer: 已收到的資料
+            offset (int): 訊框起始位置
+            requests (bool): 以請求 (而非回應) 的格式計算
+
+        Returns:
+            int: 訊框總長度；資料不足以判斷時返回 None，無法判斷的功能碼返回 0
+        """
+        available = len(buffer) - offset
+        if available < 2:
+            return None
+        function_code = buffer[offset + 1]
+        if requests:
+            if function_code in (ModbusRTU.WRITE_MULTIPLE_COILS, ModbusRTU.WRITE_MULTIPLE_REGISTERS):
+                return 9 + buffer[offset + 6] if available >= 7 else None
+            return 8 if 1 <= function_code <= 6 else 0
+        if function_code & 0x80:
+            return 5  # 從站 + 功能碼 + 異常碼 + CRC
+        if function_code in ModbusRTUFrameParser._COUNTED_RESPONSES:
+            return 5 + buffer[offset + 2] if available >= 3 else None
+        if function_code in ModbusRTUFrameParser._FIXED_RESPONSES:
+            return 8
+        return 0
+
+    @property
+    def buffered(self) -> int:
+        """尚未組成完整訊框的位元組數"""
+        return len(self._buffer) - self._start
+
+    def peek(self) -> bytes:
+        """目前未完成訊框的開頭 (最多兩個位元組: 從站地址與功能碼)"""
+        return bytes(self._buffer[self._start:self._start + 2])
+
+    def reset(self):
+        """捨棄所有未完成的資料"""
+        self._buffer.clear()
+        self._start = 0
+        self._crc = 0xFFFF
+        self._scanned = 0
+
+    def _discard(self, count: int):
+        """丟棄目前候選訊框開頭的位元組並重新開始累算 CRC"""
+        self._start += count
+        self.stats["discarded_bytes"] += count
+        self._crc = 0xFFFF
+        self._scanned = 0
+
+    def feed(self, data) -> List[bytes]:
+        """
+        輸入新收到的資料
+
+        Args:
+            data (bytes): 任意長度的資料片段
+
+        Returns:
+            List[bytes]: 這次輸入後完成且通過 CRC 驗證的訊框 (含 CRC)，依到達順序排列
+        """
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        while True:
+            start = self._start
+            length = self.frame_length(buffer, start, self.requests)
+            if length is None:
+                break  # 等待更多資料
+            if length == 0 or length > self.MAX_FRAME_BYTES:
+                self._discard(1)
+                continue
+            end = min(start + length, len(buffer))
+            scanned_to = start + self._scanned
+            if end > scanned_to:
+                self._crc = crc16(buffer[scanned_to:end], self._crc)
+                self._scanned = end - start
+            if end - start < length:
+                break  # 訊框尚未完整
+            if self._crc == 0:
+                frames.append(bytes(buffer[start:end]))
+                self.stats["frames"] += 1
+                self._start = end
+                self._crc = 0xFFFF
+                self._scanned = 0
+            else:
+                self.stats["crc_errors"] += 1
+                self._discard(1)
+        if self._start:
+            del buffer[:self._start]
+            self._start = 0
+        return frames
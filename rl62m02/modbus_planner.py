@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Smart-Box Modbus 讀取合併規劃器
+將多個使用者對同一 Smart-Box、同一從站、同一功能碼的重疊或相鄰讀取請求，
+合併為符合單一 MDTG 訊框大小的最少次讀取，執行後再把寄存器值分配回各請求
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from .modbus import ModbusRTU
+
+
+class ReadRequest:
+    """單一使用者的讀取請求，執行後 values 為讀取結果，失敗時 error 為錯誤訊息"""
+
+    def __init__(self, unicast_addr: str, slave_address: int, function_code: int,
+                 start_address: int, quantity: int):
+        self.unicast_addr = unicast_addr
+        self.slave_address = slave_address
+        self.function_code = function_code
+        self.start_address = start_address
+        self.quantity = quantity
+        self.values = None
+        self.error = None
+
+    @property
+    def end_address(self) -> int:
+        """結束地址 (不含)"""
+        return self.start_address + self.quantity
+
+    def __repr__(self):
+        return (f"ReadRequest({self.unicast_addr}, slave={self.slave_address}, fc={self.function_code}, "
+                f"start=0x{self.start_address:04X}, qty={self.quantity})")
+
+
+class PlannedRead:
+    """合併後實際發送的一次讀取"""
+
+    def __init__(self, unicast_addr: str, slave_address: int, function_code: int,
+                 start_address: int, quantity: int, requests: List[ReadRequest]):
+        self.unicast_addr = unicast_addr
+        self.slave_address = slave_address
+        self.function_code = function_code
+        self.start_address = start_address
+        self.quantity = quantity
+        self.requests = requests
+
+    def __repr__(self):
+        return (f"PlannedRead({self.unicast_addr}, slave={self.slave_address}, fc={self.function_code}, "
+                f"start=0x{self.start_address:04X}, qty={self.quantity}, requests={len(self.requests)})")
+
+
+class ModbusReadPlanner:
+    """
+    Modbus 讀取合併規劃器
+
+    支援 FC03 (保持寄存器)、FC04 (輸入寄存器) 與 FC01 (線圈)。
+    單次讀取的數量上限由回應必須放入一個 MDTG 訊框決定:
+    8276 02 頭部 (3) + 從站 (1) + 功能碼 (1) + 位元組數 (1) + 資料 + CRC (2) <= max_frame_bytes
+    """
+
+    SUPPORTED_FUNCTION_CODES = (
+        ModbusRTU.READ_COILS,
+        ModbusRTU.READ_DISCRETE_INPUTS,
+        ModbusRTU.READ_HOLDING_REGISTERS,
+        ModbusRTU.READ_INPUT_REGISTERS,
+    )
+    MAX_FRAME_BYTES = 20  # AT+MDTS / MDTG-MSG 單一訊框的資料上限
+    RESPONSE_OVERHEAD = 8  # Smart-Box 頭部 3 bytes + 從站、功能碼、位元組數 3 bytes + CRC 2 bytes
+
+    def __init__(self, max_frame_bytes: int = MAX_FRAME_BYTES, max_gap: int = 0):
+        """
+        初始化規劃器
+
+        Args:
+            max_frame_bytes (int): 回應訊框的位元組上限
+            max_gap (int): 兩段請求之間允許一併讀取的未請求地址數量；
+                           0 表示只合併重疊或相鄰的請求，避免讀到從站不存在的地址
+        """
+        if max_frame_bytes <= self.RESPONSE_OVERHEAD:
+            raise ValueError(f"訊框上限必須大於 {self.RESPONSE_OVERHEAD} bytes")
+        self.max_frame_bytes = max_frame_bytes
+        self.max_gap = max_gap
+        self.requests: List[ReadRequest] = []
+
+    def max_quantity(self, function_code: int) -> int:
+        """單次讀取可放入一個回應訊框的最大數量"""
+        data_bytes = self.max_frame_bytes - self.RESPONSE_OVERHEAD
+        if function_code in (ModbusRTU.READ_COILS, ModbusRTU.READ_DISCRETE_INPUTS):
+            return min(data_bytes * 8, 2000)
+        return min(data_bytes // 2, 125)
+
+    def add(self, unicast_addr: str, slave_address: int, function_code: int,
+            start_address: int, quantity: int) -> ReadRequest:
+        """
+        加入一個讀取請求
+
+        Args:
+            unicast_addr (str): Smart-Box 的 unicast address
+            slave_address (int): Modbus 從站地址
+            function_code (int): 功能碼 (FC01 / FC03 / FC04)
+            start_address (int): 起始地址
+            quantity (int): 讀取數量
+
+        Returns:
+            ReadRequest: 請求物件，execute() 後可取得 values
+        """
+        if function_code not in self.SUPPORTED_FUNCTION_CODES:
+            raise ValueError(f"不支援的功能碼: {function_code}")
+        if quantity <= 0 or start_address < 0 or start_address + quantity > 0x10000:
+            raise ValueError("讀取範圍無效")
+        request = ReadRequest(unicast_addr, slave_address, function_code, start_address, quantity)
+        self.requests.append(request)
+        return request
+
+    def clear(self):
+        """清除所有請求"""
+        self.requests = []
+
+    def plan(self) -> List[PlannedRead]:
+        """
+        產生合併後的讀取計畫
+
+        Returns:
+            List[PlannedRead]: 依 (設備, 從站, 功能碼, 起始地址) 排序的讀取列表
+        """
+        groups: Dict[Tuple[str, int, int], List[ReadRequest]] = {}
+        for request in self.requests:
+            key = (request.unicast_addr, request.slave_address, request.function_code)
+            groups.setdefault(key, []).append(request)
+
+        planned = []
+        for (unicast_addr, slave_address, function_code), requests in sorted(groups.items()):
+            max_qty = self.max_quantity(function_code)
+            # 先把重疊 / 相鄰 (含允許的間隙) 的請求合併成連續區段
+            spans = []
+            for request in sorted(requests, key=lambda r: r.start_address):
+                if spans and request.start_address <= spans[-1][1] + self.max_gap:
+                    spans[-1][1] = max(spans[-1][1], request.end_address)
+                else:
+                    spans.append([request.start_address, request.end_address])
+            # 再把每個區段切成符合訊框上限的讀取
+            for span_start, span_end in spans:
+                for start in range(span_start, span_end, max_qty):
+                    end = min(start + max_qty, span_end)
+                    covered = [r for r in requests if r.start_address < end and r.end_address > start]
+                    planned.append(PlannedRead(unicast_addr, slave_address, function_code,
+                                               start, end - start, covered))
+        return planned
+
+    def naive_round_trips(self) -> int:
+        """不合併時 (每個請求各自讀取，超過訊框上限時再分段) 需要的讀取次數"""
+        total = 0
+        for request in self.requests:
+            max_qty = self.max_quantity(request.function_code)
+            total += -(-request.quantity // max_qty)
+        return total
+
+    def execute(self, controller) -> Dict[str, int]:
+        """
+        執行讀取計畫，並把結果分配回各請求的 values
+
+        Args:
+            controller (RLMeshDeviceController): 用於發送 Smart-Box RTU 讀取的控制器
+
+        Returns:
+            dict: {'requests', 'round_trips', 'naive_round_trips', 'saved', 'failed'}
+        """
+        planned = self.plan()
+        # (設備, 從站, 功能碼) -> {地址: 值}
+        values: Dict[Tuple[str, int, int], Dict[int, object]] = {}
+        for read in planned:
+            response = controller.read_smart_box_rtu(read.unicast_addr, read.slave_address, read.function_code,
+                                                     read.start_address, read.quantity)
+            decoded = controller.decode_read_response(response, read.function_code, read.quantity,
+                                                      read.slave_address)
+            if decoded is None:
+                logging.warning(f"合併讀取失敗: {read}")
+                continue
+            bucket = values.setdefault((read.unicast_addr, read.slave_address, read.function_code), {})
+            for offset, value in enumerate(decoded):
+                bucket[read.start_address + offset] = value
+
+        failed = 0
+        for request in self.requests:
+            bucket = values.get((request.unicast_addr, request.slave_address, request.function_code), {})
+            result = [bucket.get(addr) for addr in range(request.start_address, request.end_address)]
+            if any(value is None for value in result):
+                request.values = None
+                request.error = "讀取失敗或回應不完整"
+                failed += 1
+            else:
+                request.values = result
+                request.error = None
+
+        naive = self.naive_round_trips()
+        return {
+            "requests": len(self.requests),
+            "round_trips": len(planned),
+            "naive_round_trips": naive,
+            "saved": naive - len(planned),
+            "failed": failed,
+        }
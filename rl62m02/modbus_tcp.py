@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Modbus TCP 閘道
+以 asyncio 提供 Modbus TCP 伺服器，將 unit id 對應到 (Smart-Box unicast address, 從站地址)，
+把請求轉換為 Mesh 上的 RTU 交易；每個 Smart-Box 依序處理請求、合併相同的讀取，
+並以短 TTL 快取回應重複的輪詢
+"""
+
+import time
+import struct
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+from .modbus import ModbusRTU
+
+# MBAP 頭部: 交易 ID、協定 ID、長度、unit id
+MBAP_HEADER = struct.Struct(">HHHB")
+
+# 轉送到 Smart-Box 的功能碼
+SUPPORTED_FUNCTION_CODES = (
+    ModbusRTU.READ_COILS,
+    ModbusRTU.READ_DISCRETE_INPUTS,
+    ModbusRTU.READ_HOLDING_REGISTERS,
+    ModbusRTU.READ_INPUT_REGISTERS,
+    ModbusRTU.WRITE_SINGLE_COIL,
+    ModbusRTU.WRITE_SINGLE_REGISTER,
+    ModbusRTU.WRITE_MULTIPLE_COILS,
+    ModbusRTU.WRITE_MULTIPLE_REGISTERS,
+)
+READ_FUNCTION_CODES = SUPPORTED_FUNCTION_CODES[:4]
+
+# RTU 交易函數: (unicast address, RTU 請求) -> RTU 回應訊框 (失敗時為 None)，可為一般函數或協程函數
+Transact = Callable[[str, bytes], Union[Optional[bytes], Awaitable[Optional[bytes]]]]
+
+
+def parse_unit_map(entries) -> Dict[int, Tuple[str, int]]:
+    """
+    解析 unit id 對應設定
+
+    Args:
+        entries: 'unit=unicast:slave' 字串列表 (例如 '1=0x0100:1')，或 {unit: 'unicast:slave'} 字典
+
+    Returns:
+        dict: unit id -> (unicast address, 從站地址)
+    """
+    if isinstance(entries, dict):
+        entries = [f"{unit}={target}" for unit, target in entries.items()]
+    unit_map = {}
+    for entry in entries:
+        try:
+            unit, target = entry.split("=", 1)
+            unicast_addr, slave = target.split(":", 1)
+            unit_map[int(unit, 0)] = (unicast_addr.strip(), int(slave, 0))
+        except ValueError:
+            raise ValueError(f"無效的 unit 對應設定: {entry}，格式應為 unit=unicast:slave")
+    return unit_map
+
+
+class ModbusTCPGateway:
+    """
+    Modbus TCP 對 Smart-Box RTU 的閘道
+
+    - 每個 Smart-Box 同一時間只有一個 RTU 交易，等待中的請求依到達順序排隊 (上限 max_queue)
+    - 同一 Smart-Box 上完全相同的讀取請求只發送一次，所有等待者取得同一個回應
+    - 讀取回應保留 cache_ttl 秒，期間的重複輪詢直接由快取回應；寫入會清除該從站的快取，
+      新增快取時移除過期的回應，並最多保留 max_cache_entries 個 (超過時移除最舊的)
+    - 交易函數可替換，便於以模擬的 dongle 或假資料測試
+    """
+
+    EXCEPTION_ILLEGAL_FUNCTION = ModbusRTU.EXCEPTION_ILLEGAL_FUNCTION
+    EXCEPTION_SLAVE_DEVICE_BUSY = ModbusRTU.EXCEPTION_SLAVE_DEVICE_BUSY
+    EXCEPTION_GATEWAY_PATH_UNAVAILABLE = ModbusRTU.EXCEPTION_GATEWAY_PATH_UNAVAILABLE
+    EXCEPTION_GATEWAY_TARGET_FAILED = ModbusRTU.EXCEPTION_GATEWAY_TARGET_FAILED
+
+    def __init__(self, transact: Transact, unit_map: Dict[int, Tuple[str, int]], host: str = "0.0.0.0",
+                 port: int = 502, cache_ttl: float = 0.5, max_queue: int = 32, max_cache_entries: int = 1024):
+        """
+        初始化閘道
+
+        Args:
+            transact (callable): RTU 交易函數，一般函數會在執行緒池中執行
+            unit_map (dict): unit id -> (Smart-Box unicast address, 從站地址)
+            host (str): 監聽地址
+            port (int): 監聽埠
+            cache_ttl (float): 讀取回應快取秒數，0 表示停用
+            max_queue (int): 每個 Smart-Box 等待中的請求上限，超過時回應 Slave Device Busy
+            max_cache_entries (int): 快取的讀取回應數量上限，避免掃描地址範圍的用戶端讓快取無限增長
+        """
+        self.transact = transact
+        self.unit_map = dict(unit_map)
+        self.host = host
+        self.port = port
+        self.cache_ttl = cache_ttl
+        self.max_queue = max_queue
+        self.max_cache_entries = max_cache_entries
+        self.modbus = ModbusRTU()
+        self._server = None
+        self._clients: Dict[asyncio.StreamWriter, asyncio.Task] = {}  # 已連線的用戶端與其處理工作
+        self._box_locks: Dict[str, asyncio.Lock] = {}
+        self._queued: Dict[str, int] = {}
+        self._inflight: Dict[Tuple[str, int, bytes], asyncio.Future] = {}
+        # 依取得時間排序 (最舊的在前)，過期與超過上限的回應從前端移除
+        self._cache: "OrderedDict[Tuple[str, int, bytes], Tuple[bytes, float]]" = OrderedDict()
+        self.stats = {"requests": 0, "transactions": 0, "cache_hits": 0, "coalesced": 0,
+                      "busy": 0, "errors": 0}
+
+    @classmethod
+    def from_controller(cls, controller, unit_map: Dict[int, Tuple[str, int]], **kwargs) -> "ModbusTCPGateway":
+        """
+        以 RLMeshDeviceController 的 Smart-Box 交易層建立閘道
+
+        Args:
+            controller (RLMeshDeviceController): 控制器
+            unit_map (dict): unit id -> (Smart-Box unicast address, 從站地址)
+            **kwargs: 其他 ModbusTCPGateway 參數
+
+        Returns:
+            ModbusTCPGateway: 閘道實例
+
+        Raises:
+            ValueError: 控制器沒有 Provisioner (沒有交易層)
+        """
+        if controller.rtu_transport is None:
+            raise ValueError("控制器沒有 Provisioner，無法建立 Modbus TCP 閘道")
+
+        def transact(unicast_addr: str, request: bytes) -> Optional[bytes]:
+            return controller.rtu_transport.transact(unicast_addr, request)["frame"]
+        return cls(transact, unit_map, **kwargs)
+
+    @staticmethod
+    def exception_pdu(function_code: int, exception_code: int) -> bytes:
+        """建立 Modbus 異常回應 PDU"""
+        return bytes([function_code | 0x80, exception_code])
+
+    async def _transact(self, unicast_addr: str, request: bytes) -> Optional[bytes]:
+        """呼叫交易函數，一般函數在執行緒池中執行以免阻塞事件迴圈"""
+        if asyncio.iscoroutinefunction(self.transact):
+            return await self.transact(unicast_addr, request)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.transact, unicast_addr, request)
+
+    async def handle_pdu(self, unit_id: int, pdu: bytes) -> bytes:
+        """
+        處理一個 Modbus PDU 並返回回應 PDU
+
+        Args:
+            unit_id (int): MBAP 的 unit id
+            pdu (bytes): 功能碼與資料
+
+        Returns:
+            bytes: 回應 PDU (可能為異常回應)
+        """
+        self.stats["requests"] += 1
+        if not pdu:
+            return self.exception_pdu(0, self.EXCEPTION_ILLEGAL_FUNCTION)
+        function_code = pdu[0]
+        if function_code not in SUPPORTED_FUNCTION_CODES:
+            return self.exception_pdu(function_code, self.EXCEPTION_ILLEGAL_FUNCTION)
+        target = self.unit_map.get(unit_id)
+        if target is None:
+            return self.exception_pdu(function_code, self.EXCEPTION_GATEWAY_PATH_UNAVAILABLE)
+        unicast_addr, slave_address = target
+        key = (unicast_addr, slave_address, bytes(pdu))
+        is_read = function_code in READ_FUNCTION_CODES
+
+        if is_read:
+            cached = self._cache.get(key)
+            if cached is not None and time.monotonic() - cached[1] <= self.cache_ttl:
+                self.stats["cache_hits"] += 1
+                return cached[0]
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self.stats["coalesced"] += 1
+                return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future() if is_read else None
+        if is_read:
+            self._inflight[key] = future
+        try:
+            response = await self._forward(unicast_addr, slave_address, pdu)
+        except Exception as e:
+            logging.error(f"轉送 Modbus TCP 請求到 {unicast_addr} 時發生錯誤: {e}")
+            self.stats["errors"] += 1
+            response = self.exception_pdu(function_code, self.EXCEPTION_GATEWAY_TARGET_FAILED)
+        finally:
+            if is_read:
+                self._inflight.pop(key, None)
+        if future is not None:
+            future.set_result(response)
+
+        if is_read and self.cache_ttl > 0 and not response[0] & 0x80:
+            self._store(key, response)
+        elif not is_read:
+            # 寫入後清除此從站的快取
+            for cache_key in [k for k in self._cache if k[0] == unicast_addr and k[1] == slave_address]:
+                del self._cache[cache_key]
+        return response
+
+    def _store(self, key: Tuple[str, int, bytes], response: bytes):
+        """保存讀取回應，並移除過期或超過數量上限的舊回應"""
+        now = time.monotonic()
+        self._cache.pop(key, None)
+        self._cache[key] = (response, now)
+        while self._cache:
+            oldest = next(iter(self._cache.values()))
+            if len(self._cache) <= self.max_cache_entries and now - oldest[1] <= self.cache_ttl:
+                break
+            self._cache.popitem(last=False)
+
+    async def _forward(self, unicast_addr: str, slave_address: int, pdu: bytes) -> bytes:
+        """依序在 Smart-Box 上執行 RTU 交易，返回回應 PDU"""
+        function_code = pdu[0]
+        if self._queued.get(unicast_addr, 0) >= self.max_queue:
+            self.stats["busy"] += 1
+            return self.exception_pdu(function_code, self.EXCEPTION_SLAVE_DEVICE_BUSY)
+
+        lock = self._box_locks.setdefault(unicast_addr, asyncio.Lock())
+        self._queued[unicast_addr] = self._queued.get(unicast_addr, 0) + 1
+        try:
+            async with lock:
+                self.stats["transactions"] += 1
+                request = self.modbus.create_rtu_packet(slave_address, function_code, bytes(pdu[1:]))
+                frame = await self._transact(unicast_addr, request)
+        finally:
+            self._queued[unicast_addr] -= 1
+
+        if not frame or len(frame) < 4:
+            self.stats["errors"] += 1
+            return self.exception_pdu(function_code, self.EXCEPTION_GATEWAY_TARGET_FAILED)
+        return bytes(frame[1:-2])  # 去除從站地址與 CRC
+
+    async def _handle_request(self, writer: asyncio.StreamWriter, write_lock: asyncio.Lock,
+                              transaction_id: int, unit_id: int, pdu: bytes):
+        """處理單一請求並寫回回應 (同一連線的請求可同時進行)"""
+        response = await self.handle_pdu(unit_id, pdu)
+        async with write_lock:
+            writer.write(MBAP_HEADER.pack(transaction_id, 0, len(response) + 1, unit_id) + response)
+            await writer.drain()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """處理一個 TCP 連線"""
+        peer = writer.get_extra_info("peername")
+        logging.info(f"Modbus TCP 用戶端已連線: {peer}")
+        write_lock = asyncio.Lock()
+        tasks = set()
+        self._clients[writer] = asyncio.current_task()
+        try:
+            while True:
+                header = await reader.readexactly(MBAP_HEADER.size)
+                transaction_id, protocol_id, length, unit_id = MBAP_HEADER.unpack(header)
+                if protocol_id != 0 or not 2 <= length <= 254:
+                    logging.warning(f"無效的 MBAP 頭部，關閉連線: {header.hex()}")
+                    break
+                pdu = await reader.readexactly(length - 1)
+                task = asyncio.ensure_future(self._handle_request(writer, write_lock, transaction_id, unit_id, pdu))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self._clients.pop(writer, None)
+            writer.close()
+            logging.info(f"Modbus TCP 用戶端已中斷: {peer}")
+
+    async def start(self):
+        """開始監聽"""
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        sockets = self._server.sockets or []
+        if sockets:
+            self.port = sockets[0].getsockname()[1]
+        logging.info(f"Modbus TCP 閘道監聽於 {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        """開始監聽並持續服務"""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """停止監聽並中斷所有連線"""
+        if self._server is not None:
+            self._server.close()
+            # 關閉現有連線，讓連線處理函數正常結束
+            clients = list(self._clients.items())
+            for writer, _ in clients:
+                writer.close()
+            await asyncio.gather(*(task for _, task in clients), return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """取得統計 (requests / transactions / cache_hits / coalesced / busy / errors)"""
+        return dict(self.stats)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Modbus 週期輪詢排程器
+在獨立的工作執行緒中週期讀取 Air-Box、電錶與 Smart-Box 節點，
+並將解析後的讀值發佈給訂閱者
+"""
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class PollJob:
+    """單一輪詢工作的設定與統計"""
+
+    def __init__(self, job_id: int, unicast_addr: str, kind: str, period: float, phase: float,
+                 slave_address: int, priority: int, jitter: float, deadline: float,
+                 function_code: Optional[int], start_address: Optional[int], quantity: Optional[int]):
+        self.job_id = job_id
+        self.unicast_addr = unicast_addr
+        self.kind = kind
+        self.period = period
+        self.phase = phase
+        self.slave_address = slave_address
+        self.priority = priority
+        self.jitter = jitter
+        self.deadline = deadline
+        self.function_code = function_code
+        self.start_address = start_address
+        self.quantity = quantity
+        self.nominal_time = 0.0  # 本次的名目執行時間 (不含 jitter)
+        self.runs = 0
+        self.failures = 0
+        self.deadline_misses = 0
+
+
+class ModbusPollScheduler:
+    """
+    Modbus 週期輪詢排程器
+
+    - 每個工作有自己的週期 (period) 與相位 (phase)，名目時間為 start + phase + k * period
+    - 每次執行加上 0 ~ jitter 秒的隨機延遲，避免多個節點在同一時間佔用 Mesh
+    - 到期的工作依優先權 (priority 越大越先) 與截止時間 (最早截止先執行) 排序
+    - 控制器有互動式命令 (燈光、插座、寫入) 進行中時暫停輪詢，讓出 Mesh 通道
+    """
+
+    KIND_AIR_BOX = "air_box"
+    KIND_POWER_METER = "power_meter"
+    KIND_SMART_BOX = "smart_box"
+    VALID_KINDS = [KIND_AIR_BOX, KIND_POWER_METER, KIND_SMART_BOX]
+
+    def __init__(self, controller, yield_window: float = 0.5, idle_interval: float = 0.05):
+        """
+        初始化排程器
+
+        Args:
+            controller (RLMeshDeviceController): 用於讀取設備的控制器
+            yield_window (float): 互動式命令完成後暫停輪詢的時間 (秒)
+            idle_interval (float): 讓出通道時的重新檢查間隔 (秒)
+        """
+        self.controller = controller
+        self.yield_window = yield_window
+        self.idle_interval = idle_interval
+        self._jobs: Dict[int, PollJob] = {}
+        self._heap: List = []  # (名目時間 + jitter, 序號, job_id)
+        self._seq = itertools.count()
+        self._job_ids = itertools.count(1)
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._start_time = None
+        self.yields = 0  # 因互動式命令而讓出通道的次數
+
+    def add_job(self, unicast_addr: str, kind: str, period: float, phase: float = 0.0,
+                slave_address: int = 1, priority: int = 0, jitter: float = 0.0,
+                deadline: Optional[float] = None, function_code: Optional[int] = None,
+                start_address: Optional[int] = None, quantity: Optional[int] = None) -> int:
+        """
+        新增輪詢工作
+
+        Args:
+            unicast_addr (str): 設備的 unicast address
+            kind (str): 'air_box'、'power_meter' 或 'smart_box'
+            period (float): 輪詢週期 (秒)
+            phase (float): 相位偏移 (秒)，用於錯開同週期的設備
+            slave_address (int): Modbus 從站地址
+            priority (int): 優先權，數字越大越先執行
+            jitter (float): 每次執行隨機延遲的上限 (秒)
+            deadline (float, optional): 從名目時間起算的截止時間 (秒)，預設為一個週期
+            function_code (int, optional): smart_box 工作使用的功能碼
+            start_address (int, optional): smart_box 工作的起始地址
+            quantity (int, optional): smart_box 工作的讀取數量
+
+        Returns:
+            int: 工作 ID
+        """
+        if kind not in self.VALID_KINDS:
+            raise ValueError(f"不支援的輪詢類型: {kind}")
+        if period <= 0:
+            raise ValueError("輪詢週期必須大於 0")
+        if kind == self.KIND_SMART_BOX and None in (function_code, start_address, quantity):
+            raise ValueError("smart_box 工作需要 function_code、start_address 與 quantity")
+
+        job = PollJob(next(self._job_ids), unicast_addr, kind, period, phase, slave_address, priority,
+                      jitter, period if deadline is None else deadline, function_code, start_address, quantity)
+        with self._cond:
+            self._jobs[job.job_id] = job
+            if self._start_time is not None:
+                self._schedule_first(job, time.monotonic())
+            self._cond.notify()
+        return job.job_id
+
+    def remove_job(self, job_id: int) -> bool:
+        """移除輪詢工作，返回是否有移除"""
+        with self._cond:
+            return self._jobs.pop(job_id, None) is not None
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """
+        訂閱讀值，callback 會在工作執行緒中以讀值字典呼叫:
+        {'job_id', 'unicast_addr', 'kind', 'timestamp', 'latency', 'late', 'data'}
+        失敗的讀取 (逾時或無法解析) 只計入 failures，不會發佈
+        """
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """取消訂閱讀值"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def _schedule_first(self, job: PollJob, now: float):
+        """安排工作的第一次執行"""
+        job.nominal_time = now + job.phase
+        self._push(job)
+
+    def _push(self, job: PollJob):
+        """將工作依名目時間加上隨機延遲放入排程堆積"""
+        delay = random.uniform(0, job.jitter) if job.jitter > 0 else 0.0
+        heapq.heappush(self._heap, (job.nominal_time + delay, next(self._seq), job.job_id))
+
+    def start(self):
+        """啟動工作執行緒"""
+        if self._thread and self._thread.is_alive():
+            return
+        with self._cond:
+            self._stop_event.clear()
+            self._start_time = time.monotonic()
+            self._heap = []
+            for job in self._jobs.values():
+                self._schedule_first(job, self._start_time)
+        self._thread = threading.Thread(target=self._run, name="ModbusPollScheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """停止工作執行緒 (等待進行中的讀取完成)"""
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+        self._start_time = None
+
+    def _next_ready(self) -> Optional[PollJob]:
+        """取出下一個要執行的工作；沒有到期工作時等待"""
+        with self._cond:
+            while not self._stop_event.is_set():
+                # 移除已刪除的工作
+                while self._heap and self._heap[0][2] not in self._jobs:
+                    heapq.heappop(self._heap)
+                now = time.monotonic()
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                if self._heap[0][0] > now:
+                    self._cond.wait(self._heap[0][0] - now)
+                    continue
+
+                # 在所有到期工作中，依優先權與截止時間選擇
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    entry = heapq.heappop(self._heap)
+                    if entry[2] in self._jobs:
+                        due.append(entry)
+                if not due:
+                    continue
+                due.sort(key=lambda e: (-self._jobs[e[2]].priority,
+                                        self._jobs[e[2]].nominal_time + self._jobs[e[2]].deadline, e[1]))
+                for entry in due[1:]:
+                    heapq.heappush(self._heap, entry)
+                return self._jobs[due[0][2]]
+        return None
+
+    def _run(self):
+        """工作執行緒主迴圈"""
+        while not self._stop_event.is_set():
+            job = self._next_ready()
+            if job is None:
+                break
+
+            # 讓出通道給互動式控制命令
+            while self.controller.is_interactive_busy(self.yield_window) and not self._stop_event.is_set():
+                self.yields += 1
+                time.sleep(self.idle_interval)
+
+            started = time.monotonic()
+            late = started > job.nominal_time + job.deadline
+            if late:
+                job.deadline_misses += 1
+            try:
+                data = self._read(job)
+            except Exception as e:
+                logging.error(f"輪詢設備 {job.unicast_addr} 時發生錯誤: {e}")
+                data = None
+            finished = time.monotonic()
+
+            job.runs += 1
+            if data is None:
+                job.failures += 1
+            with self._cond:
+                if job.job_id in self._jobs:
+                    # 以名目時間推進，避免週期漂移；落後超過一個週期時跳過錯過的週期
+                    job.nominal_time += job.period
+                    if job.nominal_time < finished:
+                        missed = int((finished - job.nominal_time) // job.period) + 1
+                        job.nominal_time += missed * job.period
+                    self._push(job)
+
+            if data is None:
+                continue
+            self._publish({
+                "job_id": job.job_id,
+                "unicast_addr": job.unicast_addr,
+                "kind": job.kind,
+                "timestamp": time.time(),
+                "latency": finished - started,
+                "late": late,
+                "data": data,
+            })
+
+    def _read(self, job: PollJob):
+        """執行一次讀取並返回解析後的資料，讀取失敗時返回 None"""
+        if job.kind in (self.KIND_AIR_BOX, self.KIND_POWER_METER):
+            if job.kind == self.KIND_AIR_BOX:
+                data = self.controller.read_air_box_data(job.unicast_addr, job.slave_address)
+            else:
+                data = self.controller.read_power_meter_data(job.unicast_addr, job.slave_address)
+            # 逾時或回應無法解析時各欄位皆為 None (原始回應仍在 raw_data)
+            if not isinstance(data, dict) or all(value is None for key, value in data.items() if key != "raw_data"):
+                return None
+            return data
+
+        response = self.controller.read_smart_box_rtu(job.unicast_addr, job.slave_address, job.function_code,
+                                                     job.start_address, job.quantity)
+        # 逾時、異常回應或無法解析時視為讀取失敗；FC01 / FC02 的 registers 為布林值列表
+        registers = self.controller.decode_read_response(response, job.function_code, job.quantity,
+                                                         job.slave_address)
+        if registers is None:
+            return None
+        return {"registers": registers, "raw_data": response}
+
+    def _publish(self, reading: Dict[str, Any]):
+        """將讀值發佈給所有訂閱者"""
+        for callback in list(self._subscribers):
+            try:
+                callback(reading)
+            except Exception as e:
+                logging.error(f"輪詢讀值訂閱者處理時發生錯誤: {e}")
+
+    def stats(self) -> Dict[int, Dict[str, Any]]:
+        """
+        取得各工作的統計
+
+        Returns:
+            dict: job_id -> {'unicast_addr', 'kind', 'runs', 'failures', 'deadline_misses'}
+        """
+        with self._cond:
+            return {
+                job.job_id: {
+                    "unicast_addr": job.unicast_addr,
+                    "kind": job.kind,
+                    "runs": job.runs,
+                    "failures": job.failures,
+                    "deadline_misses": job.deadline_misses,
+                }
+                for job in self._jobs.values()
+            }
@@ -0,0 +1,430 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多 dongle 集區
+一個 RL62M02 只有一條 UART 與一個無線電，且同一時間只能等待一個 AT 命令的回應；
+ProvisionerPool 管理多個位於不同串口的 SerialAT / Provisioner / 控制器，依目標地址把命令分派給
+不同的 dongle (靜態分片或最少負載)，某個 dongle 停止回應時自動改用其他 dongle
+
+所有 dongle 必須屬於同一個 Mesh 網路 (相同的 NetKey / AppKey)；AT 指令無法匯出或設定金鑰，
+集區不負責同步金鑰。掃描與配置新節點只經由主要 dongle (第一個可用的成員) 進行，
+以免不同 dongle 分配到相同的 unicast address
+"""
+
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List
+
+from .serial_at import SerialAT
+from .provisioner import Provisioner
+from .controllers.mesh_controller import RLMeshDeviceController
+from .metrics import MetricsRegistry
+from .utils import format_mesh_address
+
+
+class PoolUnavailableError(RuntimeError):
+    """集區中沒有可用的 dongle"""
+
+
+class PoolMember:
+    """集區中的一個 dongle 及其 Provisioner 與控制器"""
+
+    def __init__(self, index: int, serial_at: SerialAT, provisioner: Provisioner,
+                 controller: RLMeshDeviceController, owns_serial: bool):
+        self.index = index
+        self.serial_at = serial_at
+        self.provisioner = provisioner
+        self.controller = controller
+        self.port = serial_at.port
+        self.healthy = True
+        self.probing = False  # 正在以 AT+VER 確認是否故障
+        self.down_since = None
+        self.pending = 0  # 進行中的操作數
+        self.requests = 0
+        self.failovers = 0  # 因此成員停止回應而改用其他成員的次數
+        self._owns_serial = owns_serial
+
+    def status(self) -> Dict[str, Any]:
+        """成員狀態"""
+        return {"index": self.index, "port": self.port, "healthy": self.healthy,
+                "probing": self.probing, "down_since": self.down_since, "pending": self.pending,
+                "requests": self.requests, "failovers": self.failovers,
+                "consecutive_timeouts": self.provisioner.consecutive_timeouts}
+
+
+class ProvisionerPool:
+    """
+    以多個 dongle 分攤命令的集區
+
+    routing:
+        - 'shard': 依 shard_map 或地址雜湊固定分派，同一設備的命令總是經由同一個 dongle
+          (Smart-Box RTU 交易與讀取快取都在單一控制器內)，該 dongle 故障時依序改用下一個
+        - 'least_loaded': 每次選擇進行中操作最少的 dongle，適合不需要保持順序的控制命令
+
+    使用方式:
+        with ProvisionerPool(["/dev/ttyUSB0", "/dev/ttyUSB1"]) as pool:
+            pool.register_device("0x0100", "SMART_BOX")
+            pool.control("0x0100", "read_smart_box_registers", 1, 3, 0, 10)
+    """
+
+    ROUTING_MODES = ("shard", "least_loaded")
+
+    def __init__(self, ports: Iterable[str] = (), baudrate: int = 115200,
+                 serial_ats: Iterable[SerialAT] = (), routing: str = "shard",
+                 shard_map: Dict[str, int] = None, max_failures: int = 1, max_in_flight: int = 2,
+                 health_interval: float = 0.0, metrics: MetricsRegistry = None):
+        """
+        初始化集區，呼叫 open() 後才連接 dongle
+
+        Args:
+            ports (Iterable[str]): 串口名稱列表
+            baudrate (int): 串口鮑率
+            serial_ats (Iterable[SerialAT]): 已開啟的 SerialAT (例如模擬器)，排在 ports 之前
+            routing (str): 'shard' 或 'least_loaded'
+            shard_map (dict, optional): unicast address -> 成員索引的靜態分片表，未列出的地址依雜湊分派
+            max_failures (int): 連續逾時達此數量時以 AT+VER 探測 dongle，無回應即視為故障；
+                探測只需一個不經過 Mesh 的往返，預設每次逾時都確認
+            max_in_flight (int): 每個 dongle 同時進行的操作上限，超過時在集區中等待；
+                dongle 故障時最多只有這麼多操作需要等到逾時
+            health_interval (float): 背景探測故障成員的間隔秒數，0 表示只在呼叫 check_health() 時探測
+            metrics (MetricsRegistry, optional): 集區指標的登錄表，未指定時自動建立
+
+        Raises:
+            ValueError: 不支援的 routing 或沒有指定任何 dongle
+        """
+        if routing not in self.ROUTING_MODES:
+            raise ValueError(f"不支援的分派方式: {routing}")
+        self.ports = list(ports)
+        self.baudrate = baudrate
+        self._serial_ats = list(serial_ats)
+        if not self.ports and not self._serial_ats:
+            raise ValueError("需要至少一個串口或 SerialAT 實例")
+        self.routing = routing
+        self.shard_map = {}
+        for address, index in (shard_map or {}).items():
+            self.assign(address, index)
+        self.max_failures = max(1, max_failures)
+        self.max_in_flight = max(1, max_in_flight)
+        self.health_interval = health_interval
+        self.metrics = metrics or MetricsRegistry()
+        self.members: List[PoolMember] = []
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)  # 成員名額釋放或狀態改變時通知
+        self._stop_event = threading.Event()
+        self._health_thread = None
+        self._describe_metrics()
+
+    def _describe_metrics(self):
+        metrics = self.metrics
+        metrics.describe('rl62m02_pool_requests_total', '經由集區分派的操作數，依 dongle 區分')
+        metrics.describe('rl62m02_pool_failovers_total', '因 dongle 停止回應而改用其他 dongle 的次數')
+        metrics.describe('rl62m02_pool_member_up', 'dongle 是否可用 (1 可用、0 故障)')
+        metrics.describe('rl62m02_pool_pending', '進行中的操作數，依 dongle 區分')
+
+    # === 連線 ===
+
+    def open(self) -> "ProvisionerPool":
+        """開啟所有串口並建立 Provisioner 與控制器，任何一個失敗時關閉已開啟的部分"""
+        try:
+            for serial_at in self._serial_ats:
+                self._add_member(serial_at, owns_serial=False)
+            for port in self.ports:
+                self._add_member(SerialAT(port, self.baudrate), owns_serial=True)
+        except Exception:
+            self.close()
+            raise
+        for address, index in self.shard_map.items():
+            if index >= len(self.members):
+                logging.warning(f"分片表中 {format_mesh_address(address)} 指定的成員 {index} 不存在，改依雜湊分派")
+        if self.health_interval > 0:
+            self._stop_event.clear()
+            self._health_thread = threading.Thread(target=self._health_loop, name="ProvisionerPoolHealth",
+                                                   daemon=True)
+            self._health_thread.start()
+        logging.info(f"集區已連接 {len(self.members)} 個 dongle: {', '.join(m.port for m in self.members)}")
+        return self
+
+    def _add_member(self, serial_at: SerialAT, owns_serial: bool):
+        try:
+            provisioner = Provisioner(serial_at)
+        except Exception:
+            if owns_serial:
+                serial_at.close()
+            raise
+        member = PoolMember(len(self.members), serial_at, provisioner,
+                            RLMeshDeviceController(provisioner), owns_serial)
+        # 新成員沿用已註冊的設備
+        if self.members:
+            for address, info in self.members[0].controller.device_map.items():
+                member.controller.register_device(address, info["type"], info["name"])
+        self.members.append(member)
+        self.metrics.set_gauge('rl62m02_pool_member_up', 1, {'port': member.port})
+
+    def close(self):
+        """停止背景探測並關閉所有成員 (只關閉由集區開啟的串口)"""
+        self._stop_event.set()
+        if self._health_thread is not None:
+            self._health_thread.join(timeout=5.0)
+            self._health_thread = None
+        for member in self.members:
+            member.controller.close()
+            if member._owns_serial:
+                member.serial_at.close()
+        self.members = []
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # === 分派 ===
+
+    def assign(self, unicast_addr: str, index: int):
+        """將設備固定分派給指定成員 (靜態分片)"""
+        self.shard_map[int(unicast_addr, 16)] = index
+
+    def healthy_members(self) -> List[PoolMember]:
+        """目前可用的成員"""
+        return [member for member in self.members if member.healthy]
+
+    @property
+    def primary(self) -> PoolMember:
+        """
+        主要成員: 第一個可用的成員，掃描與配置新節點時使用
+
+        Raises:
+            PoolUnavailableError: 沒有可用的成員
+        """
+        for member in self.members:
+            if member.healthy:
+                return member
+        raise PoolUnavailableError("集區中沒有可用的 dongle")
+
+    def _usable(self, member: PoolMember) -> bool:
+        """成員可接受新操作: 未故障且不在探測中"""
+        return member.healthy and not member.probing
+
+    def route(self, unicast_addr: str, exclude: Iterable[int] = ()) -> PoolMember:
+        """
+        選擇處理目標地址的成員，探測中的成員只在沒有其他可用成員時才會被選擇
+
+        Args:
+            unicast_addr (str): unicast 或 group address
+            exclude (Iterable[int]): 不選擇的成員索引 (例如已失敗的成員)
+
+        Returns:
+            PoolMember: 負責的成員
+
+        Raises:
+            PoolUnavailableError: 沒有可用的成員
+        """
+        with self._lock:
+            members = self.members
+            excluded = set(exclude)
+            candidates = [m for m in members if m.index not in excluded and self._usable(m)]
+            if not candidates:
+                candidates = [m for m in members if m.index not in excluded and m.healthy]
+            if not candidates:
+                raise PoolUnavailableError("集區中沒有可用的 dongle")
+            if self.routing == "least_loaded":
+                return min(candidates, key=lambda member: (member.pending, member.requests))
+            value = int(unicast_addr, 16)
+            start = self.shard_map.get(value)
+            if start is None or start >= len(members):
+                start = value % len(members)
+            # 負責的成員不可用時依序改用下一個，原本分給不同成員的設備仍會分散
+            for offset in range(len(members)):
+                member = members[(start + offset) % len(members)]
+                if member in candidates:
+                    return member
+        raise PoolUnavailableError("集區中沒有可用的 dongle")
+
+    def provisioner_for(self, unicast_addr: str) -> Provisioner:
+        """目標地址目前使用的 Provisioner"""
+        return self.route(unicast_addr).provisioner
+
+    def controller_for(self, unicast_addr: str) -> RLMeshDeviceController:
+        """目標地址目前使用的控制器"""
+        return self.route(unicast_addr).controller
+
+    def execute(self, unicast_addr: str, operation: Callable[[PoolMember], Any]) -> Any:
+        """
+        以負責的成員執行操作；操作後該成員連續逾時達 max_failures 且無法回應 AT+VER 時，
+        將其標記為故障並改用下一個成員重試，直到成功或所有成員都已嘗試
+
+        Args:
+            unicast_addr (str): 目標地址
+            operation (Callable[[PoolMember], Any]): 以成員為參數的操作
+
+        Returns:
+            操作的返回值 (所有成員都失敗時為最後一次的返回值)
+
+        Raises:
+            PoolUnavailableError: 沒有可用的成員
+        """
+        tried = set()
+        result = None
+        while True:
+            try:
+                member = self.route(unicast_addr, tried)
+            except PoolUnavailableError:
+                if tried:
+                    return result
+                raise
+            if not self._acquire(member):
+                # 等待期間成員被標記為故障或開始探測，改選其他成員
+                tried.add(member.index)
+                continue
+            try:
+                result = operation(member)
+            finally:
+                self._release(member)
+            if member.provisioner.consecutive_timeouts < self.max_failures or not self._probe_failed(member):
+                return result
+            tried.add(member.index)
+            member.failovers += 1
+            self.metrics.inc('rl62m02_pool_failovers_total', labels={'port': member.port})
+            logging.info(f"{unicast_addr} 在 {member.port} 失敗，改由其他 dongle 重試")
+
+    def _acquire(self, member: PoolMember) -> bool:
+        """
+        佔用成員的一個執行名額；名額已滿時等待，等待期間成員變為不可用則返回 False
+        (已進入 Provisioner 的命令只能等到逾時，名額限制了 dongle 故障時被卡住的操作數)
+        """
+        with self._cond:
+            while member.pending >= self.max_in_flight and self._usable(member):
+                self._cond.wait()
+            if not member.healthy or (member.probing and any(
+                    self._usable(other) for other in self.members if other is not member)):
+                return False
+            member.pending += 1
+            member.requests += 1
+        labels = {'port': member.port}
+        self.metrics.inc('rl62m02_pool_requests_total', labels=labels)
+        self.metrics.add_gauge('rl62m02_pool_pending', 1, labels)
+        return True
+
+    def _release(self, member: PoolMember):
+        with self._cond:
+            member.pending -= 1
+            self._cond.notify_all()
+        self.metrics.add_gauge('rl62m02_pool_pending', -1, {'port': member.port})
+
+    def _probe_failed(self, member: PoolMember) -> bool:
+        """
+        以不經過 Mesh 的 AT+VER 確認 dongle 是否仍在回應，區分 dongle 故障與個別節點離線；
+        探測期間新的操作改由其他成員處理
+
+        Returns:
+            bool: dongle 無回應並已標記為故障時返回 True
+        """
+        with self._cond:
+            if not member.healthy:
+                return True
+            if member.probing:
+                # 其他執行緒正在探測，等待其結果
+                while member.probing:
+                    self._cond.wait()
+                return not member.healthy
+            member.probing = True
+            self._cond.notify_all()
+        try:
+            responsive = member.provisioner.get_version() is not None
+        finally:
+            with self._cond:
+                member.probing = False
+                self._cond.notify_all()
+        if responsive:
+            return False
+        self._mark_down(member)
+        return True
+
+    def _mark_down(self, member: PoolMember):
+        with self._cond:
+            if not member.healthy:
+                return
+            member.healthy = False
+            member.down_since = time.time()
+            self._cond.notify_all()
+        self.metrics.set_gauge('rl62m02_pool_member_up', 0, {'port': member.port})
+        logging.warning(f"dongle {member.port} 停止回應，改由其他 dongle 處理其設備")
+
+    def check_health(self) -> Dict[str, bool]:
+        """
+        以 AT+VER 探測故障的成員，回應時恢復使用
+
+        Returns:
+            dict: 串口 -> 是否可用
+        """
+        for member in list(self.members):
+            if member.healthy or member.provisioner.get_version() is None:
+                continue
+            with self._cond:
+                member.healthy = True
+                member.down_since = None
+                self._cond.notify_all()
+            self.metrics.set_gauge('rl62m02_pool_member_up', 1, {'port': member.port})
+            logging.info(f"dongle {member.port} 已恢復回應")
+        return {member.port: member.healthy for member in self.members}
+
+    def _health_loop(self):
+        while not self._stop_event.wait(self.health_interval):
+            try:
+                self.check_health()
+            except Exception as e:
+                logging.debug(f"集區健康檢查時發生錯誤: {e}")
+
+    # === 操作 ===
+
+    def register_device(self, unicast_addr: str, device_type: str, device_name: str = None) -> bool:
+        """
+        在所有成員的控制器註冊設備，任何成員都能在故障轉移後接手
+
+        Returns:
+            bool: 註冊成功返回 True，否則返回 False
+        """
+        results = [member.controller.register_device(unicast_addr, device_type, device_name)
+                   for member in self.members]
+        return bool(results) and all(results)
+
+    def send_datatrans(self, unicast_addr: str, data: str, element_index: int = 0,
+                       app_key_idx: int = 0, ack: int = 0):
+        """經由負責的 dongle 發送 AT+MDTS，參數與 Provisioner.send_datatrans 相同"""
+        return self.execute(unicast_addr, lambda member: member.provisioner.send_datatrans(
+            unicast_addr, data, element_index, app_key_idx, ack))
+
+    def control(self, unicast_addr: str, method: str, *args, **kwargs) -> Any:
+        """
+        經由負責的 dongle 呼叫控制器方法
+
+        Args:
+            unicast_addr (str): 目標地址，同時作為方法的第一個參數
+            method (str): RLMeshDeviceController 的方法名稱，例如 'control_rgb_led' 或 'read_air_box_data'
+            *args, **kwargs: 目標地址之後的參數
+
+        Returns:
+            控制器方法的返回值
+
+        Raises:
+            AttributeError: 控制器沒有此方法
+        """
+        if not callable(getattr(RLMeshDeviceController, method, None)):
+            raise AttributeError(f"控制器沒有 {method} 方法")
+        return self.execute(unicast_addr, lambda member: getattr(member.controller, method)(
+            unicast_addr, *args, **kwargs))
+
+    def scan_nodes(self, scan_time: float = 3.0):
+        """經由主要 dongle 掃描未配置的節點"""
+        return self.primary.provisioner.scan_nodes(scan_time=scan_time)
+
+    def auto_provision_node(self, uuid: str) -> Dict[str, Any]:
+        """經由主要 dongle 配置並綁定節點"""
+        return self.primary.provisioner.auto_provision_node(uuid)
+
+    def status(self) -> Dict[str, Any]:
+        """集區狀態"""
+        return {"routing": self.routing, "members": [member.status() for member in self.members],
+                "healthy": len(self.healthy_members())}
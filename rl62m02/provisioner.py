@@ -2,8 +2,11 @@ import threading
 import time
 import logging
 import uuid as uuid_module
+from collections import deque
 from .serial_at import SerialAT
-from .utils import format_mac_address # Import from utils
+from .metrics import MetricsRegistry, RateMeter
+from .tracing import start_span
+from .utils import format_mac_address, format_mesh_address # Import from utils
 
 class Provisioner:
     """
@@ -19,14 +22,18 @@ class Provisioner:
     MODEL_ID = '0x4005D'
     APP_KEY_IDX = 0
     NET_KEY_IDX = 0
+    # 第一個參數為目標地址的命令，延遲指標會另外依目標地址統計
+    ADDRESSED_COMMANDS = ('AT+AKA', 'AT+MAKB', 'AT+MSAA', 'AT+MSAD', 'AT+MPAS', 'AT+MPAD',
+                          'AT+MDTS', 'AT+MDTG', 'AT+NR')
     
-    def __init__(self, serial_at: SerialAT, command_delay: float = 0.01):
+    def __init__(self, serial_at: SerialAT, command_delay: float = 0.01, metrics: MetricsRegistry = None):
         """
         初始化 Provisioner 實例
         
         Args:
             serial_at (SerialAT): SerialAT 實例，用於與設備通訊
             command_delay (float): 發送每個 AT 命令前的延遲時間 (秒)，預設為 0.0
+            metrics (MetricsRegistry, optional): 記錄命令延遲等指標的登錄表，未指定時自動建立
             
         Raises:
             ValueError: 當設備角色不是 PROVISIONER 或無法取得角色資訊時拋出
@@ -37,6 +44,13 @@ class Provisioner:
         self.responses = []
         self._resp_lock = threading.Lock()  # 添加鎖保護共享資源
         self._response_events = {}  # 用於單獨命令的響應事件
+        self._listeners = []  # 接收每一行訊息的監聽函數
+        self._send_lock = threading.Lock()  # 確保同一時間只有一個 AT 命令等待回應
+        self.metrics = metrics or MetricsRegistry()
+        self._describe_metrics()
+        self._rx_rate = RateMeter()
+        self._late_prefixes = deque(maxlen=32)  # 已逾時命令的回應前綴，用於統計遲到的回應
+        self.consecutive_timeouts = 0  # 連續逾時的命令數，收到任何回應時歸零
         self.serial_at.on_receive = self._on_receive
         self._response_event = threading.Event()
         self._command_prefixes = {
@@ -67,20 +81,66 @@ class Provisioner:
 
     def _on_receive(self, line: str):
         """接收消息的回調函數，添加鎖保護並支援命令ID匹配"""
+        late = False
         with self._resp_lock:
             self.responses.append(line)
             self.last_response = line
 
             # 檢查是否有待處理的命令回應
+            matched = False
             if self._last_command_id and self._last_command_id in self._response_events:
                 cmd_prefix = self._response_events[self._last_command_id]['prefix']
                 if line.startswith(cmd_prefix):
                     self._response_events[self._last_command_id]['response'] = line
                     self._response_events[self._last_command_id]['event'].set()
                     self._last_command_id = None  # 清除已處理的命令ID
+                    matched = True
+            if not matched and self._late_prefixes:
+                for prefix in self._late_prefixes:
+                    if line.startswith(prefix):
+                        self._late_prefixes.remove(prefix)
+                        late = True
+                        break
             
             # 通知一般響應等待
             self._response_event.set()
+            listeners = list(self._listeners)
+            self._rx_rate.mark()
+
+        line_type = line.split(' ', 1)[0]
+        self.metrics.inc('rl62m02_rx_lines_total',
+                         labels={'type': line_type if line_type.endswith('-MSG') else 'other'})
+        if late:
+            self.metrics.inc('rl62m02_late_responses_total', labels={'type': line_type})
+
+        # 在鎖外呼叫監聽函數，避免監聽函數發送命令時死鎖
+        for listener in listeners:
+            try:
+                listener(line)
+            except Exception as e:
+                logging.debug(f"監聽函數處理訊息時發生錯誤: {e}")
+
+    def add_listener(self, callback):
+        """
+        註冊訊息監聽函數，每收到一行訊息都會呼叫
+        
+        Args:
+            callback (callable): 接收一個字串參數 (收到的訊息行) 的函數
+        """
+        with self._resp_lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """
+        移除訊息監聽函數
+        
+        Args:
+            callback (callable): 先前以 add_listener 註冊的函數
+        """
+        with self._resp_lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
 
     def _send_and_wait(self, cmd: str, timeout: float = None, expected_prefix: str = None):
         """
@@ -94,6 +154,68 @@ class Provisioner:
         Returns:
             str: 響應消息，如果超時則返回 None
         """
+        metrics = self.metrics
+        metrics.add_gauge('rl62m02_tx_queue_depth', 1)
+        queued = time.perf_counter()
+        with start_span(cmd.split(' ', 1)[0], {'at.command': cmd}) as span:
+            try:
+                # 命令 ID 配對依賴單一的 _last_command_id，多個執行緒同時發送時需序列化
+                with self._send_lock:
+                    started = time.perf_counter()
+                    response = self._send_and_wait_locked(cmd, timeout, expected_prefix)
+                    elapsed = time.perf_counter() - started
+            finally:
+                metrics.add_gauge('rl62m02_tx_queue_depth', -1)
+            span.set_attribute('at.response', response)
+            if response is None:
+                span.set_status('error', 'timeout')
+            elif 'ERROR' in response:
+                span.set_status('error', response)
+        self._record_command(cmd, expected_prefix, response, started - queued, elapsed)
+        return response
+
+    def _describe_metrics(self):
+        """設定指標說明並註冊 RX 速率收集函數"""
+        metrics = self.metrics
+        metrics.describe('rl62m02_command_latency_seconds', '取得鎖之後到收到回應 (或逾時) 的時間，依 AT 命令區分')
+        metrics.describe('rl62m02_destination_latency_seconds', '以目標地址區分的 AT 命令延遲')
+        metrics.describe('rl62m02_tx_queue_wait_seconds', '等待前一個 AT 命令完成的時間')
+        metrics.describe('rl62m02_tx_queue_depth', '等待中或執行中的 AT 命令數')
+        metrics.describe('rl62m02_commands_total', '發送的 AT 命令數')
+        metrics.describe('rl62m02_command_timeouts_total', '等待回應逾時的 AT 命令數')
+        metrics.describe('rl62m02_command_errors_total', '回應為 ERROR 的 AT 命令數')
+        metrics.describe('rl62m02_rx_lines_total', '收到的訊息行數，依訊息類型區分')
+        metrics.describe('rl62m02_late_responses_total', '命令逾時後才收到、因此被丟棄的回應數')
+        metrics.add_collector('provisioner', lambda: [
+            ('rl62m02_rx_lines_per_second', 'gauge', '最近 10 秒平均每秒收到的訊息行數', {}, self._rx_rate.rate()),
+        ])
+
+    def _record_command(self, cmd: str, expected_prefix: str, response, queue_wait: float, elapsed: float):
+        """記錄一個 AT 命令的指標"""
+        parts = cmd.split()
+        command = parts[0] if parts else cmd
+        labels = {'command': command}
+        metrics = self.metrics
+        metrics.inc('rl62m02_commands_total', labels=labels)
+        metrics.observe('rl62m02_command_latency_seconds', elapsed, labels)
+        metrics.observe('rl62m02_tx_queue_wait_seconds', queue_wait)
+        if command in self.ADDRESSED_COMMANDS and len(parts) > 1:
+            metrics.observe('rl62m02_destination_latency_seconds', elapsed,
+                            {'destination': format_mesh_address(parts[1])})
+        if response is None:
+            self.consecutive_timeouts += 1
+            metrics.inc('rl62m02_command_timeouts_total', labels=labels)
+            prefix = expected_prefix or self._command_prefixes.get(command)
+            if prefix:
+                with self._resp_lock:
+                    self._late_prefixes.append(prefix)
+        else:
+            self.consecutive_timeouts = 0
+            if 'ERROR' in response:
+                metrics.inc('rl62m02_command_errors_total', labels=labels)
+
+    def _send_and_wait_locked(self, cmd: str, timeout: float, expected_prefix: str):
+        """_send_and_wait 的實作，呼叫者需持有 _send_lock"""
         # 增加命令發送前的延遲
         time.sleep(self._command_delay)
 
@@ -187,6 +309,26 @@ class Provisioner:
         resp = self._send_and_wait('AT+MRG', expected_prefix='MRG-MSG')
         return resp
 
+    def start_discovery(self):
+        """
+        開始掃描周圍設備，掃描期間收到的 DIS-MSG 會送到訊息監聽函數 (參考 add_listener)
+        
+        Returns:
+            str: 響應消息
+        """
+        resp = self._send_and_wait('AT+DIS 1')
+        return resp
+
+    def stop_discovery(self):
+        """
+        停止掃描周圍設備
+        
+        Returns:
+            str: 響應消息
+        """
+        resp = self._send_and_wait('AT+DIS 0')
+        return resp
+
     def scan_nodes(self, enable: bool = True, scan_time: float = 3.0):
         """
         掃描周圍 RL Mesh 設備
@@ -199,12 +341,12 @@ class Provisioner:
             list: 掃描到的設備列表，每個設備為包含 mac address 與 uuid 的字典
         """
         if not enable:
-            self._send_and_wait('AT+DIS 0')
+            self.stop_discovery()
             return []
         self.responses.clear()
-        self._send_and_wait('AT+DIS 1')
+        self.start_discovery()
         time.sleep(scan_time)
-        self._send_and_wait('AT+DIS 0')
+        self.stop_discovery()
         mac_uuid_dict = {}
         for r in self.responses:
             if r.startswith('DIS-MSG '):
@@ -315,6 +457,17 @@ class Provisioner:
         Returns:
             dict: 綁定結果，包含結果狀態和 unicast address
         """
+        with start_span('provisioner.auto_provision_node', {'uuid': uuid}) as span:
+            result = self._auto_provision_node(uuid)
+            span.set_attribute('result', result['result'])
+            if 'unicast_addr' in result:
+                span.set_attribute('unicast_addr', result['unicast_addr'])
+            if 'step' in result:
+                span.set_status('error', f"{result['step']} 失敗: {result.get('msg')}")
+            return result
+
+    def _auto_provision_node(self, uuid: str):
+        """auto_provision_node 的 PBADVCON / PROV / AKA / MAKB 步驟"""
         unicast_addr = None
         # 1. 開啟 PB-ADV 通道
         resp = self._send_and_wait(f'AT+PBADVCON {uuid}', timeout=self.AKA_TIMEOUT, expected_prefix='PBADVCON-MSG')
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Smart-Box 寄存器對應表
+以 JSON (或安裝 PyYAML 時的 YAML) 宣告各設備型號的寄存器欄位，
+編譯成預先計算好的 struct.Struct，一次呼叫即可解出所有欄位
+"""
+
+import os
+import json
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Union
+
+from .modbus import ModbusRTU
+
+# 內建寄存器對應表的目錄
+BUILTIN_MAP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "regmaps")
+
+# 欄位寬度 (寄存器數) -> struct 格式字元 (無號, 有號)
+_INT_CODES = {1: ("H", "h"), 2: ("I", "i"), 4: ("Q", "q")}
+_FLOAT_CODES = {2: "f", 4: "d"}
+_BYTE_ORDERS = {"big": ">", "little": "<"}
+
+
+class RegisterField:
+    """寄存器對應表中的單一欄位"""
+
+    def __init__(self, name: str, address: int, width: int = 1, signed: bool = False,
+                 byte_order: str = "big", scale: float = 1, value_type: str = "int", unit: str = ""):
+        """
+        初始化欄位
+
+        Args:
+            name (str): 欄位名稱
+            address (int): 寄存器地址
+            width (int): 佔用的寄存器數量 (整數 1/2/4，浮點數 2/4)
+            signed (bool): 是否為有號整數
+            byte_order (str): 'big' 或 'little'，整個欄位的位元組順序
+            scale (float): 原始值乘上的比例
+            value_type (str): 'int' 或 'float'
+            unit (str): 單位 (僅供顯示)
+        """
+        if byte_order not in _BYTE_ORDERS:
+            raise ValueError(f"欄位 {name} 的位元組順序無效: {byte_order}")
+        if value_type == "float":
+            if width not in _FLOAT_CODES:
+                raise ValueError(f"浮點欄位 {name} 的寬度必須是 2 或 4")
+            self.code = _FLOAT_CODES[width]
+        elif value_type == "int":
+            if width not in _INT_CODES:
+                raise ValueError(f"整數欄位 {name} 的寬度必須是 1、2 或 4")
+            self.code = _INT_CODES[width][1 if signed else 0]
+        else:
+            raise ValueError(f"欄位 {name} 的型別無效: {value_type}")
+        self.name = name
+        self.address = address
+        self.width = width
+        self.signed = signed
+        self.byte_order = byte_order
+        self.scale = scale
+        self.value_type = value_type
+        self.unit = unit
+        # 0.1、0.001 等比例以除法計算，結果與 int / 10.0 完全相同
+        self._divisor = 1 / scale if scale and 0 < scale < 1 and float(1 / scale).is_integer() else None
+
+    def convert(self, raw: Union[int, float]) -> Union[int, float]:
+        """將原始值換算為實際值"""
+        if self._divisor is not None:
+            return raw / self._divisor
+        if self.scale == 1:
+            return raw
+        return raw * self.scale
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RegisterField":
+        """由宣告字典建立欄位"""
+        return cls(
+            name=data["name"],
+            address=_parse_int(data["address"]),
+            width=int(data.get("width", 1)),
+            signed=bool(data.get("signed", False)),
+            byte_order=data.get("byte_order", "big"),
+            scale=data.get("scale", 1),
+            value_type=data.get("type", "int"),
+            unit=data.get("unit", ""),
+        )
+
+
+class RegisterMap:
+    """
+    設備型號的寄存器對應表
+
+    欄位依位元組順序分組，每組預先建立一個涵蓋整段讀取的 struct.Struct，
+    未使用的寄存器以填充位元組 (x) 跳過；decode() 每組一次 unpack_from，再依預先計算的換算列表轉換數值
+    """
+
+    def __init__(self, model: str, function_code: int, start_address: int, quantity: int,
+                 fields: List[RegisterField], description: str = ""):
+        """
+        初始化並編譯寄存器對應表
+
+        Args:
+            model (str): 型號名稱
+            function_code (int): 讀取使用的功能碼 (FC03 或 FC04)
+            start_address (int): 讀取的起始地址
+            quantity (int): 讀取的寄存器數量
+            fields (List[RegisterField]): 欄位列表
+            description (str): 說明
+        """
+        if function_code not in (ModbusRTU.READ_HOLDING_REGISTERS, ModbusRTU.READ_INPUT_REGISTERS):
+            raise ValueError(f"寄存器對應表 {model} 的功能碼必須是 FC03 或 FC04")
+        self.model = model
+        self.function_code = function_code
+        self.start_address = start_address
+        self.quantity = quantity
+        self.fields = list(fields)
+        self.description = description
+        self._layout = self._compile()
+
+    def _compile(self):
+        """
+        預先計算解碼表
+
+        欄位依位元組順序分組，每組對應一個涵蓋該組所有欄位的 struct.Struct (未使用的寄存器以填充位元組 x 跳過)，
+        並附上依地址排序的 (欄位名稱, RegisterField.convert) 換算列表
+
+        Returns:
+            list: [(struct.Struct, [(名稱, 換算函數), ...]), ...]
+        """
+        groups: Dict[str, List[RegisterField]] = {}
+        end_address = self.start_address + self.quantity
+        for field in self.fields:
+            if field.address < self.start_address or field.address + field.width > end_address:
+                raise ValueError(f"欄位 {field.name} 超出讀取範圍")
+            groups.setdefault(field.byte_order, []).append(field)
+
+        layout = []
+        for byte_order, fields in groups.items():
+            fields = sorted(fields, key=lambda f: f.address)
+            fmt = _BYTE_ORDERS[byte_order]
+            position = 0  # 目前的位元組位置
+            for field in fields:
+                offset = (field.address - self.start_address) * 2
+                if offset < position:
+                    raise ValueError(f"欄位 {field.name} 與其他欄位重疊")
+                if offset > position:
+                    fmt += f"{offset - position}x"
+                fmt += field.code
+                position = offset + field.width * 2
+            conversions = [(field.name, field.convert) for field in fields]
+            layout.append((struct.Struct(fmt), conversions))
+        return layout
+
+    @property
+    def byte_count(self) -> int:
+        """完整讀取的資料位元組數"""
+        return self.quantity * 2
+
+    def field_names(self) -> List[str]:
+        """所有欄位名稱"""
+        return [field.name for field in self.fields]
+
+    def decode(self, payload: bytes) -> Optional[Dict[str, Union[int, float]]]:
+        """
+        解析讀取回應的資料部分 (位元組數之後的寄存器資料)
+
+        Args:
+            payload (bytes): 寄存器資料
+
+        Returns:
+            dict: 欄位名稱 -> 換算後的值，資料長度不足時返回 None
+        """
+        values = {}
+        for unpacker, conversions in self._layout:
+            if len(payload) < unpacker.size:
+                return None
+            for (name, convert), raw in zip(conversions, unpacker.unpack_from(payload)):
+                values[name] = convert(raw)
+        return values
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RegisterMap":
+        """由宣告字典建立寄存器對應表"""
+        try:
+            return cls(
+                model=data["model"],
+                function_code=_parse_int(data["function_code"]),
+                start_address=_parse_int(data["start_address"]),
+                quantity=_parse_int(data["quantity"]),
+                fields=[RegisterField.from_dict(field) for field in data["fields"]],
+                description=data.get("description", ""),
+            )
+        except KeyError as e:
+            raise ValueError(f"寄存器對應表缺少欄位: {e}")
+
+
+def _parse_int(value: Union[int, str]) -> int:
+    """接受整數或 '0x000E' 形式的字串"""
+    return value if isinstance(value, int) else int(str(value), 0)
+
+
+def load_register_map(path: str) -> RegisterMap:
+    """
+    從 JSON 或 YAML 檔案載入寄存器對應表
+
+    Args:
+        path (str): 檔案路徑 (.json / .yaml / .yml)
+
+    Returns:
+        RegisterMap: 編譯完成的寄存器對應表
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith(('.yaml', '.yml')):
+            # PyYAML 為選用依賴，只在載入 YAML 檔案時導入
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("載入 YAML 寄存器對應表需要安裝 PyYAML")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    return RegisterMap.from_dict(data)
+
+
+def _is_path(model: str) -> bool:
+    """以副檔名或路徑分隔符號判斷 get_register_map 的參數是否為檔案路徑"""
+    if model.endswith(('.json', '.yaml', '.yml')):
+        return True
+    return os.sep in model or (os.altsep is not None and os.altsep in model)
+
+
+_cache: Dict[str, RegisterMap] = {}
+_cache_lock = threading.Lock()
+
+
+def get_register_map(model: Union[str, RegisterMap]) -> RegisterMap:
+    """
+    取得寄存器對應表，內建型號與檔案路徑只會載入與編譯一次
+
+    Args:
+        model: 內建型號名稱 (例如 'air_box')、檔案路徑或 RegisterMap 實例；
+               只有以 .json / .yaml / .yml 結尾或包含路徑分隔符號時才視為檔案路徑，
+               因此目前目錄下與型號同名的檔案或目錄不會取代內建型號
+
+    Returns:
+        RegisterMap: 編譯完成的寄存器對應表
+    """
+    if isinstance(model, RegisterMap):
+        return model
+    with _cache_lock:
+        register_map = _cache.get(model)
+        if register_map is None:
+            if _is_path(model):
+                path = model
+            else:
+                path = os.path.join(BUILTIN_MAP_DIR, f"{model}.json")
+            if not os.path.exists(path):
+                raise ValueError(f"找不到寄存器對應表: {model}")
+            register_map = _cache[model] = load_register_map(path)
+        return register_map
+
+
+def builtin_models() -> List[str]:
+    """內建的寄存器對應表型號"""
+    return sorted(name[:-5] for name in os.listdir(BUILTIN_MAP_DIR) if name.endswith(".json"))
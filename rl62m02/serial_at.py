@@ -10,7 +10,8 @@ class SerialAT:
     負責與裝置進行串口通訊，包含自動接收與傳送 AT 指令的功能。
     """
 
-    def __init__(self, port: str, baudrate: int = 115200, on_receive: Optional[Callable[[str], None]] = None):
+    def __init__(self, port: str, baudrate: int = 115200, on_receive: Optional[Callable[[str], None]] = None,
+                 record_path: Optional[str] = None, read_timeout: float = 0.1):
         """
         初始化 SerialAT 實例
         
@@ -18,11 +19,17 @@ class SerialAT:
             port (str): 串口名稱，例如 "COM3"
             baudrate (int): 鮑率，預設為 115200
             on_receive (callable): 收到訊息時的回調函數，可選
+            record_path (str): 錄製收發內容的記錄檔路徑，可選 (參考 session_log 模組)
+            read_timeout (float): 接收線程阻塞讀取的逾時秒數。資料到達時讀取立即返回，
+                                  此值只影響 close() 停止接收線程所需的時間
         """
         self.port = port
         self.baudrate = baudrate
-        self.ser = serial.Serial(port, baudrate, timeout=1)
+        self.ser = serial.Serial(port, baudrate, timeout=read_timeout)
         self.on_receive = on_receive
+        self.recorder = None
+        if record_path:
+            self.start_recording(record_path)
         self._stop_event = threading.Event()
         self._recv_thread = threading.Thread(target=self._recv_loop, daemon=True)
         time.sleep(2)
@@ -41,6 +48,9 @@ class SerialAT:
         """
         if not cmd.endswith('\r\n'):
             cmd += '\r\n'
+        recorder = self.recorder
+        if recorder:
+            recorder.record_tx(cmd.strip())
         self.ser.write(cmd.encode('utf-8'))
         logging.debug(f"UART Send: {cmd.strip()}")
         self.ser.flush()
@@ -50,25 +60,48 @@ class SerialAT:
         buffer = ''
         while not self._stop_event.is_set():
             try:
-                if self.ser.in_waiting:
-                    data = self.ser.read(self.ser.in_waiting)
-                    if data:
-                        buffer += data.decode('utf-8', errors='ignore')
-                        while '\r\n' in buffer:
-                            line, buffer = buffer.split('\r\n', 1)
-                            logging.debug(f"RX: {line}")
-                            # 將接收到的行添加到響應隊列
-                            with self._queue_lock:  # 使用互斥鎖保護共享資源
-                                self._response_queue.append(line)
-                                self._response_event.set()  # 通知有新響應
-                            if self.on_receive:
-                                self.on_receive(line)
-                else:
-                    time.sleep(0.1)
+                # 沒有待讀資料時阻塞等待第一個位元組 (最多 read_timeout 秒)，不以固定間隔輪詢，
+                # 回應到達後立即處理
+                data = self.ser.read(self.ser.in_waiting or 1)
+                if data:
+                    buffer += data.decode('utf-8', errors='ignore')
+                    while '\r\n' in buffer:
+                        line, buffer = buffer.split('\r\n', 1)
+                        self._dispatch_line(line)
             except Exception as e:
                 logging.debug(f"Exception: {e}")
                 time.sleep(0.1)
     
+    def _dispatch_line(self, line: str):
+        """處理收到的一行訊息"""
+        logging.debug(f"RX: {line}")
+        recorder = self.recorder
+        if recorder:
+            recorder.record_rx(line)
+        # 將接收到的行添加到響應隊列
+        with self._queue_lock:  # 使用互斥鎖保護共享資源
+            self._response_queue.append(line)
+            self._response_event.set()  # 通知有新響應
+        if self.on_receive:
+            self.on_receive(line)
+    
+    def start_recording(self, path: str):
+        """
+        開始錄製收發內容，追加到記錄檔
+        
+        Args:
+            path (str): 記錄檔路徑
+        """
+        from .session_log import SessionRecorder
+        self.stop_recording()
+        self.recorder = SessionRecorder(path)
+    
+    def stop_recording(self):
+        """停止錄製並關閉記錄檔"""
+        recorder, self.recorder = self.recorder, None
+        if recorder:
+            recorder.close()
+    
     def wait_for_response(self, prefix: str, target_uid: str = None, timeout: float = 2.0):
         """
         等待指定前綴的響應，並可選擇性地檢查UID
@@ -126,4 +159,5 @@ class SerialAT:
         if self._recv_thread.is_alive():
             self._recv_thread.join(timeout=1.0)
         if self.ser.is_open:
-            self.ser.close()
\ No newline at end of file
+            self.ser.close()
+        self.stop_recording()
\ No newline at end of file
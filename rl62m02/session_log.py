@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+AT 通訊錄製與重播
+SessionRecorder 將 SerialAT 收發的每一行以單調時鐘時間戳記寫入精簡的只追加二進位記錄檔；
+ReplaySerialAT 讀取記錄檔，不需硬體即可把錄製的回應依原本的時間 (或盡快) 餵給 Provisioner 等上層程式
+
+記錄檔格式 (小端序):
+    檔頭: b"RLAT" + 版本 (1 byte)，只在新檔案開頭寫入一次
+    記錄: 時間 (uint64，自該段錄製開始的微秒數) + 類型 (1 byte) + 長度 (uint16) + UTF-8 內容
+    類型 0 為一段錄製的開始 (內容為開始時的 Unix 時間)，1 為 TX，2 為 RX
+"""
+
+import os
+import time
+import struct
+import logging
+import threading
+from collections import deque, namedtuple
+from typing import Iterator, List, Optional
+
+from .serial_at import SerialAT
+
+MAGIC = b"RLAT"
+VERSION = 1
+_RECORD = struct.Struct("<QBH")
+
+KIND_SESSION = 0
+KIND_TX = 1
+KIND_RX = 2
+
+# session: 檔案中第幾段錄製 (從 0 開始)；timestamp: 自該段開始的秒數
+SessionRecord = namedtuple("SessionRecord", ["session", "timestamp", "kind", "line"])
+
+
+class SessionRecorder:
+    """
+    AT 通訊錄製器，執行緒安全
+
+    每次開啟都在檔案尾端追加一段新的錄製，既有內容不會被覆寫
+    """
+
+    def __init__(self, path: str, buffer_size: int = 65536):
+        """
+        開啟記錄檔
+
+        Args:
+            path (str): 記錄檔路徑
+            buffer_size (int): 寫入緩衝區大小，close() 或 flush() 時寫入磁碟
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "ab", buffering=buffer_size)
+        if self._file.tell() == 0:
+            self._file.write(MAGIC + bytes([VERSION]))
+        self._started = time.monotonic()
+        self.records = 0
+        self._write(KIND_SESSION, repr(time.time()))
+
+    def _write(self, kind: int, line: str):
+        data = line.encode("utf-8")[:0xFFFF]
+        elapsed_us = int((time.monotonic() - self._started) * 1_000_000)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(_RECORD.pack(elapsed_us, kind, len(data)) + data)
+            self.records += 1
+
+    def record_tx(self, line: str):
+        """記錄一行送出的指令"""
+        self._write(KIND_TX, line)
+
+    def record_rx(self, line: str):
+        """記錄一行收到的訊息"""
+        self._write(KIND_RX, line)
+
+    def flush(self):
+        """將緩衝區寫入磁碟"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self):
+        """關閉記錄檔"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def read_session_log(path: str) -> Iterator[SessionRecord]:
+    """
+    讀取記錄檔
+
+    Args:
+        path (str): 記錄檔路徑
+
+    Returns:
+        Iterator[SessionRecord]: 依寫入順序的記錄；未寫完的最後一筆記錄會被忽略
+
+    Raises:
+        ValueError: 檔案不是 AT 通訊記錄檔
+    """
+    with open(path, "rb") as f:
+        header = f.read(len(MAGIC) + 1)
+        if header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} 不是 AT 通訊記錄檔")
+        if header[len(MAGIC)] != VERSION:
+            raise ValueError(f"不支援的記錄檔版本: {header[len(MAGIC)]}")
+        session = -1
+        while True:
+            head = f.read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                return
+            elapsed_us, kind, length = _RECORD.unpack(head)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            if kind == KIND_SESSION:
+                session += 1
+            yield SessionRecord(session, elapsed_us / 1_000_000, kind, data.decode("utf-8", errors="ignore"))
+
+
+class ReplaySerialAT(SerialAT):
+    """
+    以記錄檔取代實體串口的 SerialAT
+
+    錄製中每個 TX 之後的 RX 會在上層程式送出下一個指令後才釋放，並保持與該 TX 的原始時間差
+    (除以 speed)；第一個 TX 之前的 RX 依其相對於開始的時間釋放。speed 為 None 或 0 時不等待，盡快重播。
+    送出的指令與錄製的 TX 不同時只記錄警告並繼續，不同的次數記在 stats['mismatches']
+    """
+
+    def __init__(self, path: str, speed: Optional[float] = 1.0, session: int = 0, on_receive=None):
+        """
+        初始化重播
+
+        Args:
+            path (str): 記錄檔路徑
+            speed (float, optional): 重播速度倍率，1.0 為原始速度，None 或 0 為盡快重播
+            session (int): 重播檔案中的第幾段錄製
+            on_receive (callable, optional): 收到訊息時的回調函數
+        """
+        records = [record for record in read_session_log(path)
+                   if record.session == session and record.kind != KIND_SESSION]
+        self.port = path
+        self.baudrate = None
+        self.ser = None
+        self.recorder = None
+        self.on_receive = on_receive
+        self.speed = speed
+        self.stats = {"tx": 0, "rx": 0, "mismatches": 0}
+        self.finished = threading.Event()
+        self._response_queue = []
+        self._response_event = threading.Event()
+        self._queue_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._sent = deque()
+        self._sent_event = threading.Event()
+        self._steps = self._group(records)
+        self._recv_thread = threading.Thread(target=self._replay_loop, daemon=True)
+        self._recv_thread.start()
+
+    @staticmethod
+    def _group(records: List[SessionRecord]):
+        """分成 [(TX 記錄或 None, [RX 記錄...]), ...]"""
+        steps = [(None, [])]
+        for record in records:
+            if record.kind == KIND_TX:
+                steps.append((record, []))
+            else:
+                steps[-1][1].append(record)
+        return steps
+
+    def send(self, cmd: str):
+        """接收上層程式送出的指令，讓重播繼續到下一個 TX"""
+        line = cmd.strip()
+        logging.debug(f"Replay Send: {line}")
+        with self._queue_lock:
+            self._sent.append(line)
+        self._sent_event.set()
+
+    def _next_sent(self) -> Optional[str]:
+        """等待上層程式送出下一個指令，停止時返回 None"""
+        while not self._stop_event.is_set():
+            with self._queue_lock:
+                if self._sent:
+                    return self._sent.popleft()
+                self._sent_event.clear()
+            self._sent_event.wait(0.1)
+        return None
+
+    def _sleep_until(self, deadline: float) -> bool:
+        """等待到指定時間，停止時返回 False"""
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+            return not self._stop_event.wait(remaining)
+        return not self._stop_event.is_set()
+
+    def _replay_loop(self):
+        """依錄製順序釋放 RX"""
+        for tx, rx_records in self._steps:
+            if tx is None:
+                base_time, base_recorded = time.monotonic(), 0.0
+            else:
+                sent = self._next_sent()
+                if sent is None:
+                    return
+                base_time, base_recorded = time.monotonic(), tx.timestamp
+                self.stats["tx"] += 1
+                if sent != tx.line:
+                    self.stats["mismatches"] += 1
+                    logging.warning(f"重播指令不符: 錄製為 {tx.line}，實際為 {sent}")
+            for record in rx_records:
+                if self.speed:
+                    deadline = base_time + (record.timestamp - base_recorded) / self.speed
+                    if not self._sleep_until(deadline):
+                        return
+                self.stats["rx"] += 1
+                self._dispatch_line(record.line)
+        self.finished.set()
+
+    def close(self):
+        """停止重播"""
+        self._stop_event.set()
+        self._sent_event.set()
+        if self._recv_thread.is_alive() and self._recv_thread is not threading.current_thread():
+            self._recv_thread.join(timeout=1.0)
@@ -7,9 +7,16 @@ setup(
     author="RichLink",
     author_email="your.email@example.com",
     packages=find_packages(),
+    package_data={
+        "": ["regmaps/*.json"],
+    },
     install_requires=[
         "pyserial>=3.5",
     ],
+    extras_require={
+        "numpy": ["numpy"],
+        "yaml": ["PyYAML"],
+    },
     entry_points={
         'console_scripts': [
             'rl62m02=rl62m02.cli:main',
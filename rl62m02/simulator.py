@@ -0,0 +1,596 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+RL62M02 Provisioner 模擬器
+以虛擬終端機 (pty) 模擬 RL62M02 dongle，依 Doc/RL62M02_Provision_ATCMD.md 回應 AT 指令
+(MRG、DIS、PBADVCON、PROV、AKA、MAKB、MSAA、MPAS、MDTS、MDTG、NL、NR 等)，
+背後是一個可設定節點數量、延遲與遺失率的虛擬 Mesh 網路，Smart-Box 節點可掛載 Modbus 從站。
+SerialAT 直接開啟 port 屬性的路徑即可連線，不需任何修改 (僅支援 Linux / macOS)
+"""
+
+import os
+import pty
+import tty
+import time
+import heapq
+import random
+import select
+import logging
+import argparse
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from .modbus import ModbusRTU, ModbusRTUFrameParser
+
+
+class ModbusSlave:
+    """
+    虛擬 Modbus 從站，以字典保存寄存器與線圈 (未設定的地址為 0)
+    """
+
+    def __init__(self, holding_registers: Dict[int, int] = None, input_registers: Dict[int, int] = None,
+                 coils: Dict[int, bool] = None, discrete_inputs: Dict[int, bool] = None):
+        self.holding_registers = dict(holding_registers or {})
+        self.input_registers = dict(input_registers or {})
+        self.coils = dict(coils or {})
+        self.discrete_inputs = dict(discrete_inputs or {})
+
+    @classmethod
+    def default(cls) -> "ModbusSlave":
+        """
+        建立帶有 Air-Box (輸入寄存器 0-5) 與電錶 (保持寄存器 14-17) 範例數值的從站，
+        可直接用 read_air_box_data / read_power_meter_data 讀取
+        """
+        return cls(holding_registers={14: 2201, 15: 1234, 16: 0, 17: 555},
+                   input_registers={0: 249, 1: 705, 2: 11, 3: 0, 4: 0, 5: 492})
+
+    def handle(self, modbus: ModbusRTU, request: bytes) -> bytes:
+        """
+        處理一個已通過 CRC 驗證的請求
+
+        Args:
+            modbus (ModbusRTU): 用於建立回應封包的 ModbusRTU 實例
+            request (bytes): 完整的請求封包
+
+        Returns:
+            bytes: 完整的回應封包 (含 CRC)
+        """
+        slave, function_code = request[0], request[1]
+        address = (request[2] << 8) | request[3]
+        value = (request[4] << 8) | request[5]
+        if function_code in (ModbusRTU.READ_COILS, ModbusRTU.READ_DISCRETE_INPUTS):
+            table = self.coils if function_code == ModbusRTU.READ_COILS else self.discrete_inputs
+            packed = bytearray((value + 7) // 8)
+            for index in range(value):
+                if table.get(address + index):
+                    packed[index >> 3] |= 1 << (index & 7)
+            return modbus.create_rtu_packet(slave, function_code, bytes([len(packed)]) + packed)
+        if function_code in (ModbusRTU.READ_HOLDING_REGISTERS, ModbusRTU.READ_INPUT_REGISTERS):
+            table = (self.holding_registers if function_code == ModbusRTU.READ_HOLDING_REGISTERS
+                     else self.input_registers)
+            data = bytearray([value * 2])
+            for index in range(value):
+                data += table.get(address + index, 0).to_bytes(2, 'big')
+            return modbus.create_rtu_packet(slave, function_code, bytes(data))
+        if function_code == ModbusRTU.WRITE_SINGLE_COIL:
+            self.coils[address] = value == 0xFF00
+            return modbus.create_rtu_packet(slave, function_code, request[2:6])
+        if function_code == ModbusRTU.WRITE_SINGLE_REGISTER:
+            self.holding_registers[address] = value
+            return modbus.create_rtu_packet(slave, function_code, request[2:6])
+        if function_code == ModbusRTU.WRITE_MULTIPLE_COILS:
+            for index in range(value):
+                self.coils[address + index] = bool(request[7 + (index >> 3)] >> (index & 7) & 1)
+            return modbus.create_rtu_packet(slave, function_code, request[2:6])
+        if function_code == ModbusRTU.WRITE_MULTIPLE_REGISTERS:
+            for index in range(value):
+                offset = 7 + index * 2
+                self.holding_registers[address + index] = (request[offset] << 8) | request[offset + 1]
+            return modbus.create_rtu_packet(slave, function_code, request[2:6])
+        return modbus.create_rtu_packet(slave, function_code | 0x80,
+                                        bytes([ModbusRTU.EXCEPTION_ILLEGAL_FUNCTION]))
+
+
+class VirtualNode:
+    """虛擬 Mesh 節點"""
+
+    def __init__(self, index: int, device_type: str = "SMART_BOX", rssi: int = -50,
+                 slaves: Dict[int, ModbusSlave] = None):
+        self.index = index
+        self.mac = f"6556{index:08X}"
+        self.uuid = f"123E4567E89B12D3A456{self.mac}"
+        self.rssi = rssi
+        self.device_type = device_type
+        self.unicast = None  # 配置後的 unicast address (int)
+        self.app_key_bound = False
+        self.model_bound = False
+        self.subscriptions = set()
+        self.publish = None
+        self.state = b""  # 最後一次 MDTS 寫入的資料
+        self.slaves = slaves if slaves is not None else (
+            {1: ModbusSlave.default()} if device_type == "SMART_BOX" else {})
+        self.rtu_parser = ModbusRTUFrameParser(requests=True)
+
+    @property
+    def address(self) -> Optional[str]:
+        """0xXXXX 格式的 unicast address，未配置時為 None"""
+        return None if self.unicast is None else f"0x{self.unicast:04X}"
+
+    def reset(self):
+        """節點重置 (Node Reset)，回到未配置狀態"""
+        self.unicast = None
+        self.app_key_bound = False
+        self.model_bound = False
+        self.subscriptions.clear()
+        self.publish = None
+        self.state = b""
+        self.rtu_parser.reset()
+
+
+class VirtualMesh:
+    """
+    虛擬 Mesh 網路
+
+    - latency / jitter: 每個經過 Mesh 的訊息 (節點回應、掃描廣播) 的延遲秒數與額外隨機延遲上限
+    - loss: 每個經過 Mesh 的訊息遺失的機率 (0-1)，遺失時 Provisioner 只會等到逾時
+    - provision_time: AT+PROV 額外需要的秒數
+    """
+
+    FIRST_ADDRESS = 0x0100
+
+    def __init__(self, nodes: int = 10, device_types: Iterable[str] = ("SMART_BOX",), latency: float = 0.0,
+                 jitter: float = 0.0, loss: float = 0.0, provision_time: float = 0.0,
+                 provisioned: bool = False, seed: int = None):
+        """
+        初始化虛擬 Mesh 網路
+
+        Args:
+            nodes (int): 節點數量
+            device_types (Iterable[str]): 節點設備類型，依序循環指定 (RGB_LED / PLUG / SMART_BOX)
+            latency (float): Mesh 訊息延遲 (秒)
+            jitter (float): 額外隨機延遲上限 (秒)
+            loss (float): Mesh 訊息遺失率 (0-1)
+            provision_time (float): 每次 Provisioning 額外需要的秒數
+            provisioned (bool): 是否預先配置並綁定所有節點 (不需再掃描與綁定)
+            seed (int, optional): 隨機數種子，用於重現遺失與延遲
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.provision_time = provision_time
+        self.random = random.Random(seed)
+        self.modbus = ModbusRTU()
+        types = list(device_types) or ["SMART_BOX"]
+        self.nodes: List[VirtualNode] = [
+            VirtualNode(index, types[index % len(types)], rssi=self.random.randint(-80, -40))
+            for index in range(nodes)
+        ]
+        self.next_address = self.FIRST_ADDRESS
+        self._by_uuid = {node.uuid: node for node in self.nodes}
+        self._by_address: Dict[int, VirtualNode] = {}
+        if provisioned:
+            self.provision_all()
+
+    def assign_address(self, node: VirtualNode) -> str:
+        """配置節點並分配下一個 unicast address"""
+        node.unicast = self.next_address
+        self._by_address[node.unicast] = node
+        self.next_address += 1
+        return node.address
+
+    def provision_all(self) -> List[str]:
+        """
+        直接配置並綁定所有尚未配置的節點 (不經過 AT 指令)，用於準備大型測試網路
+
+        Returns:
+            List[str]: 新配置節點的 unicast address
+        """
+        addresses = []
+        for node in self.nodes:
+            if node.unicast is None:
+                addresses.append(self.assign_address(node))
+                node.app_key_bound = node.model_bound = True
+        return addresses
+
+    def reset_node(self, node: VirtualNode):
+        """節點重置並釋放其 unicast address"""
+        self._by_address.pop(node.unicast, None)
+        node.reset()
+
+    def reset_all(self):
+        """清除整個 Mesh 網路配置"""
+        for node in self.nodes:
+            node.reset()
+        self._by_address.clear()
+        self.next_address = self.FIRST_ADDRESS
+
+    def find(self, address: str) -> Optional[VirtualNode]:
+        """依 unicast address 尋找已配置的節點"""
+        try:
+            value = int(address, 16)
+        except ValueError:
+            return None
+        return self._by_address.get(value)
+
+    def find_uuid(self, uuid: str) -> Optional[VirtualNode]:
+        """依 UUID 尋找節點"""
+        return self._by_uuid.get(uuid.upper())
+
+    def targets(self, address: str) -> List[VirtualNode]:
+        """MDTS 的目標節點: unicast address 或訂閱該 Group 的所有節點"""
+        try:
+            value = int(address, 16)
+        except ValueError:
+            return []
+        if 0xC000 <= value <= 0xFFFF:
+            return [node for node in self.nodes if node.model_bound and value in node.subscriptions]
+        node = self.find(address)
+        return [node] if node is not None and node.model_bound else []
+
+    def delay(self) -> Optional[float]:
+        """一個 Mesh 訊息的延遲秒數，訊息遺失時返回 None"""
+        if self.loss and self.random.random() < self.loss:
+            return None
+        return self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def deliver(self, node: VirtualNode, data: bytes) -> List[str]:
+        """
+        將 MDTS 資料交給節點處理
+
+        Returns:
+            List[str]: 節點回應的 MDTG-MSG 行 (Smart-Box RTU 回應依 17 bytes 分段)
+        """
+        node.state = data
+        if not data.startswith(b"\x82\x76\x02"):
+            return []  # RGB LED / 插座等命令只更新狀態
+        lines = []
+        for request in node.rtu_parser.feed(data[3:]):
+            slave = node.slaves.get(request[0])
+            if slave is None:
+                continue  # 不存在的從站不回應，由主站逾時處理
+            response = slave.handle(self.modbus, request)
+            for offset in range(0, len(response), 17):
+                chunk = response[offset:offset + 17]
+                lines.append(f"MDTG-MSG {node.address} 0 827602{chunk.hex().upper()}")
+        return lines
+
+
+class SimulatedDongle:
+    """
+    以虛擬終端機模擬的 RL62M02 Provisioner dongle
+
+    使用方式:
+        with SimulatedDongle(VirtualMesh(nodes=10)) as dongle:
+            serial_at = SerialAT(dongle.port)
+            provisioner = Provisioner(serial_at)
+    """
+
+    VERSION = "1.0.0"
+
+    def __init__(self, mesh: VirtualMesh = None, role: str = "PROVISIONER", mac: str = "655600FFFFFF"):
+        """
+        初始化模擬器並建立虛擬終端機
+
+        Args:
+            mesh (VirtualMesh, optional): 虛擬 Mesh 網路，預設為 10 個 Smart-Box 節點
+            role (str): AT+MRG 回報的角色
+            mac (str): AT+ADDR 回報的 MAC 地址
+        """
+        self.mesh = mesh or VirtualMesh()
+        self.role = role
+        self.mac = mac
+        self.name = "RL62M02"
+        self.responsive = True  # False 時忽略所有指令，模擬停止回應的 dongle
+        self._master_fd, self._slave_fd = pty.openpty()
+        tty.setraw(self._slave_fd)
+        self.port = os.ttyname(self._slave_fd)
+        self._selected = None  # 以 PBADVCON 開啟通道的節點
+        self._scanning = False
+        self._stop_event = threading.Event()
+        self._write_lock = threading.Lock()
+        self._outbox = []  # (到期時間, 序號, 訊息行)
+        self._outbox_cond = threading.Condition()
+        self._sequence = 0
+        self.stats = {"commands": 0, "lines_sent": 0, "dropped": 0, "ignored": 0}
+        self.command_counts: Dict[str, int] = {}
+        self._handlers = {
+            "AT+VER": self._cmd_ver,
+            "AT+NAME": self._cmd_name,
+            "AT+REBOOT": self._cmd_reboot,
+            "AT+MRG": self._cmd_mrg,
+            "AT+ADDR": self._cmd_addr,
+            "AT+NR": self._cmd_nr,
+            "AT+DIS": self._cmd_dis,
+            "AT+PBADVCON": self._cmd_pbadvcon,
+            "AT+PROV": self._cmd_prov,
+            "AT+NL": self._cmd_nl,
+            "AT+AKA": self._cmd_aka,
+            "AT+MAKB": self._cmd_makb,
+            "AT+MSAA": self._cmd_msaa,
+            "AT+MSAD": self._cmd_msad,
+            "AT+MPAS": self._cmd_mpas,
+            "AT+MPAD": self._cmd_mpad,
+            "AT+MDTS": self._cmd_mdts,
+            "AT+MDTG": self._cmd_mdtg,
+        }
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._reader.start()
+        self._writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """停止模擬器並關閉虛擬終端機"""
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        with self._outbox_cond:
+            self._outbox_cond.notify_all()
+        self._reader.join(timeout=1.0)
+        self._writer.join(timeout=1.0)
+        for fd in (self._master_fd, self._slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    # === 輸出 ===
+
+    def _emit(self, line: str, delay: float = 0.0):
+        """在 delay 秒後輸出一行回應"""
+        with self._outbox_cond:
+            self._sequence += 1
+            heapq.heappush(self._outbox, (time.monotonic() + delay, self._sequence, line))
+            self._outbox_cond.notify()
+
+    def _emit_remote(self, line: str, extra_delay: float = 0.0) -> bool:
+        """輸出一個經過 Mesh 的訊息，依 VirtualMesh 的設定延遲或遺失"""
+        delay = self.mesh.delay()
+        if delay is None:
+            self.stats["dropped"] += 1
+            return False
+        self._emit(line, delay + extra_delay)
+        return True
+
+    def _write_loop(self):
+        """依到期時間輸出回應"""
+        while not self._stop_event.is_set():
+            with self._outbox_cond:
+                if not self._outbox:
+                    self._outbox_cond.wait(0.5)
+                    continue
+                due = self._outbox[0][0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._outbox_cond.wait(wait)
+                    continue
+                lines = []
+                now = time.monotonic()
+                while self._outbox and self._outbox[0][0] <= now:
+                    lines.append(heapq.heappop(self._outbox)[2])
+            data = "".join(f"{line}\r\n" for line in lines).encode("utf-8")
+            try:
+                with self._write_lock:
+                    os.write(self._master_fd, data)
+            except OSError as e:
+                logging.debug(f"模擬器輸出失敗: {e}")
+                return
+            self.stats["lines_sent"] += len(lines)
+
+    # === 輸入 ===
+
+    def _read_loop(self):
+        """讀取 AT 指令並分派"""
+        buffer = b""
+        while not self._stop_event.is_set():
+            try:
+                readable, _, _ = select.select([self._master_fd], [], [], 0.1)
+                if not readable:
+                    continue
+                data = os.read(self._master_fd, 4096)
+            except OSError:
+                return
+            buffer += data
+            while b"\n" in buffer:
+                raw, buffer = buffer.split(b"\n", 1)
+                line = raw.decode("utf-8", errors="ignore").strip()
+                if line:
+                    self.handle_command(line)
+
+    def handle_command(self, line: str):
+        """
+        處理一行 AT 指令
+
+        Args:
+            line (str): 例如 'AT+MDTS 0x0100 0 0 0 0x8276020103...'
+        """
+        if not self.responsive:
+            self.stats["ignored"] += 1
+            return
+        parts = line.split()
+        command = parts[0].upper()
+        self.stats["commands"] += 1
+        self.command_counts[command] = self.command_counts.get(command, 0) + 1
+        handler = self._handlers.get(command)
+        if handler is None:
+            self._emit("ERROR")
+            return
+        try:
+            handler(parts[1:])
+        except (IndexError, ValueError) as e:
+            logging.debug(f"模擬器無法解析指令 {line}: {e}")
+            self._emit(f"{command[3:]}-MSG ERROR")
+
+    # === AT 指令 ===
+
+    def _cmd_ver(self, args):
+        self._emit(f"VER-MSG SUCCESS {self.VERSION}")
+
+    def _cmd_name(self, args):
+        self.name = args[0]
+        self._emit("NAME-MSG SUCCESS")
+
+    def _cmd_reboot(self, args):
+        self._emit("REBOOT-MSG SUCCESS")
+        self._emit(f"SYS-MSG {self.role} READY", 0.05)
+
+    def _cmd_mrg(self, args):
+        self._emit(f"MRG-MSG SUCCESS {self.role}")
+
+    def _cmd_addr(self, args):
+        self._emit(f"ADDR-MSG {self.mac}")
+
+    def _cmd_nr(self, args):
+        if args:
+            node = self.mesh.find(args[0])
+            if node is None:
+                self._emit("NR-MSG ERROR")
+                return
+            address = node.address
+            self.mesh.reset_node(node)
+            self._emit_remote(f"NR-MSG SUCCESS {address}")
+            return
+        # 不帶參數時清除整個 Mesh 網路配置
+        self.mesh.reset_all()
+        self._emit("NR-MSG SUCCESS 0x0000")
+        self._emit(f"SYS-MSG {self.role} READY", 0.05)
+
+    def _cmd_dis(self, args):
+        self._scanning = args[0] == "1"
+        self._emit("DIS-MSG SUCCESS")
+        if not self._scanning:
+            return
+        for node in self.mesh.nodes:
+            if node.unicast is None:
+                self._emit_remote(f"DIS-MSG {node.mac} {node.rssi} {node.uuid}")
+
+    def _cmd_pbadvcon(self, args):
+        node = self.mesh.find_uuid(args[0])
+        if node is None or node.unicast is not None:
+            self._selected = None
+            self._emit("PBADVCON-MSG ERROR")
+            return
+        self._selected = node
+        self._emit_remote("PBADVCON-MSG SUCCESS")
+
+    def _cmd_prov(self, args):
+        node, self._selected = self._selected, None
+        if node is None:
+            self._emit("PROV-MSG ERROR")
+            return
+        delay = self.mesh.delay()
+        if delay is None:
+            self.stats["dropped"] += 1
+            return
+        address = self.mesh.assign_address(node)
+        self._emit(f"PROV-MSG SUCCESS {address}", delay + self.mesh.provision_time)
+
+    def _cmd_nl(self, args):
+        index = 0
+        for node in self.mesh.nodes:
+            if node.unicast is not None:
+                self._emit(f"NL-MSG {index} {node.address} 1 1")
+                index += 1
+
+    def _remote_config(self, prefix: str, address: str, apply) -> None:
+        """經由 Mesh 設定節點，節點不存在時回應 ERROR"""
+        node = self.mesh.find(address)
+        if node is None:
+            self._emit(f"{prefix} ERROR")
+            return
+        apply(node)
+        self._emit_remote(f"{prefix} SUCCESS")
+
+    def _cmd_aka(self, args):
+        self._remote_config("AKA-MSG", args[0], lambda node: setattr(node, "app_key_bound", True))
+
+    def _cmd_makb(self, args):
+        node = self.mesh.find(args[0])
+        if node is not None and not node.app_key_bound:
+            self._emit("MAKB-MSG ERROR")
+            return
+        self._remote_config("MAKB-MSG", args[0], lambda node: setattr(node, "model_bound", True))
+
+    def _cmd_msaa(self, args):
+        group = int(args[3], 16)
+        self._remote_config("MSAA-MSG", args[0], lambda node: node.subscriptions.add(group))
+
+    def _cmd_msad(self, args):
+        group = int(args[3], 16)
+        self._remote_config("MSAD-MSG", args[0], lambda node: node.subscriptions.discard(group))
+
+    def _cmd_mpas(self, args):
+        publish = int(args[3], 16)
+        self._remote_config("MPAS-MSG", args[0], lambda node: setattr(node, "publish", publish))
+
+    def _cmd_mpad(self, args):
+        self._remote_config("MPAD-MSG", args[0], lambda node: setattr(node, "publish", None))
+
+    def _cmd_mdts(self, args):
+        address, element, ack, data_hex = args[0], args[1], args[3], args[4]
+        if data_hex.lower().startswith("0x"):
+            data_hex = data_hex[2:]
+        data = bytes.fromhex(data_hex)
+        targets = self.mesh.targets(address)
+        if not 1 <= len(data) <= 20 or not targets:
+            self._emit("MDTS-MSG ERROR")
+            return
+        self._emit("MDTS-MSG SUCCESS")
+        for node in targets:
+            delay = self.mesh.delay()
+            if delay is None:
+                self.stats["dropped"] += 1
+                continue
+            if ack == "1":
+                self._emit(f"MDTS-MSG {node.address} {element} {len(data)}", delay)
+            lines = self.mesh.deliver(node, data)
+            if not lines:
+                continue
+            # 回應經過 Mesh 回到 Provisioner 再延遲一次；同一回應的片段依序到達，但各自可能遺失
+            delay += self.mesh.delay() or 0.0
+            for line in lines:
+                if self.mesh.loss and self.mesh.random.random() < self.mesh.loss:
+                    self.stats["dropped"] += 1
+                    continue
+                self._emit(line, delay)
+
+    def _cmd_mdtg(self, args):
+        node = self.mesh.find(args[0])
+        if node is None or not node.model_bound:
+            self._emit("MDTG-MSG ERROR")
+            return
+        length = int(args[3])
+        self._emit("MDTG-MSG SUCCESS")
+        data = node.state[:length].ljust(length, b"\x00")
+        self._emit_remote(f"MDTG-MSG {node.address} {args[1]} {data.hex().upper()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RL62M02 Provisioner 模擬器')
+    parser.add_argument('--nodes', type=int, default=10, help='虛擬節點數量')
+    parser.add_argument('--types', default='SMART_BOX', help='節點設備類型，以逗號分隔並依序循環')
+    parser.add_argument('--latency', type=float, default=0.02, help='Mesh 訊息延遲 (秒)')
+    parser.add_argument('--jitter', type=float, default=0.01, help='額外隨機延遲上限 (秒)')
+    parser.add_argument('--loss', type=float, default=0.0, help='Mesh 訊息遺失率 (0-1)')
+    parser.add_argument('--provisioned', action='store_true', help='預先配置並綁定所有節點')
+    parser.add_argument('--seed', type=int, help='隨機數種子')
+    args = parser.parse_args()
+
+    mesh = VirtualMesh(args.nodes, args.types.split(','), args.latency, args.jitter, args.loss,
+                       provisioned=args.provisioned, seed=args.seed)
+    with SimulatedDongle(mesh) as dongle:
+        print(f"模擬器已啟動，串口: {dongle.port} (Ctrl+C 結束)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print(f"\n結束模擬器，統計: {dongle.stats}")
+
+
+if __name__ == "__main__":
+    main()
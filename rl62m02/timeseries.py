@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+感測器時間序列儲存
+以預先配置的 array('d') 環形緩衝區保存 Air-Box 與電錶讀值，
+提供視窗統計 (min/max/mean/percentile) 與降採樣層級；若安裝 NumPy 則以向量化方式計算
+"""
+
+import bisect
+import math
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 為選用依賴
+    np = None
+
+# 每個 float64 的位元組數
+_ITEM_SIZE = array('d').itemsize
+
+# 預設層級: (解析度秒數, 容量)；解析度 0 表示原始資料
+DEFAULT_TIERS = (
+    (0, 3600),      # 原始讀值，最多 3600 筆
+    (60, 1440),     # 1 分鐘平均，保留 1 天
+    (3600, 720),    # 1 小時平均，保留 30 天
+)
+
+# 各類設備讀值中要保存的指標
+READING_METRICS = {
+    "air_box": ("temperature", "humidity", "pm25", "co2"),
+    "power_meter": ("voltage", "current", "power"),
+}
+
+
+class RingBuffer:
+    """
+    固定容量的多欄位環形緩衝區，每個欄位為預先配置的 array('d')
+    """
+
+    def __init__(self, capacity: int, fields: Sequence[str]):
+        """
+        初始化環形緩衝區
+
+        Args:
+            capacity (int): 最多保存的筆數
+            fields (Sequence[str]): 欄位名稱，第一個欄位必須是時間戳記
+        """
+        if capacity <= 0:
+            raise ValueError("容量必須大於 0")
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self._columns = {name: array('d', bytes(capacity * _ITEM_SIZE)) for name in self.fields}
+        self._head = 0  # 下一筆寫入位置
+        self.count = 0
+
+    def append(self, *values: float):
+        """依欄位順序寫入一筆資料，滿了之後覆蓋最舊的資料"""
+        for name, value in zip(self.fields, values):
+            self._columns[name][self._head] = value
+        self._head = (self._head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    @property
+    def nbytes(self) -> int:
+        """緩衝區佔用的位元組數 (固定)"""
+        return self.capacity * _ITEM_SIZE * len(self.fields)
+
+    def column(self, name: str):
+        """
+        依時間順序取得一個欄位的資料
+
+        Returns:
+            有 NumPy 時為 float64 陣列，否則為 array('d')
+        """
+        col = self._columns[name]
+        if np is not None:
+            view = np.frombuffer(col, dtype=np.float64)
+            if self.count < self.capacity:
+                return view[:self.count].copy()
+            return np.concatenate((view[self._head:], view[:self._head]))
+        if self.count < self.capacity:
+            return col[:self.count]
+        return col[self._head:] + col[:self._head]
+
+
+class TimeSeries:
+    """單一 (設備, 指標) 的時間序列，包含原始資料與各降採樣層級"""
+
+    def __init__(self, tiers: Sequence[Tuple[int, int]] = DEFAULT_TIERS):
+        """
+        初始化時間序列
+
+        Args:
+            tiers: (解析度秒數, 容量) 列表，解析度 0 表示原始資料
+        """
+        self.tiers = tuple(tiers)
+        self._buffers = {}
+        self._open = {}  # 降採樣層級尚未結束的區間: [bucket_start, sum, count, min, max]
+        for resolution, capacity in self.tiers:
+            if resolution == 0:
+                self._buffers[0] = RingBuffer(capacity, ("timestamp", "value"))
+            else:
+                self._buffers[resolution] = RingBuffer(capacity, ("timestamp", "mean", "min", "max"))
+                self._open[resolution] = None
+
+    @property
+    def nbytes(self) -> int:
+        """所有層級佔用的位元組數"""
+        return sum(buffer.nbytes for buffer in self._buffers.values())
+
+    def add(self, timestamp: float, value: float):
+        """新增一筆讀值 (時間戳記需依序遞增)"""
+        if 0 in self._buffers:
+            self._buffers[0].append(timestamp, value)
+        for resolution, bucket in self._open.items():
+            start = timestamp - (timestamp % resolution)
+            if bucket is not None and bucket[0] != start:
+                self._flush(resolution, bucket)
+                bucket = None
+            if bucket is None:
+                self._open[resolution] = [start, value, 1, value, value]
+            else:
+                bucket[1] += value
+                bucket[2] += 1
+                bucket[3] = min(bucket[3], value)
+                bucket[4] = max(bucket[4], value)
+
+    def _flush(self, resolution: int, bucket: List[float]):
+        """將完成的區間寫入降採樣層級"""
+        self._buffers[resolution].append(bucket[0], bucket[1] / bucket[2], bucket[3], bucket[4])
+
+    def window(self, start: Optional[float] = None, end: Optional[float] = None, resolution: int = 0,
+               field: str = None):
+        """
+        取得時間範圍內的資料
+
+        Args:
+            start (float, optional): 起始時間 (含)
+            end (float, optional): 結束時間 (含)
+            resolution (int): 層級解析度，0 為原始資料
+            field (str, optional): 降採樣層級的欄位 (mean/min/max)，預設 mean
+
+        Returns:
+            Tuple: (時間戳記, 數值)
+        """
+        buffer = self._buffers[resolution]
+        timestamps = buffer.column("timestamp")
+        values = buffer.column(field or ("value" if resolution == 0 else "mean"))
+        if np is not None:
+            lo = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+            hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+        else:
+            lo = 0 if start is None else bisect.bisect_left(timestamps, start)
+            hi = len(timestamps) if end is None else bisect.bisect_right(timestamps, end)
+        return timestamps[lo:hi], values[lo:hi]
+
+    def pending_bucket(self, resolution: int) -> Optional[Dict[str, float]]:
+        """取得降採樣層級目前尚未結束的區間"""
+        bucket = self._open.get(resolution)
+        if bucket is None:
+            return None
+        return {"timestamp": float(bucket[0]), "mean": bucket[1] / bucket[2], "min": bucket[3], "max": bucket[4],
+                "count": bucket[2]}
+
+
+def _percentile(sorted_values: Sequence[float], q: float) -> float:
+    """以線性內插計算百分位數 (與 NumPy 預設方法相同)"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * q / 100.0
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+class SensorTimeSeriesStore:
+    """
+    行程內感測器時間序列儲存，以 (設備, 指標) 為鍵
+
+    每個序列的記憶體在建立時即配置完成，之後不再增長，
+    可用 series_nbytes() 與 memory_usage() 查詢
+    """
+
+    def __init__(self, tiers: Sequence[Tuple[int, int]] = DEFAULT_TIERS):
+        """
+        初始化儲存
+
+        Args:
+            tiers: (解析度秒數, 容量) 列表，解析度 0 表示原始資料
+        """
+        self.tiers = tuple(tiers)
+        self._series: Dict[Tuple[str, str], TimeSeries] = {}
+        self._lock = threading.Lock()
+
+    def series_nbytes(self) -> int:
+        """單一 (設備, 指標) 序列佔用的位元組數"""
+        return sum(capacity * _ITEM_SIZE * (2 if resolution == 0 else 4) for resolution, capacity in self.tiers)
+
+    def device_nbytes(self, kind: str) -> int:
+        """單一設備 (依類型的指標數) 佔用的位元組數"""
+        return self.series_nbytes() * len(READING_METRICS.get(kind, ()))
+
+    def memory_usage(self) -> int:
+        """目前所有序列佔用的位元組數"""
+        with self._lock:
+            return sum(series.nbytes for series in self._series.values())
+
+    def add(self, device: str, metric: str, value: float, timestamp: Optional[float] = None):
+        """
+        新增一筆讀值
+
+        Args:
+            device (str): 設備識別 (通常為 unicast address)
+            metric (str): 指標名稱，例如 'temperature'
+            value (float): 讀值
+            timestamp (float, optional): 時間戳記 (秒)，預設為目前時間
+        """
+        if value is None:
+            return
+        if timestamp is None:
+            timestamp = time.time()
+        key = (device, metric)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = TimeSeries(self.tiers)
+            series.add(timestamp, float(value))
+
+    def ingest(self, reading: Dict[str, Any]):
+        """
+        寫入 ModbusPollScheduler 發佈的讀值，可直接作為訂閱者使用:
+        scheduler.subscribe(store.ingest)
+        """
+        data = reading.get("data")
+        if not isinstance(data, dict):
+            return
+        timestamp = reading.get("timestamp")
+        for metric in READING_METRICS.get(reading.get("kind"), ()):
+            self.add(reading["unicast_addr"], metric, data.get(metric), timestamp)
+
+    def keys(self) -> List[Tuple[str, str]]:
+        """所有 (設備, 指標) 鍵"""
+        with self._lock:
+            return list(self._series.keys())
+
+    def window(self, device: str, metric: str, start: Optional[float] = None, end: Optional[float] = None,
+               resolution: int = 0, field: str = None):
+        """
+        取得時間範圍內的資料 (參考 TimeSeries.window)
+
+        Returns:
+            Tuple: (時間戳記, 數值)，序列不存在時返回兩個空列表
+        """
+        with self._lock:
+            series = self._series.get((device, metric))
+            if series is None:
+                return [], []
+            return series.window(start, end, resolution, field)
+
+    def aggregate(self, device: str, metric: str, start: Optional[float] = None, end: Optional[float] = None,
+                  percentiles: Sequence[float] = (50, 95, 99), resolution: int = 0) -> Dict[str, Any]:
+        """
+        計算時間範圍內的統計值
+
+        Args:
+            device (str): 設備識別
+            metric (str): 指標名稱
+            start (float, optional): 起始時間 (含)
+            end (float, optional): 結束時間 (含)
+            percentiles (Sequence[float]): 要計算的百分位數
+            resolution (int): 使用的層級解析度，0 為原始資料，其他層級以區間平均值計算
+
+        Returns:
+            dict: {'count', 'min', 'max', 'mean', 'p50', ...}，沒有資料時各值為 None
+        """
+        _, values = self.window(device, metric, start, end, resolution)
+        result: Dict[str, Any] = {"count": len(values)}
+        keys = ["min", "max", "mean"] + [f"p{q:g}" for q in percentiles]
+        if len(values) == 0:
+            result.update({key: None for key in keys})
+            return result
+
+        if np is not None:
+            result["min"] = float(values.min())
+            result["max"] = float(values.max())
+            result["mean"] = float(values.mean())
+            if percentiles:
+                for q, p in zip(percentiles, np.percentile(values, list(percentiles))):
+                    result[f"p{q:g}"] = float(p)
+        else:
+            ordered = sorted(values)
+            result["min"] = ordered[0]
+            result["max"] = ordered[-1]
+            result["mean"] = math.fsum(ordered) / len(ordered)
+            for q in percentiles:
+                result[f"p{q:g}"] = _percentile(ordered, q)
+        return result
+
+    def downsampled(self, device: str, metric: str, resolution: int, start: Optional[float] = None,
+                    end: Optional[float] = None, include_pending: bool = True) -> List[Dict[str, float]]:
+        """
+        取得降採樣層級的區間資料
+
+        Args:
+            device (str): 設備識別
+            metric (str): 指標名稱
+            resolution (int): 層級解析度 (秒)，必須是已設定的層級
+            start (float, optional): 起始時間 (含)
+            end (float, optional): 結束時間 (含)
+            include_pending (bool): 是否包含尚未結束的最新區間
+
+        Returns:
+            list: [{'timestamp', 'mean', 'min', 'max'}, ...]
+        """
+        with self._lock:
+            series = self._series.get((device, metric))
+            if series is None:
+                return []
+            timestamps, means = series.window(start, end, resolution, "mean")
+            _, mins = series.window(start, end, resolution, "min")
+            _, maxs = series.window(start, end, resolution, "max")
+            buckets = [
+                {"timestamp": float(ts), "mean": float(mean), "min": float(lo), "max": float(hi)}
+                for ts, mean, lo, hi in zip(timestamps, means, mins, maxs)
+            ]
+            pending = series.pending_bucket(resolution) if include_pending else None
+        if pending and (start is None or pending["timestamp"] >= start) and (end is None or pending["timestamp"] <= end):
+            pending.pop("count")
+            buckets.append(pending)
+        return buckets
@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+操作追蹤
+以 span 記錄多步驟操作 (例如 provision_device 的 PBADVCON / PROV / AKA / MAKB，
+Smart-Box 讀取的 MDTS 與 MDTG 等待) 每一步的開始與結束時間、屬性及父子關係，
+完成的 span 交給可替換的匯出器 (記憶體或 JSON Lines 檔案)
+
+未呼叫 configure_tracing() 時 start_span() 返回共用的空 span，不建立物件也不取時間
+"""
+
+import os
+import json
+import time
+import logging
+import functools
+import threading
+import contextvars
+from typing import Any, Callable, Dict, List, Optional
+
+# 目前執行中的 span，各執行緒 / asyncio 工作各自獨立
+_current_span: contextvars.ContextVar = contextvars.ContextVar("rl62m02_current_span", default=None)
+
+
+class Span:
+    """
+    一個被追蹤的操作
+
+    以 with 使用: 進入時成為目前的 span，離開時記錄結束時間並交給匯出器；
+    離開時若有例外，status 設為 'error' 並記錄例外訊息
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_time", "end_time", "attributes",
+                 "status", "_tracer", "_token", "_started")
+
+    def __init__(self, tracer: "Tracer", name: str, parent: Optional["Span"],
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes) if attributes else {}
+        self.status = "ok"
+        self.start_time = time.time()
+        self.end_time = None
+        self._tracer = tracer
+        self._token = None
+        self._started = time.perf_counter()
+
+    @property
+    def duration(self) -> Optional[float]:
+        """持續時間 (秒)，尚未結束時為 None"""
+        return None if self.end_time is None else self.end_time - self.start_time
+
+    def set_attribute(self, key: str, value: Any):
+        """設定屬性"""
+        self.attributes[key] = value
+
+    def set_status(self, status: str, message: str = None):
+        """設定狀態 ('ok' 或 'error')，message 記錄在 error 屬性"""
+        self.status = status
+        if message is not None:
+            self.attributes["error"] = message
+
+    def end(self):
+        """結束 span 並匯出，重複呼叫無效"""
+        if self.end_time is not None:
+            return
+        # 以單調時鐘計算持續時間，避免系統時間調整造成負值
+        self.end_time = self.start_time + (time.perf_counter() - self._started)
+        self._tracer._export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉為可序列化為 JSON 的字典"""
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": None if self.end_time is None else (self.end_time - self.start_time) * 1000,
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.set_status("error", f"{exc_type.__name__}: {exc}")
+        _current_span.reset(self._token)
+        self.end()
+        return False
+
+
+class _NoopSpan:
+    """停用追蹤時使用的空 span"""
+
+    __slots__ = ()
+    name = None
+    trace_id = None
+    span_id = None
+    parent_id = None
+    duration = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_status(self, status, message=None):
+        pass
+
+    def end(self):
+        pass
+
+    def to_dict(self):
+        return {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class InMemoryExporter:
+    """將完成的 span 保存在記憶體中，適合測試與互動式分析"""
+
+    def __init__(self, max_spans: int = 10000):
+        self.max_spans = max_spans
+        self._lock = threading.Lock()
+        self._spans: List[Span] = []
+
+    def export(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+            if len(self._spans) > self.max_spans:
+                del self._spans[0]
+
+    @property
+    def spans(self) -> List[Span]:
+        """依完成順序的 span 列表 (子 span 先於父 span 完成)"""
+        with self._lock:
+            return list(self._spans)
+
+    def find(self, name: str) -> List[Span]:
+        """名稱符合的 span"""
+        return [span for span in self.spans if span.name == name]
+
+    def children(self, span: Span) -> List[Span]:
+        """指定 span 的直接子 span，依開始時間排序"""
+        return sorted((child for child in self.spans if child.parent_id == span.span_id),
+                      key=lambda child: child.start_time)
+
+    def clear(self):
+        """清除已保存的 span"""
+        with self._lock:
+            self._spans.clear()
+
+    def close(self):
+        pass
+
+
+class JsonFileExporter:
+    """每個完成的 span 以一行 JSON 追加到檔案 (JSON Lines)"""
+
+    def __init__(self, path: str):
+        """
+        開啟輸出檔案
+
+        Args:
+            path (str): 輸出檔案路徑，既有內容會保留
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(line + "\n")
+                self._file.flush()
+
+    def close(self):
+        """關閉輸出檔案"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class Tracer:
+    """建立 span 並將完成的 span 交給所有匯出器"""
+
+    def __init__(self, exporters=()):
+        """
+        Args:
+            exporters (iterable): 具有 export(span) 與 close() 方法的匯出器
+        """
+        self.exporters = list(exporters)
+
+    def start_span(self, name: str, attributes: Dict[str, Any] = None) -> Span:
+        """建立以目前 span 為父 span 的新 span"""
+        return Span(self, name, _current_span.get(), attributes)
+
+    def _export(self, span: Span):
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                logging.debug(f"匯出 span {span.name} 時發生錯誤: {e}")
+
+    def shutdown(self):
+        """關閉所有匯出器"""
+        for exporter in self.exporters:
+            exporter.close()
+
+
+_tracer: Optional[Tracer] = None
+
+
+def configure_tracing(*exporters) -> Tracer:
+    """
+    啟用追蹤，取代先前的設定 (先前的匯出器會被關閉)
+
+    Args:
+        *exporters: 匯出器，例如 InMemoryExporter() 或 JsonFileExporter("trace.jsonl")
+
+    Returns:
+        Tracer: 目前使用的 Tracer
+    """
+    global _tracer
+    previous, _tracer = _tracer, Tracer(exporters)
+    if previous is not None:
+        previous.shutdown()
+    return _tracer
+
+
+def disable_tracing():
+    """停用追蹤並關閉匯出器"""
+    global _tracer
+    previous, _tracer = _tracer, None
+    if previous is not None:
+        previous.shutdown()
+
+
+def tracing_enabled() -> bool:
+    """是否已啟用追蹤"""
+    return _tracer is not None
+
+
+def start_span(name: str, attributes: Dict[str, Any] = None):
+    """
+    建立 span，以 with 使用
+
+    Args:
+        name (str): 操作名稱，例如 'AT+PROV' 或 'rtu.transaction'
+        attributes (dict, optional): 初始屬性
+
+    Returns:
+        Span: 停用追蹤時為不做任何事的 NOOP_SPAN
+    """
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    return tracer.start_span(name, attributes)
+
+
+def current_span():
+    """目前的 span，沒有時返回 NOOP_SPAN"""
+    return _current_span.get() or NOOP_SPAN
+
+
+def traced(name: str = None) -> Callable:
+    """
+    以 span 包住整個函數呼叫的裝飾器
+
+    Args:
+        name (str, optional): span 名稱，預設為函數的 __qualname__
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _tracer.start_span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+    return decorator
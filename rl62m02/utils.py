@@ -16,3 +16,23 @@ def format_mac_address(mac_address: str) -> str:
     # 每兩個字符插入一個冒號
     mac_parts = [mac_without_colon[i:i+2] for i in range(0, 12, 2)]
     return ":".join(mac_parts).upper()
+
+def format_mesh_address(address) -> str:
+    """將 Mesh 地址 (unicast/group) 格式化為 0xXXXX 的形式"""
+    if isinstance(address, int):
+        value = address
+    else:
+        text = str(address).strip()
+        try:
+            value = int(text, 16)
+        except ValueError:
+            return text  # 如果格式不正確，返回原始值
+    return f"0x{value:04X}"
+
+def is_group_address(address) -> bool:
+    """判斷是否為 Group 地址 (0xC000 ~ 0xFFFF)"""
+    try:
+        value = address if isinstance(address, int) else int(str(address).strip(), 16)
+    except ValueError:
+        return False
+    return 0xC000 <= value <= 0xFFFF
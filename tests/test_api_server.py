@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+MeshAPIServer 的回歸測試
+"""
+
+import asyncio
+import struct
+import unittest
+
+from rl62m02.api_server import MAX_BODY_BYTES, MeshAPIServer
+
+
+class _Provisioner:
+    def add_listener(self, callback):
+        pass
+
+    def remove_listener(self, callback):
+        pass
+
+
+class _Gateway:
+    provisioner = _Provisioner()
+
+
+class ContentLengthTest(unittest.TestCase):
+
+    def _request(self, content_length: str) -> bytes:
+        async def scenario():
+            server = MeshAPIServer(_Gateway(), port=0)
+            await server.start()
+            try:
+                reader, writer = await asyncio.open_connection(server.host, server.port)
+                writer.write(f"POST /control HTTP/1.1\r\nContent-Length: {content_length}\r\n\r\n".encode("latin-1"))
+                await writer.drain()
+                response = await asyncio.wait_for(reader.read(), 5.0)
+                writer.close()
+                return response
+            finally:
+                await server.close()
+        return asyncio.run(scenario())
+
+    def test_malformed_content_length(self):
+        self.assertTrue(self._request("abc").startswith(b"HTTP/1.1 400 "))
+
+    def test_negative_content_length(self):
+        self.assertTrue(self._request("-5").startswith(b"HTTP/1.1 400 "))
+
+
+class WebSocketFrameLimitTest(unittest.TestCase):
+
+    def test_oversized_frame_closed_with_1009(self):
+        async def scenario():
+            server = MeshAPIServer(_Gateway(), port=0)
+            await server.start()
+            try:
+                reader, writer = await asyncio.open_connection(server.host, server.port)
+                writer.write(b"GET /events HTTP/1.1\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                             b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n\r\n")
+                await writer.drain()
+                await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5.0)
+                # 只送出標頭，宣告超過上限的 64 位元長度
+                writer.write(struct.pack("!BBQ", 0x81, 0x80 | 127, MAX_BODY_BYTES + 1) + b"\x00" * 4)
+                await writer.drain()
+                response = await asyncio.wait_for(reader.read(), 5.0)
+                writer.close()
+                return response
+            finally:
+                await server.close()
+        response = asyncio.run(scenario())
+        self.assertEqual(response, bytes([0x88, 2]) + struct.pack("!H", 1009))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+rl62m02 apply --dry-run 的回歸測試: 不指定串口時以 RLMeshDeviceController(None) 比較設定與設備記錄
+"""
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+import subprocess
+
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ApplyDryRunTest(unittest.TestCase):
+
+    def test_controller_without_provisioner(self):
+        from rl62m02.controllers.mesh_controller import RLMeshDeviceController
+        controller = RLMeshDeviceController(None)
+        self.assertIsNone(controller.rtu_transport)
+        self.assertTrue(controller.register_device("0x0100", "SMART_BOX"))
+
+    def test_rtu_without_provisioner_is_an_error(self):
+        from rl62m02.controllers.mesh_controller import RLMeshDeviceController
+        controller = RLMeshDeviceController(None)
+        controller.register_device("0x0100", "AIR_BOX")
+        response = controller.control_smart_box_rtu("0x0100", controller.modbus.read_holding_registers_request(1, 0, 2))
+        self.assertEqual(response["result"], "error")
+        self.assertIsNone(controller.read_smart_box_registers("0x0100", 1, 0x03, 0, 2))
+        self.assertIsNone(controller.read_air_box_data("0x0100", 1)["temperature"])
+        controller.close()
+
+    def test_cli_dry_run_without_port(self):
+        config = {"devices": [{"uuid": "123E4567E89B12D3A45670100010010D", "device_name": "燈",
+                               "unicast_addr": "0x0100", "subscribe_uid": "0xC000"}]}
+        with tempfile.TemporaryDirectory() as directory:
+            config_path = os.path.join(directory, "config.json")
+            with open(config_path, "w", encoding="utf-8") as f:
+                json.dump(config, f)
+            env = dict(os.environ, PYTHONPATH=PACKAGE_PARENT, PYTHONIOENCODING="utf-8")
+            completed = subprocess.run(
+                [sys.executable, "-m", "rl62m02.cli", "--device-file", os.path.join(directory, "devices.json"),
+                 "apply", config_path, "--dry-run"],
+                env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8")
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        self.assertIn("結果: dry_run", completed.stdout)
+
+
+if __name__ == "__main__":
+    unittest.main()
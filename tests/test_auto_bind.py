@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+IncrementalBinder 的回歸測試: 掃描時間從開始掃描起計算，不包含 AT+NL 查詢的時間
+"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+import unittest
+
+from rl62m02.auto_bind import IncrementalBinder
+from rl62m02.device_manager import MeshDeviceManager
+from rl62m02.controllers.mesh_controller import RLMeshDeviceController
+
+
+class _Provisioner:
+    """AT+NL 需要 0.5 秒，開始掃描 0.1 秒後回報預期設備的 DIS-MSG"""
+
+    def __init__(self):
+        self.listeners = []
+        self.discovering = False
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        self.listeners.remove(callback)
+
+    def get_node_list(self):
+        time.sleep(0.5)
+        return []
+
+    def start_discovery(self):
+        self.discovering = True
+
+        def emit():
+            time.sleep(0.1)
+            for callback in list(self.listeners):
+                callback("DIS-MSG AABBCCDDEE01 -40 123E4567E89B12D3A456AABBCCDDEE01")
+        threading.Thread(target=emit, daemon=True).start()
+        return "DIS-MSG SUCCESS"
+
+    def stop_discovery(self):
+        self.discovering = False
+        return "DIS-MSG SUCCESS"
+
+    def auto_provision_node(self, uuid):
+        return {"result": "success", "unicast_addr": "0x0100"}
+
+
+class IncrementalBinderDeadlineTest(unittest.TestCase):
+
+    def test_scan_time_starts_after_discovery(self):
+        with tempfile.TemporaryDirectory() as directory:
+            device_file = os.path.join(directory, "mesh_devices.json")
+            with open(device_file, "w", encoding="utf-8") as f:
+                json.dump({"devices": [{"devMac": "AA:BB:CC:DD:EE:01", "uid": "0x0100",
+                                        "devName": "PLUG", "devType": "插座"}]}, f)
+            provisioner = _Provisioner()
+            manager = MeshDeviceManager(provisioner, RLMeshDeviceController(None), device_file)
+            events = list(IncrementalBinder(manager).run(scan_time=0.3, verify_online=True))
+        self.assertEqual(events[-1]["bound"], 1)
+        self.assertEqual(events[-1]["missing"], 0)
+        self.assertFalse(provisioner.discovering)
+
+
+if __name__ == "__main__":
+    unittest.main()
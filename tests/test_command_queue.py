@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+CoalescingCommandQueue 的統計測試
+"""
+
+import unittest
+
+from rl62m02.controllers.command_queue import CoalescingCommandQueue
+from rl62m02.controllers.mesh_controller import RLMeshDeviceController
+
+
+class _Provisioner:
+    def send_datatrans(self, unicast_addr, data):
+        return "MDTS-MSG SUCCESS"
+
+
+class CommandQueueStatsTest(unittest.TestCase):
+
+    def test_error_results_are_counted_as_failed(self):
+        controller = RLMeshDeviceController(None)
+        controller.provisioner = _Provisioner()
+        controller.register_device("0x0100", RLMeshDeviceController.DEVICE_TYPE_PLUG)
+        queue = CoalescingCommandQueue(controller)
+        queue.start()
+        try:
+            sent = queue.submit_plug("0x0100", True)
+            unregistered = queue.submit_plug("0x0999", True)
+            self.assertTrue(queue.flush(5.0))
+        finally:
+            queue.stop()
+        self.assertEqual(sent.result(), "MDTS-MSG SUCCESS")
+        self.assertTrue(unregistered.result().startswith("錯誤"))
+        stats = queue.get_stats()
+        self.assertEqual((stats["sent"], stats["failed"]), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+GatewayServer 的回歸測試: 只移除殘留的 socket 檔案，不取代仍在監聽的閘道
+"""
+
+import os
+import socket
+import asyncio
+import tempfile
+import unittest
+
+from rl62m02.gateway import GatewayServer
+
+
+class GatewayServerSocketTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "gateway.sock")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_stale_socket_is_replaced(self):
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.path)
+        stale.close()
+
+        async def scenario():
+            server = GatewayServer(None, self.path)
+            await server.start()
+            await server.close()
+        asyncio.run(scenario())
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_live_gateway_is_not_replaced(self):
+        async def scenario():
+            first = GatewayServer(None, self.path)
+            await first.start()
+            try:
+                second = GatewayServer(None, self.path)
+                with self.assertRaises(RuntimeError):
+                    await second.start()
+                await second.close()
+                self.assertTrue(os.path.exists(self.path))
+                reader, writer = await asyncio.open_unix_connection(self.path)
+                writer.close()
+            finally:
+                await first.close()
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
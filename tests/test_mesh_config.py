@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+MeshConfigApplier 的回歸測試
+"""
+
+import os
+import json
+import tempfile
+import unittest
+
+from rl62m02.device_manager import MeshDeviceManager
+from rl62m02.controllers.mesh_controller import RLMeshDeviceController
+from rl62m02.mesh_config import MeshConfigApplier
+
+
+class _Provisioner:
+    """記錄送出的訂閱與推播命令"""
+
+    def __init__(self):
+        self.commands = []
+
+    def subscribe_group(self, unicast_addr, group_addr):
+        self.commands.append(("subscribe", unicast_addr, group_addr))
+        return "MSAA-MSG SUCCESS"
+
+    def publish_to_target(self, unicast_addr, publish_addr):
+        self.commands.append(("publish", unicast_addr, publish_addr))
+        return "MPAS-MSG SUCCESS"
+
+
+class MeshConfigUpdateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.device_file = os.path.join(self.directory.name, "mesh_devices.json")
+        with open(self.device_file, "w", encoding="utf-8") as f:
+            json.dump({"gwMac": "", "gwType": "mini_PC", "gwPosition": "", "devices": [
+                {"devMac": "", "devName": "RGB_LED", "devType": "舊名稱", "devPosition": "", "devGroup": "",
+                 "uid": "0x010a", "state": 0, "subscribe": [], "publish": ""}]}, f)
+        self.provisioner = _Provisioner()
+        self.manager = MeshDeviceManager(self.provisioner, RLMeshDeviceController(None), self.device_file)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_update_matches_lowercase_uid(self):
+        config = {"devices": [{"name": "客廳燈", "type": "RGB_LED", "unicast_addr": "0x010A"}]}
+        result = MeshConfigApplier(self.manager, config).apply()
+        self.assertEqual(result["result"], "success")
+        self.assertEqual(result["steps"][0]["status"], "success")
+        self.assertEqual(self.manager.get_all_devices()[0]["devType"], "客廳燈")
+
+    def test_update_missing_device_is_an_error_step(self):
+        config = {"devices": [{"name": "客廳燈", "type": "RGB_LED", "unicast_addr": "0x010A"}]}
+        applier = MeshConfigApplier(self.manager, config)
+        plan = applier.plan()
+        self.manager.devices_data["devices"] = []
+        applier.plan = lambda verify_nodes=False: plan
+        result = applier.apply()
+        self.assertEqual(result["result"], "partial")
+        self.assertEqual(result["steps"][0]["status"], "failed")
+        self.assertIn("error", result["steps"][0])
+
+    def test_subscribe_and_publish_match_lowercase_uid(self):
+        config = {"devices": [{"name": "舊名稱", "type": "RGB_LED", "unicast_addr": "0x010A",
+                               "subscribe_uid": "0xC000", "publish_uid": "0xC001"}]}
+        result = MeshConfigApplier(self.manager, config).apply()
+        self.assertEqual(result["result"], "success")
+        self.assertEqual([step["status"] for step in result["steps"]], ["success", "success"])
+        self.assertEqual(result["sent_commands"], 2)
+        self.assertEqual(self.provisioner.commands,
+                         [("subscribe", "0x010a", "0xC000"), ("publish", "0x010a", "0xC001")])
+        device = self.manager.get_all_devices()[0]
+        self.assertEqual(device["subscribe"], ["0xC000"])
+        self.assertEqual(device["publish"], "0xC001")
+
+    def test_subscribe_missing_device_sends_nothing(self):
+        config = {"devices": [{"name": "舊名稱", "type": "RGB_LED", "unicast_addr": "0x010A",
+                               "subscribe_uid": "0xC000", "publish_uid": "0xC001"}]}
+        applier = MeshConfigApplier(self.manager, config)
+        plan = applier.plan()
+        self.manager.devices_data["devices"] = []
+        applier.plan = lambda verify_nodes=False: plan
+        result = applier.apply()
+        self.assertEqual(result["result"], "partial")
+        self.assertEqual(result["steps"][0]["status"], "failed")
+        self.assertEqual(result["steps"][1]["status"], "failed")
+        self.assertEqual(result["sent_commands"], 0)
+        self.assertEqual(self.provisioner.commands, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
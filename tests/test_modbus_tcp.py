@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+ModbusTCPGateway 的測試: 以模擬 dongle 讀取多訊框回應、快取命中，以及快取數量上限
+"""
+
+import sys
+import struct
+import asyncio
+import unittest
+
+from rl62m02.modbus import ModbusRTU
+from rl62m02.modbus_tcp import MBAP_HEADER, ModbusTCPGateway
+
+
+async def _request(port: int, unit_id: int, pdu: bytes, transaction_id: int = 1) -> bytes:
+    """送出一個 Modbus TCP 請求並返回回應 PDU"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(MBAP_HEADER.pack(transaction_id, 0, len(pdu) + 1, unit_id) + pdu)
+        await writer.drain()
+        header = await asyncio.wait_for(reader.readexactly(MBAP_HEADER.size), 10.0)
+        _, _, length, _ = MBAP_HEADER.unpack(header)
+        return await reader.readexactly(length - 1)
+    finally:
+        writer.close()
+
+
+def _read_pdu(function_code: int, address: int, quantity: int) -> bytes:
+    return struct.pack(">BHH", function_code, address, quantity)
+
+
+@unittest.skipIf(sys.platform == "win32", "模擬 dongle 需要 pty")
+class SimulatedGatewayTest(unittest.TestCase):
+
+    def test_multi_frame_read_and_cache_hit(self):
+        from rl62m02.serial_at import SerialAT
+        from rl62m02.provisioner import Provisioner
+        from rl62m02.controllers.mesh_controller import RLMeshDeviceController
+        from rl62m02.simulator import SimulatedDongle, VirtualMesh
+
+        mesh = VirtualMesh(1, provisioned=True)
+        node = mesh.nodes[0]
+        node.slaves[1].holding_registers.update({address: address * 3 for address in range(50)})
+        with SimulatedDongle(mesh) as dongle:
+            serial_at = SerialAT(dongle.port)
+            controller = RLMeshDeviceController(Provisioner(serial_at))
+            try:
+                gateway = ModbusTCPGateway.from_controller(controller, {1: (node.address, 1)},
+                                                           host="127.0.0.1", port=0, cache_ttl=30.0)
+
+                async def scenario():
+                    await gateway.start()
+                    try:
+                        # 50 個寄存器 (100 bytes) 需要多個 MDTG-MSG 才能傳回
+                        pdu = _read_pdu(ModbusRTU.READ_HOLDING_REGISTERS, 0, 50)
+                        first = await _request(gateway.port, 1, pdu)
+                        second = await _request(gateway.port, 1, pdu, transaction_id=2)
+                        return first, second
+                    finally:
+                        await gateway.close()
+
+                first, second = asyncio.run(scenario())
+            finally:
+                controller.close()
+                serial_at.close()
+        self.assertEqual(first[:2], bytes([ModbusRTU.READ_HOLDING_REGISTERS, 100]))
+        self.assertEqual(list(struct.unpack(">50H", first[2:])), [address * 3 for address in range(50)])
+        self.assertEqual(second, first)
+        self.assertEqual(gateway.stats["transactions"], 1)
+        self.assertEqual(gateway.stats["cache_hits"], 1)
+        self.assertGreater(controller.rtu_transport.stats["fragments_received"], 1)
+
+
+class CacheLimitTest(unittest.TestCase):
+
+    def _gateway(self, **kwargs):
+        modbus = ModbusRTU()
+
+        def transact(unicast_addr, request):
+            return modbus.create_rtu_packet(request[0], request[1], b"\x02\x00\x07")
+        return ModbusTCPGateway(transact, {1: ("0x0100", 1)}, **kwargs)
+
+    def test_cache_is_capped(self):
+        gateway = self._gateway(cache_ttl=30.0, max_cache_entries=4)
+
+        async def scan():
+            for address in range(20):
+                await gateway.handle_pdu(1, _read_pdu(ModbusRTU.READ_HOLDING_REGISTERS, address, 1))
+            return await gateway.handle_pdu(1, _read_pdu(ModbusRTU.READ_HOLDING_REGISTERS, 19, 1))
+        self.assertEqual(asyncio.run(scan()), b"\x03\x02\x00\x07")
+        self.assertEqual(len(gateway._cache), 4)
+        self.assertEqual(gateway.stats["cache_hits"], 1)
+
+    def test_expired_entries_are_removed(self):
+        gateway = self._gateway(cache_ttl=0.01)
+
+        async def scan():
+            for address in range(5):
+                await gateway.handle_pdu(1, _read_pdu(ModbusRTU.READ_HOLDING_REGISTERS, address, 1))
+                await asyncio.sleep(0.02)
+        asyncio.run(scan())
+        self.assertEqual(len(gateway._cache), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+ModbusPollScheduler 的回歸測試
+"""
+
+import time
+import unittest
+
+from rl62m02.modbus import ModbusRTU
+from rl62m02.polling import ModbusPollScheduler
+from rl62m02.controllers.mesh_controller import RLMeshDeviceController
+
+
+class _Controller:
+    """只回傳固定讀值的控制器"""
+
+    def __init__(self, air_box):
+        self.air_box = air_box
+
+    def is_interactive_busy(self, window=0.5):
+        return False
+
+    def read_air_box_data(self, unicast_addr, slave_address):
+        return dict(self.air_box)
+
+
+class PollFailureTest(unittest.TestCase):
+
+    def _run_once(self, air_box=None, controller=None, **job):
+        scheduler = ModbusPollScheduler(controller or _Controller(air_box))
+        readings = []
+        scheduler.subscribe(readings.append)
+        job_id = scheduler.add_job("0x0100", job.pop("kind", "air_box"), period=10, **job)
+        scheduler.start()
+        deadline = time.monotonic() + 2.0
+        while scheduler.stats()[job_id]["runs"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        scheduler.stop()
+        return scheduler.stats()[job_id], readings
+
+    def test_empty_air_box_reading_is_a_failure(self):
+        stats, readings = self._run_once({"temperature": None, "humidity": None, "pm25": None, "co2": None,
+                                          "raw_data": {"initial_response": None, "mdtg_response": None}})
+        self.assertEqual(stats["runs"], 1)
+        self.assertEqual(stats["failures"], 1)
+        self.assertEqual(readings, [])
+
+    def test_valid_air_box_reading_is_published(self):
+        stats, readings = self._run_once({"temperature": 24.9, "humidity": 70.5, "pm25": 11, "co2": 492,
+                                          "raw_data": {}})
+        self.assertEqual(stats["failures"], 0)
+        self.assertEqual(readings[0]["data"]["temperature"], 24.9)
+
+
+    def _smart_box(self, respond):
+        """以 respond(控制器, 請求封包) 取代實際 RTU 交易的控制器"""
+        controller = RLMeshDeviceController(None)
+        controller.register_device("0x0100", RLMeshDeviceController.DEVICE_TYPE_SMART_BOX)
+        controller.control_smart_box_rtu = lambda unicast_addr, packet: respond(controller, packet)
+        return controller
+
+    def test_smart_box_exception_is_a_failure(self):
+        def respond(controller, packet):
+            frame = controller.modbus.create_rtu_packet(packet[0], packet[1] | 0x80, b"\x02")
+            return {"initial_response": "MDTS-MSG SUCCESS", "mdtg_response": f"MDTG-MSG 0x0100 0 827602{frame.hex()}"}
+        stats, readings = self._run_once(controller=self._smart_box(respond), kind="smart_box",
+                                         function_code=ModbusRTU.READ_HOLDING_REGISTERS, start_address=0, quantity=2)
+        self.assertEqual(stats["failures"], 1)
+        self.assertEqual(readings, [])
+
+    def test_smart_box_timeout_is_a_failure(self):
+        stats, readings = self._run_once(
+            controller=self._smart_box(lambda controller, packet: {"initial_response": None, "mdtg_response": None}),
+            kind="smart_box", function_code=ModbusRTU.READ_HOLDING_REGISTERS, start_address=0, quantity=2)
+        self.assertEqual(stats["failures"], 1)
+        self.assertEqual(readings, [])
+
+    def test_smart_box_coils_are_decoded(self):
+        def respond(controller, packet):
+            return controller._cached_read_response("0x0100", packet[0], packet[1], [True, False, True])
+        stats, readings = self._run_once(controller=self._smart_box(respond), kind="smart_box",
+                                         function_code=ModbusRTU.READ_COILS, start_address=0, quantity=3)
+        self.assertEqual(stats["failures"], 0)
+        self.assertEqual(readings[0]["data"]["registers"], [True, False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Smart-Box 讀取快取的回歸測試: 值以寄存器為單位快取，子範圍的讀取由快取提供
+"""
+
+import threading
+import unittest
+
+from rl62m02.modbus import ModbusRTU
+from rl62m02.controllers.read_cache import ReadCache
+from rl62m02.controllers.mesh_controller import RLMeshDeviceController
+
+
+class RegisterReadCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = RLMeshDeviceController(None)
+        self.controller.register_device("0x0102", RLMeshDeviceController.DEVICE_TYPE_AIR_BOX)
+        self.controller.configure_read_cache(ttl=60.0)
+        self.requests = []
+        self.controller.control_smart_box_rtu = self._respond
+
+    def _respond(self, unicast_addr, modbus_packet):
+        """模擬從站: 寄存器 n 的值為 n * 10，線圈 n 在 n 為偶數時為 ON"""
+        self.requests.append(modbus_packet)
+        slave_address, function_code = modbus_packet[0], modbus_packet[1]
+        start_address = int.from_bytes(modbus_packet[2:4], "big")
+        quantity = int.from_bytes(modbus_packet[4:6], "big")
+        addresses = range(start_address, start_address + quantity)
+        if function_code == ModbusRTU.READ_COILS:
+            values = [address % 2 == 0 for address in addresses]
+        else:
+            values = [address * 10 for address in addresses]
+        return self.controller._cached_read_response(unicast_addr, slave_address, function_code, values)
+
+    def test_subrange_is_served_from_cache(self):
+        read = self.controller.read_smart_box_registers
+        self.assertEqual(read("0x0102", 1, ModbusRTU.READ_HOLDING_REGISTERS, 0, 10), [n * 10 for n in range(10)])
+        self.assertEqual(read("0x0102", 1, ModbusRTU.READ_HOLDING_REGISTERS, 3, 4), [30, 40, 50, 60])
+        self.assertEqual(len(self.requests), 1)
+        response = self.controller.read_smart_box_rtu("0x0102", 1, ModbusRTU.READ_HOLDING_REGISTERS, 9, 1)
+        self.assertEqual(response["initial_response"], "CACHED")
+        self.assertEqual(len(self.requests), 1)
+
+    def test_range_outside_cache_is_read(self):
+        read = self.controller.read_smart_box_registers
+        read("0x0102", 1, ModbusRTU.READ_HOLDING_REGISTERS, 0, 4)
+        self.assertEqual(read("0x0102", 1, ModbusRTU.READ_HOLDING_REGISTERS, 2, 4), [20, 30, 40, 50])
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(read("0x0102", 1, ModbusRTU.READ_INPUT_REGISTERS, 0, 4), [0, 10, 20, 30])
+        self.assertEqual(len(self.requests), 3)
+
+    def test_coils_are_cached_per_bit(self):
+        read = self.controller.read_smart_box_registers
+        read("0x0102", 1, ModbusRTU.READ_COILS, 0, 16)
+        self.assertEqual(read("0x0102", 1, ModbusRTU.READ_COILS, 5, 3), [False, True, False])
+        self.assertEqual(len(self.requests), 1)
+
+    def test_write_invalidates_slave(self):
+        read = self.controller.read_smart_box_registers
+        read("0x0102", 1, ModbusRTU.READ_HOLDING_REGISTERS, 0, 4)
+        self.assertEqual(self.controller.invalidate_read_cache("0x0102", 1), 4)
+        read("0x0102", 1, ModbusRTU.READ_HOLDING_REGISTERS, 0, 4)
+        self.assertEqual(len(self.requests), 2)
+
+
+class InvalidateDuringLoadTest(unittest.TestCase):
+
+    def test_load_started_before_invalidate_is_not_stored(self):
+        cache = ReadCache(ttl=60.0)
+        started = threading.Event()
+        release = threading.Event()
+        loads = []
+
+        def slow_loader():
+            loads.append(1)
+            started.set()
+            release.wait(5.0)
+            return [1, 2]
+
+        reader = threading.Thread(target=cache.get_many, args=("range", ["a", "b"], slow_loader, list))
+        reader.start()
+        self.assertTrue(started.wait(5.0))
+        cache.invalidate(lambda key: key == "b")
+        release.set()
+        reader.join(5.0)
+        self.assertEqual(cache.stats["invalidated_loads"], 1)
+        self.assertIsNone(cache.peek("a"))
+
+        values, result = cache.get_many("range", ["a", "b"], lambda: [3, 4], list)
+        self.assertEqual((values, result), ([3, 4], [3, 4]))
+        self.assertEqual(cache.get_many("range", ["a", "b"], lambda: [5, 6], list), ([3, 4], None))
+        self.assertEqual(cache._generations, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+寄存器對應表的回歸測試
+"""
+
+import os
+import json
+import struct
+import tempfile
+import unittest
+
+from rl62m02 import register_map
+from rl62m02.register_map import RegisterField, RegisterMap, get_register_map
+
+
+class RegisterMapDecodeTest(unittest.TestCase):
+
+    def test_decode_fields_with_gaps_and_byte_orders(self):
+        fields = [
+            RegisterField("voltage", 0x10, scale=0.1),
+            RegisterField("power", 0x12, width=2, signed=True),
+            RegisterField("energy", 0x15, width=2, value_type="float", byte_order="little"),
+            RegisterField("factor", 0x11, scale=2),
+        ]
+        mapping = RegisterMap("test", 0x03, 0x10, 8, fields)
+        payload = (struct.pack(">HHi", 2305, 3, -1500) + b"\x00\x00"
+                   + struct.pack("<f", 12.5) + b"\x00\x00")
+        self.assertEqual(mapping.decode(payload), {"voltage": 230.5, "factor": 6, "power": -1500, "energy": 12.5})
+        self.assertIsNone(mapping.decode(payload[:10]))
+
+    def test_overlapping_fields_are_rejected(self):
+        with self.assertRaises(ValueError):
+            RegisterMap("test", 0x03, 0, 4, [RegisterField("a", 0, width=2), RegisterField("b", 1)])
+
+
+class GetRegisterMapTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cwd = os.getcwd()
+        os.chdir(self.directory.name)
+        register_map._cache.clear()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        register_map._cache.clear()
+        self.directory.cleanup()
+
+    def test_model_name_is_not_shadowed_by_local_file(self):
+        with open("air_box", "w", encoding="utf-8") as f:
+            f.write("not a register map")
+        self.assertEqual(get_register_map("air_box").model, "air_box")
+
+    def test_json_path_is_loaded(self):
+        with open("meter.json", "w", encoding="utf-8") as f:
+            json.dump({"model": "meter", "function_code": 3, "start_address": 0, "quantity": 1,
+                       "fields": [{"name": "value", "address": 0}]}, f)
+        self.assertEqual(get_register_map("meter.json").model, "meter")
+        self.assertEqual(get_register_map(os.path.join(".", "meter.json")).decode(b"\x00\x07"), {"value": 7})
+
+    def test_unknown_model(self):
+        with self.assertRaises(ValueError):
+            get_register_map("missing_model")
+
+
+if __name__ == "__main__":
+    unittest.main()